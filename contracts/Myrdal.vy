@@ -37,6 +37,10 @@ event MemoryStored:
     task_id: bytes32
     timestamp: uint256
 
+event MemoryDeleted:
+    memory_id: bytes32
+    timestamp: uint256
+
 event UserRegistered:
     user: address
     privacy_level: uint8
@@ -167,6 +171,18 @@ PRIVACY_LEVEL_MAXIMUM: constant(uint8) = 3
 
 MAX_TAGS: constant(uint256) = 10
 
+# 1トランザクションでまとめて完了できるリクエスト数
+MAX_FULFILL_BATCH: constant(uint256) = 20
+
+# 1トランザクションでまとめて記録できるファイル数
+MAX_RECORD_BATCH: constant(uint256) = 50
+
+# 一覧のget_*が1回で返す最大件数
+MAX_PAGE_SIZE: constant(uint256) = 100
+
+# 複数タグ検索で1回に走査する一覧の件数の上限（list_scan_limitで下げられる）
+MAX_LIST_SCAN: constant(uint256) = 10000
+
 ###################################
 # Storage Variables
 ###################################
@@ -174,9 +190,11 @@ MAX_TAGS: constant(uint256) = 10
 owner: public(address)
 paused: public(bool)
 tasks: HashMap[bytes32, TaskInfo]
-user_tasks: HashMap[address, DynArray[bytes32, 100]]
+# 一覧は件数とインデックスのマッピングで保持する（追加はO(1)で件数の上限なし）
+user_tasks: HashMap[address, HashMap[uint256, bytes32]]
+user_task_count: public(HashMap[address, uint256])
 task_count: public(uint256)
-task_exists: HashMap[bytes32, bool]
+task_exists: public(HashMap[bytes32, bool])
 
 # MCP関連のストレージ
 mcp_requests: HashMap[bytes32, MCPRequest]
@@ -185,16 +203,26 @@ mcp_request_exists: HashMap[bytes32, bool]
 
 # メモリ関連のストレージ
 memories: HashMap[bytes32, MemoryEntry]
-user_memories: HashMap[address, DynArray[bytes32, 100]]
+user_memories: HashMap[address, HashMap[uint256, bytes32]]
+user_memory_count: public(HashMap[address, uint256])
 memory_count: public(uint256)
-memory_exists: HashMap[bytes32, bool]
-memory_tags: HashMap[String[32], DynArray[bytes32, 100]]
+memory_tags: HashMap[String[32], HashMap[uint256, bytes32]]
+memory_tag_count: public(HashMap[String[32], uint256])
+# 件数の上限がない一覧でのメモリの位置（1始まり、0は含まれない）と関連付けられたタスク
+# （タスクのメモリリストは最大10件のため位置を保存せず、削除時に探す）
+user_memory_position: HashMap[bytes32, uint256]
+memory_tag_position: HashMap[String[32], HashMap[bytes32, uint256]]
+memory_task: public(HashMap[bytes32, bytes32])
+# 複数タグ検索で1回に走査する件数（eth_callのガス上限が小さいノードに合わせて下げる）
+list_scan_limit: public(uint256)
 
 # オラクル関連のストレージ
 oracle_requests: HashMap[bytes32, OracleRequest]
 oracle_request_count: public(uint256)
 oracle_request_exists: HashMap[bytes32, bool]
 mcp_oracle_address: public(address)
+# リクエストを完了できるオラクル署名アカウント（複数のアカウントで並列に送信する）
+mcp_fulfillers: public(HashMap[address, bool])
 
 # ユーザー関連のストレージ
 users: public(HashMap[address, UserInfo])
@@ -203,9 +231,11 @@ service_fee: public(uint256)  # Fee for using the service (in wei)
 
 # Fileverse関連のストレージ
 fileverse_operators: public(HashMap[address, bool])
-task_files: public(HashMap[bytes32, DynArray[bytes32, 100]])
+task_files: HashMap[bytes32, HashMap[uint256, bytes32]]
+task_file_count: public(HashMap[bytes32, uint256])
 file_metadata: public(HashMap[bytes32, FileMetadata])
-user_files: public(HashMap[address, DynArray[bytes32, 100]])
+user_files: HashMap[address, HashMap[uint256, bytes32]]
+user_file_count: public(HashMap[address, uint256])
 file_access: public(HashMap[bytes32, HashMap[address, bool]])
 
 ###################################
@@ -224,6 +254,7 @@ def __init__():
     self.memory_count = 0
     self.oracle_request_count = 0
     self.mcp_oracle_address = msg.sender  # 初期値としてオーナーを設定
+    self.list_scan_limit = MAX_LIST_SCAN
 
 @external
 def create_task(prompt: String[1024]) -> bytes32:
@@ -240,33 +271,19 @@ def create_task(prompt: String[1024]) -> bytes32:
     count_bytes: bytes32 = convert(self.task_count, bytes32)
     task_id: bytes32 = keccak256(concat(timestamp_bytes, sender_bytes, count_bytes))
     
-    # 空の配列の初期化
-    empty_mcp_requests: DynArray[bytes32, 10] = []
-    empty_memory_entries: DynArray[bytes32, 10] = []
-    empty_oracle_requests: DynArray[bytes32, 5] = []
-    
-    # タスク情報の作成
-    task: TaskInfo = TaskInfo(
-        id=task_id,
-        creator=msg.sender,
-        prompt=prompt,
-        result="",
-        created_at=block.timestamp,
-        completed_at=0,
-        status=TASK_STATUS_PENDING,
-        mcp_requests=empty_mcp_requests,
-        memory_entries=empty_memory_entries,
-        oracle_requests=empty_oracle_requests
-    )
-    
     # タスクの保存
-    self.tasks[task_id] = task
+    # 構造体全体を書き込むと空の結果・配列の領域まで書き込むため、値のあるフィールドだけを書き込む
+    # （task_idは作成者・ブロック時刻・カウントから決まるため、未使用のスロットは0のまま）
+    self.tasks[task_id].id = task_id
+    self.tasks[task_id].creator = msg.sender
+    self.tasks[task_id].prompt = prompt
+    self.tasks[task_id].created_at = block.timestamp
+    self.tasks[task_id].status = TASK_STATUS_PENDING
     self.task_exists[task_id] = True
     
     # ユーザーのタスクリストに追加
-    user_task_list: DynArray[bytes32, 100] = self.user_tasks[msg.sender]
-    user_task_list.append(task_id)
-    self.user_tasks[msg.sender] = user_task_list
+    self.user_tasks[msg.sender][self.user_task_count[msg.sender]] = task_id
+    self.user_task_count[msg.sender] += 1
     
     # タスクカウントの更新
     self.task_count += 1
@@ -286,10 +303,8 @@ def process_task(task_id: bytes32) -> bool:
     assert self.task_exists[task_id], "Task not found"
     assert self.tasks[task_id].status == TASK_STATUS_PENDING, "Task not in pending status"
     
-    # タスク情報の更新
-    task: TaskInfo = self.tasks[task_id]
-    task.status = TASK_STATUS_PROCESSING
-    self.tasks[task_id] = task
+    # タスク情報の更新（ステータスのスロットだけを書き込む）
+    self.tasks[task_id].status = TASK_STATUS_PROCESSING
     
     # イベントの発行
     log TaskProcessing(task_id=task_id, status=TASK_STATUS_PROCESSING, timestamp=block.timestamp)
@@ -309,22 +324,19 @@ def cancel_mcp_request(request_id: bytes32) -> bool:
     # リクエストが完了していないことを確認
     assert not self.mcp_requests[request_id].fulfilled, "Request already fulfilled"
 
-    # リクエスト情報を取得
-    request: MCPRequest = self.mcp_requests[request_id]
-    task: TaskInfo = self.tasks[request.task_id]
+    # リクエスト情報を取得（必要なフィールドだけを読み込む）
+    task_id: bytes32 = self.mcp_requests[request_id].task_id
 
     # 呼び出し元がタスクの所有者またはコントラクトの所有者であることを確認
-    assert task.creator == msg.sender or msg.sender == self.owner, "Not authorized"
+    assert self.tasks[task_id].creator == msg.sender or msg.sender == self.owner, "Not authorized"
 
     # リクエストを完了状態にマークし、結果を空に設定
-    request.fulfilled = True
-    request.result = ""
-    self.mcp_requests[request_id] = request
+    self.mcp_requests[request_id].fulfilled = True
+    self.mcp_requests[request_id].result = ""
 
     # taskのステータスを更新（必要な場合）
-    if task.status == TASK_STATUS_PROCESSING:
-        task.status = TASK_STATUS_FAILED
-        self.tasks[request.task_id] = task
+    if self.tasks[task_id].status == TASK_STATUS_PROCESSING:
+        self.tasks[task_id].status = TASK_STATUS_FAILED
 
     return True
 
@@ -341,22 +353,19 @@ def cancel_oracle_request(request_id: bytes32) -> bool:
     # リクエストが完了していないことを確認
     assert not self.oracle_requests[request_id].fulfilled, "Request already fulfilled"
 
-    # リクエスト情報を取得
-    request: OracleRequest = self.oracle_requests[request_id]
-    task: TaskInfo = self.tasks[request.task_id]
+    # リクエスト情報を取得（必要なフィールドだけを読み込む）
+    task_id: bytes32 = self.oracle_requests[request_id].task_id
 
     # 呼び出し元がタスクの所有者またはコントラクトの所有者であることを確認
-    assert task.creator == msg.sender or msg.sender == self.owner, "Not authorized"
+    assert self.tasks[task_id].creator == msg.sender or msg.sender == self.owner, "Not authorized"
 
     # リクエストを完了状態にマークし、結果を空に設定
-    request.fulfilled = True
-    request.result = ""
-    self.oracle_requests[request_id] = request
+    self.oracle_requests[request_id].fulfilled = True
+    self.oracle_requests[request_id].result = ""
 
     # taskのステータスを更新（必要な場合）
-    if task.status == TASK_STATUS_PROCESSING:
-        task.status = TASK_STATUS_FAILED
-        self.tasks[request.task_id] = task
+    if self.tasks[task_id].status == TASK_STATUS_PROCESSING:
+        self.tasks[task_id].status = TASK_STATUS_FAILED
 
     return True
 
@@ -569,12 +578,10 @@ def complete_task(task_id: bytes32, result: String[1024]) -> bool:
     assert self.task_exists[task_id], "Task not found"
     assert self.tasks[task_id].status == TASK_STATUS_PENDING or self.tasks[task_id].status == TASK_STATUS_PROCESSING, "Task already completed or failed"
     
-    # タスク情報の更新
-    task: TaskInfo = self.tasks[task_id]
-    task.result = result
-    task.completed_at = block.timestamp
-    task.status = TASK_STATUS_COMPLETED
-    self.tasks[task_id] = task
+    # タスク情報の更新（変更するフィールドだけを書き込む）
+    self.tasks[task_id].result = result
+    self.tasks[task_id].completed_at = block.timestamp
+    self.tasks[task_id].status = TASK_STATUS_COMPLETED
     
     # イベントの発行
     log TaskCompleted(task_id=task_id, result=result, timestamp=block.timestamp)
@@ -606,13 +613,29 @@ def get_task_result(task_id: bytes32) -> String[1024]:
 
 @external
 @view
-def get_user_tasks(user: address) -> DynArray[bytes32, 100]:
+def get_user_tasks(user: address, offset: uint256 = 0, limit: uint256 = MAX_PAGE_SIZE) -> DynArray[bytes32, MAX_PAGE_SIZE]:
     """
     @notice ユーザーのタスクリストを取得
+    @dev 全件はuser_task_countを見てoffsetを進めながら取得する
     @param user ユーザーアドレス
+    @param offset 取得を始める位置
+    @param limit 取得する最大件数（MAX_PAGE_SIZEまで）
     @return task_ids タスクIDのリスト
     """
-    return self.user_tasks[user]
+    result: DynArray[bytes32, MAX_PAGE_SIZE] = []
+    for i: uint256 in range(offset, self._page_end(offset, limit, self.user_task_count[user]), bound=MAX_PAGE_SIZE):
+        result.append(self.user_tasks[user][i])
+    return result
+
+@internal
+@pure
+def _page_end(offset: uint256, limit: uint256, count: uint256) -> uint256:
+    """
+    @notice ページの終端位置（offsetから最大limit件、ただしMAX_PAGE_SIZE件まで）
+    """
+    if offset >= count:
+        return offset
+    return min(count, offset + min(limit, MAX_PAGE_SIZE))
 
 ###################################
 # MCP Functions
@@ -654,10 +677,8 @@ def request_firefox_action(task_id: bytes32, action_data: String[1024]) -> bytes
     self.mcp_requests[request_id] = request
     self.mcp_request_exists[request_id] = True
     
-    # タスクのMCPリクエストリストに追加
-    task: TaskInfo = self.tasks[task_id]
-    task.mcp_requests.append(request_id)
-    self.tasks[task_id] = task
+    # タスクのMCPリクエストリストに追加（配列の長さと追加した要素のスロットだけを書き込む）
+    self.tasks[task_id].mcp_requests.append(request_id)
     
     # リクエストカウントの更新
     self.mcp_request_count += 1
@@ -703,10 +724,8 @@ def request_pyppeteer_action(task_id: bytes32, action_data: String[1024]) -> byt
     self.mcp_requests[request_id] = request
     self.mcp_request_exists[request_id] = True
     
-    # タスクのMCPリクエストリストに追加
-    task: TaskInfo = self.tasks[task_id]
-    task.mcp_requests.append(request_id)
-    self.tasks[task_id] = task
+    # タスクのMCPリクエストリストに追加（配列の長さと追加した要素のスロットだけを書き込む）
+    self.tasks[task_id].mcp_requests.append(request_id)
     
     # リクエストカウントの更新
     self.mcp_request_count += 1
@@ -724,18 +743,45 @@ def complete_mcp_request(request_id: bytes32, result: String[1024]) -> bool:
     @param result リクエスト結果
     @return success 成功したかどうか
     """
-    assert msg.sender == self.owner, "Only owner can complete MCP requests"
+    assert self._is_fulfiller(msg.sender), "Only owner or oracle can complete MCP requests"
     assert self.mcp_request_exists[request_id], "Request not found"
     assert not self.mcp_requests[request_id].fulfilled, "Request already fulfilled"
     
     # リクエスト情報の更新
-    request: MCPRequest = self.mcp_requests[request_id]
-    request.fulfilled = True
-    request.result = result
-    self.mcp_requests[request_id] = request
+    self._complete_mcp_request(request_id, result)
     
     return True
 
+@external
+def complete_mcp_requests(request_ids: DynArray[bytes32, MAX_FULFILL_BATCH], results: DynArray[String[1024], MAX_FULFILL_BATCH]) -> uint256:
+    """
+    @notice 複数のMCPリクエストを1トランザクションで完了としてマーク（オラクルから呼び出される）
+    @dev 存在しないリクエストや完了済みのリクエストはスキップする
+    @param request_ids リクエストIDのリスト
+    @param results リクエスト結果のリスト
+    @return completed 完了としてマークした件数
+    """
+    assert self._is_fulfiller(msg.sender), "Only owner or oracle can complete MCP requests"
+    assert len(request_ids) == len(results), "Length mismatch"
+    
+    completed: uint256 = 0
+    for i: uint256 in range(len(request_ids), bound=MAX_FULFILL_BATCH):
+        request_id: bytes32 = request_ids[i]
+        if not self.mcp_request_exists[request_id] or self.mcp_requests[request_id].fulfilled:
+            continue
+        self._complete_mcp_request(request_id, results[i])
+        completed += 1
+    
+    return completed
+
+@internal
+def _complete_mcp_request(request_id: bytes32, result: String[1024]):
+    """
+    @notice MCPリクエストの完了フラグと結果のみを書き込む
+    """
+    self.mcp_requests[request_id].fulfilled = True
+    self.mcp_requests[request_id].result = result
+
 @external
 @view
 def is_mcp_request_fulfilled(request_id: bytes32) -> bool:
@@ -759,6 +805,18 @@ def get_mcp_request_result(request_id: bytes32) -> String[1024]:
     assert self.mcp_requests[request_id].fulfilled, "Request not fulfilled"
     return self.mcp_requests[request_id].result
 
+@external
+@view
+def get_mcp_request(request_id: bytes32) -> MCPRequest:
+    """
+    @notice MCPリクエスト情報を取得（オラクルがアクションデータを読み出すために使用）
+    @param request_id リクエストID
+    @return request リクエスト情報
+    """
+    assert self.mcp_request_exists[request_id], "Request not found"
+    assert self._is_fulfiller(msg.sender), "Not authorized"
+    return self.mcp_requests[request_id]
+
 ###################################
 # Memory Functions
 ###################################
@@ -775,45 +833,7 @@ def store_memory(content: String[1024], tags: DynArray[String[32], 100], priorit
     """
     assert not self.paused, "Contract is paused"
     
-    # メモリIDの生成
-    timestamp_bytes: bytes32 = convert(block.timestamp, bytes32)
-    sender_bytes: bytes32 = convert(msg.sender, bytes32)
-    count_bytes: bytes32 = convert(self.memory_count, bytes32)
-    memory_id: bytes32 = keccak256(concat(timestamp_bytes, sender_bytes, count_bytes))
-    
-    # メモリ情報の作成
-    memory: MemoryEntry = MemoryEntry(
-        id=memory_id,
-        owner=msg.sender,
-        content=content,
-        created_at=block.timestamp,
-        priority=priority,
-        tags=tags,
-        encrypted=encrypted
-    )
-    
-    # メモリの保存
-    self.memories[memory_id] = memory
-    self.memory_exists[memory_id] = True
-    
-    # ユーザーのメモリリストに追加
-    user_memory_list: DynArray[bytes32, 100] = self.user_memories[msg.sender]
-    user_memory_list.append(memory_id)
-    self.user_memories[msg.sender] = user_memory_list
-    
-    # タグインデックスの更新
-    for tag: String[32] in tags:
-        tag_memory_list: DynArray[bytes32, 100] = self.memory_tags[tag]
-        tag_memory_list.append(memory_id)
-        self.memory_tags[tag] = tag_memory_list
-    
-    # メモリカウントの更新
-    self.memory_count += 1
-    
-    # イベントの発行
-    log MemoryStored(memory_id=memory_id, task_id=empty(bytes32), timestamp=block.timestamp)
-    
-    return memory_id
+    return self._store_memory(empty(bytes32), content, tags, priority, encrypted)
 
 @external
 def store_task_memory(task_id: bytes32, content: String[1024], tags: DynArray[String[32], 100], priority: uint8, encrypted: bool) -> bytes32:
@@ -829,6 +849,15 @@ def store_task_memory(task_id: bytes32, content: String[1024], tags: DynArray[St
     assert not self.paused, "Contract is paused"
     assert self.task_exists[task_id], "Task not found"
     
+    return self._store_memory(task_id, content, tags, priority, encrypted)
+
+@internal
+def _store_memory(task_id: bytes32, content: String[1024], tags: DynArray[String[32], 100], priority: uint8, encrypted: bool) -> bytes32:
+    """
+    @notice メモリを保存し、ユーザー・タスク・タグの一覧とユーザー・タグの一覧での位置を記録する
+    @dev 位置は1始まりで保存し、0は一覧に含まれないことを表す（削除時の入れ替えに使う）
+    @dev メモリの存在はownerが空でないことで判定する（削除時にownerを消す）
+    """
     # メモリIDの生成
     timestamp_bytes: bytes32 = convert(block.timestamp, bytes32)
     sender_bytes: bytes32 = convert(msg.sender, bytes32)
@@ -848,23 +877,26 @@ def store_task_memory(task_id: bytes32, content: String[1024], tags: DynArray[St
     
     # メモリの保存
     self.memories[memory_id] = memory
-    self.memory_exists[memory_id] = True
     
     # ユーザーのメモリリストに追加
-    user_memory_list: DynArray[bytes32, 100] = self.user_memories[msg.sender]
-    user_memory_list.append(memory_id)
-    self.user_memories[msg.sender] = user_memory_list
+    memory_position: uint256 = self.user_memory_count[msg.sender] + 1
+    self.user_memories[msg.sender][memory_position - 1] = memory_id
+    self.user_memory_count[msg.sender] = memory_position
+    self.user_memory_position[memory_id] = memory_position
     
-    # タスクのメモリリストに追加
-    task: TaskInfo = self.tasks[task_id]
-    task.memory_entries.append(memory_id)
-    self.tasks[task_id] = task
+    # タスクのメモリリストに追加（配列の長さと追加した要素のスロットだけを書き込む）
+    if task_id != empty(bytes32):
+        self.tasks[task_id].memory_entries.append(memory_id)
+        self.memory_task[memory_id] = task_id
     
-    # タグインデックスの更新
+    # タグインデックスの更新（同じタグが重複して指定された場合は1回だけ追加）
     for tag: String[32] in tags:
-        tag_memory_list: DynArray[bytes32, 100] = self.memory_tags[tag]
-        tag_memory_list.append(memory_id)
-        self.memory_tags[tag] = tag_memory_list
+        if self.memory_tag_position[tag][memory_id] != 0:
+            continue
+        tag_count: uint256 = self.memory_tag_count[tag]
+        self.memory_tags[tag][tag_count] = memory_id
+        self.memory_tag_count[tag] = tag_count + 1
+        self.memory_tag_position[tag][memory_id] = tag_count + 1
     
     # メモリカウントの更新
     self.memory_count += 1
@@ -882,110 +914,197 @@ def get_memory(memory_id: bytes32) -> MemoryEntry:
     @param memory_id メモリID
     @return memory メモリ情報
     """
-    assert self.memory_exists[memory_id], "Memory not found"
+    assert self.memories[memory_id].owner != empty(address), "Memory not found"
     return self.memories[memory_id]
 
 @external
 @view
-def search_memories_by_tag(tag: String[32]) -> DynArray[bytes32, 100]:
+def search_memories_by_tag(tag: String[32], offset: uint256 = 0, limit: uint256 = MAX_PAGE_SIZE) -> DynArray[bytes32, MAX_PAGE_SIZE]:
     """
     @notice タグでメモリを検索
+    @dev 全件はmemory_tag_countを見てoffsetを進めながら取得する
     @param tag 検索するタグ
+    @param offset 取得を始める位置
+    @param limit 取得する最大件数（MAX_PAGE_SIZEまで）
     @return memory_ids メモリIDのリスト
     """
-    return self.memory_tags[tag]
+    result: DynArray[bytes32, MAX_PAGE_SIZE] = []
+    for i: uint256 in range(offset, self._page_end(offset, limit, self.memory_tag_count[tag]), bound=MAX_PAGE_SIZE):
+        result.append(self.memory_tags[tag][i])
+    return result
 
 @external
 @view
-def search_memories_by_tags(tags: DynArray[String[32], 100], require_all: bool) -> DynArray[bytes32, 100]:
+def search_memories_by_tags(tags: DynArray[String[32], 100], require_all: bool, start: uint256 = 0, limit: uint256 = MAX_PAGE_SIZE) -> (DynArray[bytes32, MAX_PAGE_SIZE], uint256):
     """
     @notice 複数のタグでメモリを検索
+    @dev AND検索は件数が最も少ないタグの一覧だけを走査し、他のタグへの所属は位置のマッピングで確認する
+    @dev OR検索はタグの順に一覧を連結して走査し、前のタグにも付いているメモリを飛ばして重複を除く
+    @dev 1回の呼び出しで走査するのはstartから最大list_scan_limit件で、続きは返したカーソルから取得する
+    @dev 検索の途中で一覧が変わるとカーソルの位置がずれるため、大きな検索はmcp/memory_indexer.pyのオフチェーンインデックスを使う
     @param tags 検索するタグのリスト
     @param require_all 全てのタグに一致する必要があるか（AND検索）
+    @param start 走査を始める位置（最初は0、続きは前回返したカーソル）
+    @param limit 取得する最大件数（MAX_PAGE_SIZEまで）
     @return memory_ids メモリIDのリスト
+    @return next_cursor 続きを走査する位置（走査し終えた場合は0）
     """
     assert len(tags) > 0, "At least one tag is required"
     
-    # 最初のタグに一致するメモリを取得
-    result: DynArray[bytes32, 100] = self.memory_tags[tags[0]]
+    page_size: uint256 = min(limit, MAX_PAGE_SIZE)
+    scan_limit: uint256 = self.list_scan_limit
+    result: DynArray[bytes32, MAX_PAGE_SIZE] = []
+    # 次に走査する位置
+    position: uint256 = start
     
     if require_all:
-        # 他のタグに一致するメモリとの共通部分を取得
-        # 最大100個のタグを処理
-        for i: uint256 in range(100):
-            # インデックスが範囲外または処理済みの場合はスキップ
-            if i == 0 or i >= len(tags):
-                continue
-                
-            tag_memories: DynArray[bytes32, 100] = self.memory_tags[tags[i]]
-            new_result: DynArray[bytes32, 100] = []
-            
-            for memory_id: bytes32 in result:
-                for tag_memory_id: bytes32 in tag_memories:
-                    if memory_id == tag_memory_id:
-                        new_result.append(memory_id)
-                        break
-            
-            result = new_result
-    
-    return result
+        # 件数が最も少ないタグを起点にする
+        base_tag: String[32] = tags[0]
+        base_count: uint256 = self.memory_tag_count[base_tag]
+        for i: uint256 in range(1, len(tags), bound=100):
+            tag_count: uint256 = self.memory_tag_count[tags[i]]
+            if tag_count < base_count:
+                base_tag = tags[i]
+                base_count = tag_count
+        
+        if start >= base_count:
+            return result, 0
+        
+        for j: uint256 in range(start, start + min(base_count - start, scan_limit), bound=MAX_LIST_SCAN):
+            if len(result) == page_size:
+                break
+            position = j + 1
+            memory_id: bytes32 = self.memory_tags[base_tag][j]
+            matched: bool = True
+            for tag: String[32] in tags:
+                if self.memory_tag_position[tag][memory_id] == 0:
+                    matched = False
+                    break
+            if matched:
+                result.append(memory_id)
+        
+        if position == base_count:
+            return result, 0
+        return result, position
+    
+    total: uint256 = 0
+    for tag: String[32] in tags:
+        total += self.memory_tag_count[tag]
+    
+    # 走査中の一覧の先頭の位置と、この呼び出しで走査した件数
+    list_start: uint256 = 0
+    scanned: uint256 = 0
+    for i: uint256 in range(len(tags), bound=100):
+        if len(result) == page_size or scanned == scan_limit:
+            break
+        count: uint256 = self.memory_tag_count[tags[i]]
+        if position >= list_start + count:
+            # startより前の一覧は飛ばす
+            list_start += count
+            continue
+        
+        first: uint256 = position - list_start
+        for j: uint256 in range(first, first + min(count - first, scan_limit - scanned), bound=MAX_LIST_SCAN):
+            if len(result) == page_size:
+                break
+            position = list_start + j + 1
+            scanned += 1
+            memory_id: bytes32 = self.memory_tags[tags[i]][j]
+            # 前のタグの一覧で数えたメモリは飛ばす
+            duplicate: bool = False
+            for k: uint256 in range(i, bound=100):
+                if self.memory_tag_position[tags[k]][memory_id] != 0:
+                    duplicate = True
+                    break
+            if not duplicate:
+                result.append(memory_id)
+        list_start += count
+    
+    if position >= total:
+        return result, 0
+    return result, position
 
 @external
 @view
-def get_user_memories(user: address) -> DynArray[bytes32, 100]:
+def get_user_memories(user: address, offset: uint256 = 0, limit: uint256 = MAX_PAGE_SIZE) -> DynArray[bytes32, MAX_PAGE_SIZE]:
     """
     @notice ユーザーのメモリリストを取得
+    @dev 全件はuser_memory_countを見てoffsetを進めながら取得する
     @param user ユーザーアドレス
+    @param offset 取得を始める位置
+    @param limit 取得する最大件数（MAX_PAGE_SIZEまで）
     @return memory_ids メモリIDのリスト
     """
-    return self.user_memories[user]
+    result: DynArray[bytes32, MAX_PAGE_SIZE] = []
+    for i: uint256 in range(offset, self._page_end(offset, limit, self.user_memory_count[user]), bound=MAX_PAGE_SIZE):
+        result.append(self.user_memories[user][i])
+    return result
 
 @external
 def delete_memory(memory_id: bytes32) -> bool:
     """
     @notice メモリを削除
+    @dev 各一覧では末尾の要素を削除位置に移すため、一覧の順序は保たれない
     @param memory_id 削除するメモリID
     @return success 成功したかどうか
     """
-    assert self.memory_exists[memory_id], "Memory not found"
-    memory: MemoryEntry = self.memories[memory_id]
-    assert msg.sender == memory.owner or msg.sender == self.owner, "Only owner can delete memory"
-    
-    # メモリが関連付けられているタスクを検索
-    user_task_list: DynArray[bytes32, 100] = self.user_tasks[memory.owner]
-    for task_id: bytes32 in user_task_list:
-        if self.task_exists[task_id]:
-            task: TaskInfo = self.tasks[task_id]
-            # タスクのメモリリストから削除
-            new_memory_entries: DynArray[bytes32, 10] = []
-            for entry_id: bytes32 in task.memory_entries:
-                if entry_id != memory_id:
-                    new_memory_entries.append(entry_id)
-            task.memory_entries = new_memory_entries
-            self.tasks[task_id] = task
+    memory_owner: address = self.memories[memory_id].owner
+    assert memory_owner != empty(address), "Memory not found"
+    assert msg.sender == memory_owner or msg.sender == self.owner, "Only owner can delete memory"
+    
+    # 関連付けられたタスクのメモリリストから削除（タスクを探さずに保存済みの参照を使い、
+    # 最大10件のリストからメモリを探して末尾の要素と入れ替える）
+    task_id: bytes32 = self.memory_task[memory_id]
+    if task_id != empty(bytes32):
+        last: uint256 = len(self.tasks[task_id].memory_entries)
+        for i: uint256 in range(last, bound=10):
+            if self.tasks[task_id].memory_entries[i] == memory_id:
+                if i != last - 1:
+                    self.tasks[task_id].memory_entries[i] = self.tasks[task_id].memory_entries[last - 1]
+                self.tasks[task_id].memory_entries.pop()
+                break
+        self.memory_task[memory_id] = empty(bytes32)
     
     # タグインデックスから削除
-    for tag: String[32] in memory.tags:
-        tag_memory_list: DynArray[bytes32, 100] = self.memory_tags[tag]
-        new_tag_memory_list: DynArray[bytes32, 100] = []
-        for tag_memory_id: bytes32 in tag_memory_list:
-            if tag_memory_id != memory_id:
-                new_tag_memory_list.append(tag_memory_id)
-        self.memory_tags[tag] = new_tag_memory_list
+    for tag: String[32] in self.memories[memory_id].tags:
+        self._remove_tag_entry(tag, memory_id)
     
     # ユーザーのメモリリストから削除
-    user_memory_list: DynArray[bytes32, 100] = self.user_memories[memory.owner]
-    new_user_memory_list: DynArray[bytes32, 100] = []
-    for user_memory_id: bytes32 in user_memory_list:
-        if user_memory_id != memory_id:
-            new_user_memory_list.append(user_memory_id)
-    self.user_memories[memory.owner] = new_user_memory_list
+    position: uint256 = self.user_memory_position[memory_id]
+    last: uint256 = self.user_memory_count[memory_owner]
+    if position != last:
+        moved_id: bytes32 = self.user_memories[memory_owner][last - 1]
+        self.user_memories[memory_owner][position - 1] = moved_id
+        self.user_memory_position[moved_id] = position
+    self.user_memories[memory_owner][last - 1] = empty(bytes32)
+    self.user_memory_count[memory_owner] = last - 1
+    self.user_memory_position[memory_id] = 0
+    
+    # メモリを存在しない状態にする
+    self.memories[memory_id].owner = empty(address)
     
-    # メモリの存在フラグを更新
-    self.memory_exists[memory_id] = False
+    # イベントの発行
+    log MemoryDeleted(memory_id=memory_id, timestamp=block.timestamp)
     
     return True
 
+@internal
+def _remove_tag_entry(tag: String[32], memory_id: bytes32):
+    """
+    @notice タグのメモリリストから末尾の要素との入れ替えで削除する
+    """
+    position: uint256 = self.memory_tag_position[tag][memory_id]
+    if position == 0:
+        return
+    last: uint256 = self.memory_tag_count[tag]
+    if position != last:
+        moved_id: bytes32 = self.memory_tags[tag][last - 1]
+        self.memory_tags[tag][position - 1] = moved_id
+        self.memory_tag_position[tag][moved_id] = position
+    self.memory_tags[tag][last - 1] = empty(bytes32)
+    self.memory_tag_count[tag] = last - 1
+    self.memory_tag_position[tag][memory_id] = 0
+
 ###################################
 # Oracle Functions
 ###################################
@@ -1025,10 +1144,8 @@ def request_llm_completion(task_id: bytes32, prompt: String[1024]) -> bytes32:
     self.oracle_requests[request_id] = request
     self.oracle_request_exists[request_id] = True
     
-    # タスクのオラクルリクエストリストに追加
-    task: TaskInfo = self.tasks[task_id]
-    task.oracle_requests.append(request_id)
-    self.tasks[task_id] = task
+    # タスクのオラクルリクエストリストに追加（配列の長さと追加した要素のスロットだけを書き込む）
+    self.tasks[task_id].oracle_requests.append(request_id)
     
     # リクエストカウントの更新
     self.oracle_request_count += 1
@@ -1046,18 +1163,45 @@ def complete_oracle_request(request_id: bytes32, result: String[1024]) -> bool:
     @param result リクエスト結果
     @return success 成功したかどうか
     """
-    assert msg.sender == self.owner, "Only owner can complete oracle requests"
+    assert self._is_fulfiller(msg.sender), "Only owner or oracle can complete oracle requests"
     assert self.oracle_request_exists[request_id], "Request not found"
     assert not self.oracle_requests[request_id].fulfilled, "Request already fulfilled"
     
     # リクエスト情報の更新
-    request: OracleRequest = self.oracle_requests[request_id]
-    request.fulfilled = True
-    request.result = result
-    self.oracle_requests[request_id] = request
+    self._complete_oracle_request(request_id, result)
     
     return True
 
+@external
+def complete_oracle_requests(request_ids: DynArray[bytes32, MAX_FULFILL_BATCH], results: DynArray[String[1024], MAX_FULFILL_BATCH]) -> uint256:
+    """
+    @notice 複数のオラクルリクエストを1トランザクションで完了としてマーク（オラクルから呼び出される）
+    @dev 存在しないリクエストや完了済みのリクエストはスキップする
+    @param request_ids リクエストIDのリスト
+    @param results リクエスト結果のリスト
+    @return completed 完了としてマークした件数
+    """
+    assert self._is_fulfiller(msg.sender), "Only owner or oracle can complete oracle requests"
+    assert len(request_ids) == len(results), "Length mismatch"
+    
+    completed: uint256 = 0
+    for i: uint256 in range(len(request_ids), bound=MAX_FULFILL_BATCH):
+        request_id: bytes32 = request_ids[i]
+        if not self.oracle_request_exists[request_id] or self.oracle_requests[request_id].fulfilled:
+            continue
+        self._complete_oracle_request(request_id, results[i])
+        completed += 1
+    
+    return completed
+
+@internal
+def _complete_oracle_request(request_id: bytes32, result: String[1024]):
+    """
+    @notice オラクルリクエストの完了フラグと結果のみを書き込む
+    """
+    self.oracle_requests[request_id].fulfilled = True
+    self.oracle_requests[request_id].result = result
+
 @external
 @view
 def is_oracle_request_fulfilled(request_id: bytes32) -> bool:
@@ -1081,6 +1225,18 @@ def get_oracle_request_result(request_id: bytes32) -> String[1024]:
     assert self.oracle_requests[request_id].fulfilled, "Request not fulfilled"
     return self.oracle_requests[request_id].result
 
+@external
+@view
+def get_oracle_request(request_id: bytes32) -> OracleRequest:
+    """
+    @notice オラクルリクエスト情報を取得（オラクルがプロンプトを読み出すために使用）
+    @param request_id リクエストID
+    @return request リクエスト情報
+    """
+    assert self.oracle_request_exists[request_id], "Request not found"
+    assert self._is_fulfiller(msg.sender), "Not authorized"
+    return self.oracle_requests[request_id]
+
 ###################################
 # Admin Functions
 ###################################
@@ -1097,6 +1253,49 @@ def set_mcp_oracle_address(new_address: address) -> bool:
     self.mcp_oracle_address = new_address
     return True
 
+@external
+def add_mcp_fulfiller(fulfiller: address) -> bool:
+    """
+    @notice リクエストを完了できるオラクル署名アカウントを追加
+    @param fulfiller 追加するアカウント
+    @return success 成功したかどうか
+    """
+    assert msg.sender == self.owner, "Only owner can add fulfillers"
+    assert fulfiller != empty(address), "Fulfiller cannot be zero address"
+    self.mcp_fulfillers[fulfiller] = True
+    return True
+
+@external
+def remove_mcp_fulfiller(fulfiller: address) -> bool:
+    """
+    @notice オラクル署名アカウントを削除
+    @param fulfiller 削除するアカウント
+    @return success 成功したかどうか
+    """
+    assert msg.sender == self.owner, "Only owner can remove fulfillers"
+    self.mcp_fulfillers[fulfiller] = False
+    return True
+
+@internal
+@view
+def _is_fulfiller(account: address) -> bool:
+    """
+    @notice リクエストを完了できるアカウントか確認（オーナー、MCPオラクルアドレス、追加された署名アカウント）
+    """
+    return account == self.owner or account == self.mcp_oracle_address or self.mcp_fulfillers[account]
+
+@external
+def set_list_scan_limit(new_limit: uint256) -> bool:
+    """
+    @notice 複数タグ検索で1回に走査する件数を設定
+    @param new_limit 新しい走査件数（1〜MAX_LIST_SCAN）
+    @return success 成功したかどうか
+    """
+    assert msg.sender == self.owner, "Only owner can set list scan limit"
+    assert new_limit > 0 and new_limit <= MAX_LIST_SCAN, "Invalid list scan limit"
+    self.list_scan_limit = new_limit
+    return True
+
 @external
 def pause() -> bool:
     """
@@ -1176,6 +1375,52 @@ def record_file_upload(
     # オペレーターからの呼び出しか確認
     assert self.fileverse_operators[msg.sender], "Only authorized operators can record uploads"
     
+    self._record_file_upload(task_id, file_hash, name, description, mime_type, size)
+    
+    return True
+
+@external
+def record_file_uploads(
+    task_ids: DynArray[bytes32, MAX_RECORD_BATCH],
+    file_hashes: DynArray[bytes32, MAX_RECORD_BATCH],
+    names: DynArray[String[256], MAX_RECORD_BATCH],
+    descriptions: DynArray[String[512], MAX_RECORD_BATCH],
+    mime_types: DynArray[String[64], MAX_RECORD_BATCH],
+    sizes: DynArray[uint256, MAX_RECORD_BATCH]
+) -> uint256:
+    """
+    @notice 複数のファイルのアップロードを1トランザクションで記録します
+    @param task_ids タスクIDのリスト
+    @param file_hashes ファイルハッシュのリスト
+    @param names ファイル名のリスト
+    @param descriptions ファイルの説明のリスト
+    @param mime_types MIMEタイプのリスト
+    @param sizes ファイルサイズのリスト
+    @return recorded 記録したファイル数
+    """
+    # オペレーターからの呼び出しか確認
+    assert self.fileverse_operators[msg.sender], "Only authorized operators can record uploads"
+    count: uint256 = len(file_hashes)
+    assert len(task_ids) == count and len(names) == count and len(descriptions) == count \
+        and len(mime_types) == count and len(sizes) == count, "Length mismatch"
+    
+    for i: uint256 in range(count, bound=MAX_RECORD_BATCH):
+        self._record_file_upload(task_ids[i], file_hashes[i], names[i], descriptions[i], mime_types[i], sizes[i])
+    
+    return count
+
+@internal
+def _record_file_upload(
+    task_id: bytes32,
+    file_hash: bytes32,
+    name: String[256],
+    description: String[512],
+    mime_type: String[64],
+    size: uint256
+):
+    """
+    @notice ファイル1件のメタデータ、ファイルリスト、アクセス権を書き込みイベントを発行する
+    """
     # ファイルメタデータを作成
     metadata: FileMetadata = FileMetadata(
         file_hash=file_hash,
@@ -1189,26 +1434,24 @@ def record_file_upload(
     )
     
     # タスクのファイルリストに追加
-    task_files: DynArray[bytes32, 100] = self.task_files[task_id]
-    task_files.append(file_hash)
-    self.task_files[task_id] = task_files
+    self.task_files[task_id][self.task_file_count[task_id]] = file_hash
+    self.task_file_count[task_id] += 1
     
     # ファイルのメタデータを保存
     self.file_metadata[file_hash] = metadata
     
     # アップローダーのファイルリストに追加
-    user_files: DynArray[bytes32, 100] = self.user_files[msg.sender]
-    user_files.append(file_hash)
-    self.user_files[msg.sender] = user_files
+    self.user_files[msg.sender][self.user_file_count[msg.sender]] = file_hash
+    self.user_file_count[msg.sender] += 1
     
     # アップローダーにアクセス権を付与
     self.file_access[file_hash][msg.sender] = True
     
     # タスク作成者にもアクセス権を付与
-    task: TaskInfo = self.tasks[task_id]
-    if task.creator != empty(address):
-        self.file_access[file_hash][task.creator] = True
-        log FileAccessGranted(file_hash=file_hash, user=task.creator, grantor=msg.sender)
+    task_creator: address = self.tasks[task_id].creator
+    if task_creator != empty(address):
+        self.file_access[file_hash][task_creator] = True
+        log FileAccessGranted(file_hash=file_hash, user=task_creator, grantor=msg.sender)
     
     # イベントの発行
     metadata_str: String[1024] = concat(
@@ -1220,8 +1463,6 @@ def record_file_upload(
         " bytes)"
     )
     log FileUploaded(task_id=task_id, file_hash=file_hash, metadata=metadata_str, uploader=msg.sender)
-    
-    return True
 
 @external
 def grant_file_access(file_hash: bytes32, user: address) -> bool:
@@ -1259,26 +1500,38 @@ def has_file_access(file_hash: bytes32, user: address) -> bool:
 
 @view
 @external
-def get_task_files(task_id: bytes32) -> DynArray[bytes32, 100]:
+def get_task_files(task_id: bytes32, offset: uint256 = 0, limit: uint256 = MAX_PAGE_SIZE) -> DynArray[bytes32, MAX_PAGE_SIZE]:
     """
     @notice タスクに関連するファイルの一覧を取得します
+    @dev 全件はtask_file_countを見てoffsetを進めながら取得します
     @param task_id タスクID
+    @param offset 取得を始める位置
+    @param limit 取得する最大件数（MAX_PAGE_SIZEまで）
     @return ファイルハッシュの配列
     """
-    return self.task_files[task_id]
+    result: DynArray[bytes32, MAX_PAGE_SIZE] = []
+    for i: uint256 in range(offset, self._page_end(offset, limit, self.task_file_count[task_id]), bound=MAX_PAGE_SIZE):
+        result.append(self.task_files[task_id][i])
+    return result
 
 @view
 @external
-def get_user_files(user: address) -> DynArray[bytes32, 100]:
+def get_user_files(user: address, offset: uint256 = 0, limit: uint256 = MAX_PAGE_SIZE) -> DynArray[bytes32, MAX_PAGE_SIZE]:
     """
     @notice ユーザーがアップロードしたファイルの一覧を取得します
+    @dev 全件はuser_file_countを見てoffsetを進めながら取得します
     @param user ユーザーアドレス
+    @param offset 取得を始める位置
+    @param limit 取得する最大件数（MAX_PAGE_SIZEまで）
     @return ファイルハッシュの配列
     """
     # 呼び出し元が対象ユーザーか所有者か確認
     assert user == msg.sender or msg.sender == self.owner, "Not authorized"
     
-    return self.user_files[user]
+    result: DynArray[bytes32, MAX_PAGE_SIZE] = []
+    for i: uint256 in range(offset, self._page_end(offset, limit, self.user_file_count[user]), bound=MAX_PAGE_SIZE):
+        result.append(self.user_files[user][i])
+    return result
 
 @view
 @external
@@ -1303,4 +1556,23 @@ def get_file_metadata(file_hash: bytes32) -> (String[256], String[512], String[6
         metadata.upload_timestamp,
         metadata.uploader,
         metadata.task_id
-    )
\ No newline at end of file
+    )
+
+@view
+@external
+def get_files_metadata(file_hashes: DynArray[bytes32, 100]) -> DynArray[FileMetadata, 100]:
+    """
+    @notice 複数のファイルのメタデータを一度に取得します
+    @dev 存在しないファイルやアクセス権のないファイルは空のメタデータ（file_hashが0）を返します
+    @param file_hashes ファイルハッシュのリスト
+    @return 同じ順のメタデータのリスト
+    """
+    is_owner: bool = msg.sender == self.owner
+    result: DynArray[FileMetadata, 100] = []
+    for file_hash: bytes32 in file_hashes:
+        metadata: FileMetadata = self.file_metadata[file_hash]
+        if metadata.file_hash != file_hash or not (is_owner or self.file_access[file_hash][msg.sender]):
+            result.append(empty(FileMetadata))
+        else:
+            result.append(metadata)
+    return result
\ No newline at end of file
@@ -3,9 +3,28 @@
 # @author Myrdal Team
 # @notice このコントラクトはFileverseを使用して成果物を提供するためのインターフェースを提供します
 
-# インポートパスを修正
-# カスタムインターフェースのインポート
-# IUserAuthインターフェースを直接定義
+# タスクの構造体（contracts/Myrdal.vyのTaskInfo）
+struct TaskInfo:
+    id: bytes32
+    creator: address
+    prompt: String[1024]
+    result: String[1024]
+    created_at: uint256
+    completed_at: uint256
+    status: uint8
+    mcp_requests: DynArray[bytes32, 10]
+    memory_entries: DynArray[bytes32, 10]
+    oracle_requests: DynArray[bytes32, 5]
+
+
+# 呼び出すコントラクトのインターフェース（このファイル内で定義）
+interface IUserAuth:
+    def is_user_active(user: address) -> bool: view
+
+interface IMyrdalCore:
+    def task_exists(task_id: bytes32) -> bool: view
+    def get_task(task_id: bytes32) -> TaskInfo: view
+
 
 # イベント定義
 event FileUploaded:
@@ -33,15 +52,25 @@ struct FileMetadata:
     task_id: bytes32
 
 
+# 1トランザクションでまとめて記録できるファイル数
+MAX_RECORD_BATCH: constant(uint256) = 50
+# 一覧を1回で返す最大件数
+MAX_PAGE_SIZE: constant(uint256) = 100
+
 # ストレージ変数
 owner: public(address)
 myrdalCore: public(address)
 user_auth: public(address)
 fileverse_operators: public(HashMap[address, bool])
-task_files: public(HashMap[bytes32, DynArray[bytes32, 100]])
+# 一覧は件数とインデックスのマッピングで保持する（追加はO(1)で件数の上限なし）
+task_files: HashMap[bytes32, HashMap[uint256, bytes32]]
+task_file_count: public(HashMap[bytes32, uint256])
 file_metadata: public(HashMap[bytes32, FileMetadata])
-user_files: public(HashMap[address, DynArray[bytes32, 100]])
+user_files: HashMap[address, HashMap[uint256, bytes32]]
+user_file_count: public(HashMap[address, uint256])
 file_access: public(HashMap[bytes32, HashMap[address, bool]])
+# タスクにファイルが関連付け済みか（同じファイルを一覧に重複して追加しないため）
+task_file_linked: public(HashMap[bytes32, HashMap[bytes32, bool]])
 
 # コンストラクタ
 @deploy
@@ -51,175 +80,297 @@ def __init__(_myrdalCore: address, _user_auth: address):
     @param _myrdalCore MyrdalCoreコントラクトのアドレス
     @param _user_auth UserAuthコントラクトのアドレス
     """
-    owner = sender
-    myrdalCore = _myrdalCore
-    user_auth = _user_auth
-    fileverse_operators[sender] = True
+    self.owner = msg.sender
+    self.myrdalCore = _myrdalCore
+    self.user_auth = _user_auth
+    self.fileverse_operators[msg.sender] = True
 
 # 管理者関数
 @external
 def add_fileverse_operator(operator: address) -> bool:
     """
-@notice Fileverseオペレーターを追加します
-@param operator オペレーターのアドレス
-@return 成功したかどうか
-"""
-assert sender == owner, "Only owner can add operators"
-fileverse_operators[operator] = True
-return True
+    @notice Fileverseオペレーターを追加します
+    @param operator オペレーターのアドレス
+    @return 成功したかどうか
+    """
+    assert msg.sender == self.owner, "Only owner can add operators"
+    self.fileverse_operators[operator] = True
+    return True
 
 @external
 def remove_fileverse_operator(operator: address) -> bool:
     """
-@notice Fileverseオペレーターを削除します
-@param operator オペレーターのアドレス
-@return 成功したかどうか
-"""
-assert sender == owner, "Only owner can remove operators"
-fileverse_operators[operator] = False
-return True
+    @notice Fileverseオペレーターを削除します
+    @param operator オペレーターのアドレス
+    @return 成功したかどうか
+    """
+    assert msg.sender == self.owner, "Only owner can remove operators"
+    self.fileverse_operators[operator] = False
+    return True
 
 # ファイルアップロード記録関数（オフチェーンのFileverseマネージャーから呼び出される）
 @external
 def record_file_upload(
-task_id: bytes32, 
-file_hash: bytes32, 
-name: String[256], 
-description: String[512], 
-mime_type: String[64], 
-size: uint256
+    task_id: bytes32, 
+    file_hash: bytes32, 
+    name: String[256], 
+    description: String[512], 
+    mime_type: String[64], 
+    size: uint256
 ) -> bool:
     """
-@notice ファイルのアップロードを記録します
-@param task_id タスクID
-@param file_hash ファイルハッシュ
-@param name ファイル名
-@param description ファイルの説明
-@param mime_type MIMEタイプ
-@param size ファイルサイズ
-@return 成功したかどうか
-"""
-# オペレーターからの呼び出しか確認
-assert fileverse_operators[sender], "Only authorized operators can record uploads"
-
-# ファイルメタデータを作成
-metadata: FileMetadata
-
-metadata = FileMetadata(
-file_hash=file_hash,
-uploader=sender,
-name=name,
-description=description,
-mime_type=mime_type,
-size=size,
-upload_timestamp: timestamp,
-task_id=task_id
-)
-
-# タスクのファイルリストに追加
-task_files[task_id].append(file_hash)
-
-# ファイルのメタデータを保存
-file_metadata[file_hash] = metadata
-
-# アップローダーのファイルリストに追加
-user_files[sender].append(file_hash)
-
-# アップローダーにアクセス権を付与
-file_access[file_hash][sender] = True
-
-# タスク作成者にもアクセス権を付与
-# インポートパスを修正
-# カスタムインターフェースのインポート
-# IMyrdalCoreインターフェースを直接定義
-task_owner: address
-
-task_owner = empty(address)
-task_owner, _, _, _, _, _ = MyrdalCore(myrdalCore).get_task_details(task_id)
-
-if task_owner != empty(address):
-    file_access[file_hash][task_owner] = True
-log FileAccessGranted(file_hash, task_owner, sender)
-
-# イベントの発行
-metadata_str: String[1024]
-metadata_str = concat(
-name, 
-" (", 
-mime_type, 
-", ", 
-convert(size, String[20]), 
-" bytes)"
-)
-log FileUploaded(task_id, file_hash, metadata_str, sender)
-
-return True
+    @notice ファイルのアップロードを記録します
+    @param task_id タスクID
+    @param file_hash ファイルハッシュ
+    @param name ファイル名
+    @param description ファイルの説明
+    @param mime_type MIMEタイプ
+    @param size ファイルサイズ
+    @return 成功したかどうか
+    """
+    # オペレーターからの呼び出しか確認
+    assert self.fileverse_operators[msg.sender], "Only authorized operators can record uploads"
+
+    self._record_file_upload(task_id, file_hash, name, description, mime_type, size)
+
+    return True
+
+# ファイルアップロード一括記録関数
+@external
+def record_file_uploads(
+    task_ids: DynArray[bytes32, MAX_RECORD_BATCH],
+    file_hashes: DynArray[bytes32, MAX_RECORD_BATCH],
+    names: DynArray[String[256], MAX_RECORD_BATCH],
+    descriptions: DynArray[String[512], MAX_RECORD_BATCH],
+    mime_types: DynArray[String[64], MAX_RECORD_BATCH],
+    sizes: DynArray[uint256, MAX_RECORD_BATCH]
+) -> uint256:
+    """
+    @notice 複数のファイルのアップロードを1トランザクションで記録します
+    @param task_ids タスクIDのリスト
+    @param file_hashes ファイルハッシュのリスト
+    @param names ファイル名のリスト
+    @param descriptions ファイルの説明のリスト
+    @param mime_types MIMEタイプのリスト
+    @param sizes ファイルサイズのリスト
+    @return 記録したファイル数
+    """
+    # オペレーターからの呼び出しか確認
+    assert self.fileverse_operators[msg.sender], "Only authorized operators can record uploads"
+    count: uint256 = len(file_hashes)
+    assert len(task_ids) == count and len(names) == count and len(descriptions) == count \
+        and len(mime_types) == count and len(sizes) == count, "Length mismatch"
+
+    for i: uint256 in range(count, bound=MAX_RECORD_BATCH):
+        self._record_file_upload(task_ids[i], file_hashes[i], names[i], descriptions[i], mime_types[i], sizes[i])
+
+    return count
+
+# 既存ファイルのタスクへの関連付け関数（同じ内容のファイルを再アップロードせずに使う場合）
+@external
+def link_file_to_task(task_id: bytes32, file_hash: bytes32) -> bool:
+    """
+    @notice 記録済みのファイルをタスクに関連付けます
+    @dev メタデータ（アップローダー、名前など）は最初の記録のまま変更しません
+    @param task_id タスクID
+    @param file_hash ファイルハッシュ
+    @return 成功したかどうか
+    """
+    # オペレーターからの呼び出しか確認
+    assert self.fileverse_operators[msg.sender], "Only authorized operators can record uploads"
+    assert self.file_metadata[file_hash].file_hash == file_hash, "File not found"
+
+    self._link_file(task_id, file_hash)
+
+    return True
+
+@internal
+def _record_file_upload(
+    task_id: bytes32,
+    file_hash: bytes32,
+    name: String[256],
+    description: String[512],
+    mime_type: String[64],
+    size: uint256
+):
+    """
+    @notice ファイル1件のメタデータ、ファイルリスト、アクセス権を書き込みイベントを発行します
+    @dev 記録済みのファイルはメタデータを上書きせず、タスクへの関連付けだけを行います
+    """
+    if self.file_metadata[file_hash].file_hash == file_hash:
+        self._link_file(task_id, file_hash)
+        return
+
+    # ファイルのメタデータを保存
+    self.file_metadata[file_hash] = FileMetadata(
+        file_hash=file_hash,
+        uploader=msg.sender,
+        name=name,
+        description=description,
+        mime_type=mime_type,
+        size=size,
+        upload_timestamp=block.timestamp,
+        task_id=task_id
+    )
+
+    # タスクとアップローダーのファイルリストに追加
+    self._append_task_file(task_id, file_hash)
+    self.user_files[msg.sender][self.user_file_count[msg.sender]] = file_hash
+    self.user_file_count[msg.sender] += 1
+
+    # アップローダーとタスク作成者にアクセス権を付与
+    self.file_access[file_hash][msg.sender] = True
+    self._grant_task_creator(task_id, file_hash)
+
+    # イベントの発行
+    self._log_file_uploaded(task_id, file_hash, name, mime_type, size, msg.sender)
+
+@internal
+def _link_file(task_id: bytes32, file_hash: bytes32):
+    """
+    @notice 記録済みのファイルをタスクのファイルリストに追加し、呼び出し元とタスク作成者にアクセス権を付与します
+    @dev イベントは最初の記録のメタデータとアップローダーで発行します（関連付け済みの場合はアクセス権の付与のみ）
+    """
+    self.file_access[file_hash][msg.sender] = True
+    self._grant_task_creator(task_id, file_hash)
+
+    if self.task_file_linked[task_id][file_hash]:
+        return
+    self._append_task_file(task_id, file_hash)
+
+    metadata: FileMetadata = self.file_metadata[file_hash]
+    self._log_file_uploaded(task_id, file_hash, metadata.name, metadata.mime_type, metadata.size, metadata.uploader)
+
+@internal
+def _append_task_file(task_id: bytes32, file_hash: bytes32):
+    """
+    @notice タスクのファイルリストの末尾にファイルを追加します
+    """
+    self.task_files[task_id][self.task_file_count[task_id]] = file_hash
+    self.task_file_count[task_id] += 1
+    self.task_file_linked[task_id][file_hash] = True
+
+@internal
+def _grant_task_creator(task_id: bytes32, file_hash: bytes32):
+    """
+    @notice タスク作成者にファイルへのアクセス権を付与します（MyrdalCoreがコントラクトとして設定されている場合）
+    @dev get_taskは存在しないタスクでリバートするため、MyrdalCoreにないタスク（オフチェーンのタスクなど）は付与を省略します
+    """
+    task_owner: address = empty(address)
+    if self.myrdalCore.is_contract:
+        if staticcall IMyrdalCore(self.myrdalCore).task_exists(task_id):
+            task_owner = (staticcall IMyrdalCore(self.myrdalCore).get_task(task_id)).creator
+
+    if task_owner != empty(address):
+        self.file_access[file_hash][task_owner] = True
+        log FileAccessGranted(file_hash=file_hash, user=task_owner, grantor=msg.sender)
+
+@internal
+def _log_file_uploaded(
+    task_id: bytes32,
+    file_hash: bytes32,
+    name: String[256],
+    mime_type: String[64],
+    size: uint256,
+    uploader: address
+):
+    """
+    @notice FileUploadedイベントを発行します
+    """
+    metadata_str: String[1024] = concat(
+        name, 
+        " (", 
+        mime_type, 
+        ", ", 
+        uint2str(size), 
+        " bytes)"
+    )
+    log FileUploaded(task_id=task_id, file_hash=file_hash, metadata=metadata_str, uploader=uploader)
 
 # ファイルアクセス権付与関数
 @external
 def grant_file_access(file_hash: bytes32, user: address) -> bool:
     """
-@notice ファイルへのアクセス権を付与します
-@param file_hash ファイルハッシュ
-@param user アクセス権を付与するユーザー
-@return 成功したかどうか
-"""
-# ファイルが存在するか確認
-assert file_metadata[file_hash].file_hash == file_hash, "File not found"
-
-# 呼び出し元がファイルのアップローダーか所有者か確認
-assert file_metadata[file_hash].uploader == sender or sender == owner, "Not authorized"
+    @notice ファイルへのアクセス権を付与します
+    @param file_hash ファイルハッシュ
+    @param user アクセス権を付与するユーザー
+    @return 成功したかどうか
+    """
+    # ファイルが存在するか確認
+    assert self.file_metadata[file_hash].file_hash == file_hash, "File not found"
 
-# ユーザーが有効か確認
-user_auth: IUserAuth
+    # 呼び出し元がファイルのアップローダーか所有者か確認
+    assert self.file_metadata[file_hash].uploader == msg.sender or msg.sender == self.owner, "Not authorized"
 
-user_auth = IUserAuth(user_auth)
-assert is_user_active(user), "User not active"
+    # ユーザーが有効か確認
+    assert staticcall IUserAuth(self.user_auth).is_user_active(user), "User not active"
 
-# アクセス権を付与
-file_access[file_hash][user] = True
+    # アクセス権を付与
+    self.file_access[file_hash][user] = True
 
-# イベントの発行
-log FileAccessGranted(file_hash, user, sender)
+    # イベントの発行
+    log FileAccessGranted(file_hash=file_hash, user=user, grantor=msg.sender)
 
-return True
+    return True
 
 # ファイルアクセス権確認関数
 @view
 @external
 def has_file_access(file_hash: bytes32, user: address) -> bool:
     """
-@notice ユーザーがファイルへのアクセス権を持っているか確認します
-@param file_hash ファイルハッシュ
-@param user 確認するユーザー
-@return アクセス権を持っているかどうか
-"""
-return file_access[file_hash][user]
+    @notice ユーザーがファイルへのアクセス権を持っているか確認します
+    @param file_hash ファイルハッシュ
+    @param user 確認するユーザー
+    @return アクセス権を持っているかどうか
+    """
+    return self.file_access[file_hash][user]
 
 # タスクのファイル一覧取得関数
 @view
 @external
-def get_task_files(task_id: bytes32) -> DynArray[bytes32, 100]:
+def get_task_files(task_id: bytes32, offset: uint256 = 0, limit: uint256 = MAX_PAGE_SIZE) -> DynArray[bytes32, MAX_PAGE_SIZE]:
     """
-@notice タスクに関連するファイルの一覧を取得します
-@param task_id タスクID
-@return ファイルハッシュの配列
-"""
-return task_files[task_id]
+    @notice タスクに関連するファイルの一覧を取得します
+    @dev 全件はtask_file_countを見てoffsetを進めながら取得します
+    @param task_id タスクID
+    @param offset 取得を始める位置
+    @param limit 取得する最大件数（MAX_PAGE_SIZEまで）
+    @return ファイルハッシュの配列
+    """
+    result: DynArray[bytes32, MAX_PAGE_SIZE] = []
+    for i: uint256 in range(offset, self._page_end(offset, limit, self.task_file_count[task_id]), bound=MAX_PAGE_SIZE):
+        result.append(self.task_files[task_id][i])
+    return result
 
 # ユーザーのファイル一覧取得関数
 @view
 @external
-def get_user_files(user: address) -> DynArray[bytes32, 100]:
+def get_user_files(user: address, offset: uint256 = 0, limit: uint256 = MAX_PAGE_SIZE) -> DynArray[bytes32, MAX_PAGE_SIZE]:
+    """
+    @notice ユーザーがアップロードしたファイルの一覧を取得します
+    @dev 全件はuser_file_countを見てoffsetを進めながら取得します
+    @param user ユーザーアドレス
+    @param offset 取得を始める位置
+    @param limit 取得する最大件数（MAX_PAGE_SIZEまで）
+    @return ファイルハッシュの配列
     """
-@notice ユーザーがアップロードしたファイルの一覧を取得します
-@param user ユーザーアドレス
-@return ファイルハッシュの配列
-"""
-# 呼び出し元が対象ユーザーか所有者か確認
-assert user == sender or sender == owner, "Not authorized"
+    # 呼び出し元が対象ユーザーか所有者か確認
+    assert user == msg.sender or msg.sender == self.owner, "Not authorized"
 
-return user_files[user]
+    result: DynArray[bytes32, MAX_PAGE_SIZE] = []
+    for i: uint256 in range(offset, self._page_end(offset, limit, self.user_file_count[user]), bound=MAX_PAGE_SIZE):
+        result.append(self.user_files[user][i])
+    return result
+
+@internal
+@pure
+def _page_end(offset: uint256, limit: uint256, count: uint256) -> uint256:
+    """
+    @notice ページの終端位置（offsetから最大limit件、ただしMAX_PAGE_SIZE件まで）
+    """
+    if offset >= count:
+        return offset
+    return min(count, offset + min(limit, MAX_PAGE_SIZE))
 
 # ファイルのメタデータ取得関数
 @view
@@ -231,19 +382,37 @@ def get_file_metadata(file_hash: bytes32) -> (String[256], String[512], String[6
     @return name, description, mime_type, size, upload_timestamp, uploader, task_id
     """
     # ファイルが存在するか確認
-    metadata: FileMetadata
-    metadata = file_metadata[file_hash]
-    assert file_hash == file_hash, "File not found"
+    metadata: FileMetadata = self.file_metadata[file_hash]
+    assert metadata.file_hash == file_hash, "File not found"
     
     # アクセス権を確認
-    assert file_access[file_hash][sender] or sender == owner, "Not authorized"
+    assert self.file_access[file_hash][msg.sender] or msg.sender == self.owner, "Not authorized"
     
     return (
-        name,
-        description,
-        mime_type,
-        size,
-        upload_timestamp,
-        uploader,
-        task_id
+        metadata.name,
+        metadata.description,
+        metadata.mime_type,
+        metadata.size,
+        metadata.upload_timestamp,
+        metadata.uploader,
+        metadata.task_id
     )
+
+@view
+@external
+def get_files_metadata(file_hashes: DynArray[bytes32, 100]) -> DynArray[FileMetadata, 100]:
+    """
+    @notice 複数のファイルのメタデータを一度に取得します
+    @dev 存在しないファイルやアクセス権のないファイルは空のメタデータ（file_hashが0）を返します
+    @param file_hashes ファイルハッシュのリスト
+    @return 同じ順のメタデータのリスト
+    """
+    is_owner: bool = msg.sender == self.owner
+    result: DynArray[FileMetadata, 100] = []
+    for file_hash: bytes32 in file_hashes:
+        metadata: FileMetadata = self.file_metadata[file_hash]
+        if metadata.file_hash != file_hash or not (is_owner or self.file_access[file_hash][msg.sender]):
+            result.append(empty(FileMetadata))
+        else:
+            result.append(metadata)
+    return result
@@ -8,6 +8,9 @@ import sys
 from web3 import Web3
 import time
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mcp'))
+from fee_strategy import suggest_fee_params, estimate_gas_limit
+
 # ロギング設定
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -73,13 +76,15 @@ class OasisAgentDeployer:
             if constructor_args is None:
                 constructor_args = []
             
-            # トランザクション作成
-            construct_txn = contract.constructor(*constructor_args).build_transaction({
+            # トランザクション作成（ガスは見積もりに安全マージンを掛けて設定）
+            constructor = contract.constructor(*constructor_args)
+            tx_params = {
                 'from': self.account.address,
                 'nonce': self.web3.eth.get_transaction_count(self.account.address),
-                'gas': 2000000,
-                'gasPrice': self.web3.eth.gas_price
-            })
+                'gas': estimate_gas_limit(constructor.estimate_gas({'from': self.account.address}))
+            }
+            tx_params.update(suggest_fee_params(self.web3))
+            construct_txn = constructor.build_transaction(tx_params)
             
             # トランザクション署名
             signed_txn = self.web3.eth.account.sign_transaction(construct_txn, self.account.key)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# 汎用のバッチャー
+# 項目を溜めておき、件数が上限に達したときか最初の項目から一定時間が経ったときに
+# まとめてコールバックに渡す（オラクルの結果送信とFileverseのアップロード記録で使用）
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Batcher:
+    def __init__(self, flush_callback, max_batch_size, max_latency, max_inflight=1):
+        # async def flush_callback(items)
+        self.flush_callback = flush_callback
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.semaphore = asyncio.Semaphore(max_inflight)
+        self.items = []
+        self._timer = None
+        self._tasks = set()
+
+    async def add(self, item):
+        """項目を追加（上限に達したらその場で送信）"""
+        self.items.append(item)
+        if len(self.items) >= self.max_batch_size:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_latency, self._on_deadline)
+
+    def _on_deadline(self):
+        self._timer = None
+        task = asyncio.ensure_future(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        """溜まっている項目を送信"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.items:
+            return
+
+        batch, self.items = self.items[:self.max_batch_size], self.items[self.max_batch_size:]
+        if self.items:
+            self._timer = asyncio.get_running_loop().call_later(self.max_latency, self._on_deadline)
+
+        async with self.semaphore:
+            try:
+                await self.flush_callback(batch)
+            except Exception as e:
+                logger.error(f"バッチ送信エラー: {str(e)}")
+
+    async def close(self):
+        """残りを送信し、実行中の送信を待つ"""
+        while self.items:
+            await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
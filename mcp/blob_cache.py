@@ -0,0 +1,114 @@
+"""
+Size-bounded local cache of downloaded Fileverse files
+
+Blobs are stored as plain files named after their Fileverse hash. The least
+recently used blobs are evicted once the cache grows past its size limit; file
+modification times record use, so the LRU order survives restarts.
+"""
+
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Directory holding cached blobs
+BLOB_CACHE_DIR = os.getenv('FILEVERSE_BLOB_CACHE_DIR', '.fileverse_blobs')
+# Maximum total size of cached blobs
+BLOB_CACHE_SIZE = int(os.getenv('FILEVERSE_BLOB_CACHE_SIZE', str(1024 * 1024 * 1024)))
+# Prefix of files that are still being downloaded
+PARTIAL_PREFIX = 'partial-'
+
+
+class BlobCache:
+    def __init__(self, directory=BLOB_CACHE_DIR, max_bytes=BLOB_CACHE_SIZE):
+        """
+        Open the blob cache, indexing blobs left by earlier runs.
+
+        Args:
+            directory: Cache directory
+            max_bytes: Maximum total size of cached blobs
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # file hash -> size, least recently used first
+        self.entries = OrderedDict()
+        blobs = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith(PARTIAL_PREFIX):
+                # Left over from an interrupted download
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            blobs.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(blobs):
+            self.entries[name] = size
+        self.total_bytes = sum(self.entries.values())
+
+    def path_for(self, file_hash):
+        return os.path.join(self.directory, file_hash)
+
+    def partial_path(self):
+        """Temporary path in the cache directory for a download in progress."""
+        fd, path = tempfile.mkstemp(prefix=PARTIAL_PREFIX, dir=self.directory)
+        os.close(fd)
+        return path
+
+    def get(self, file_hash):
+        """Return the cached path for a file hash and mark it as used, or None."""
+        with self.lock:
+            if file_hash not in self.entries:
+                return None
+            path = self.path_for(file_hash)
+            if not os.path.exists(path):
+                self.total_bytes -= self.entries.pop(file_hash)
+                return None
+            self.entries.move_to_end(file_hash)
+            now = time.time()
+            os.utime(path, (now, now))
+            return path
+
+    def put(self, file_hash, source_path):
+        """
+        Move a downloaded file into the cache.
+
+        Returns:
+            Cached path of the blob
+        """
+        size = os.path.getsize(source_path)
+        path = self.path_for(file_hash)
+        with self.lock:
+            os.replace(source_path, path)
+            self.total_bytes += size - self.entries.pop(file_hash, 0)
+            self.entries[file_hash] = size
+            self._evict(keep=file_hash)
+        return path
+
+    def copy_to(self, file_hash, dest_path):
+        """Copy a cached blob to dest_path; returns dest_path, or None if it is not cached."""
+        path = self.get(file_hash)
+        if path is None:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+        shutil.copyfile(path, dest_path)
+        return dest_path
+
+    def _evict(self, keep):
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            file_hash = next(iter(self.entries))
+            if file_hash == keep:
+                break
+            self.total_bytes -= self.entries.pop(file_hash)
+            try:
+                os.remove(self.path_for(file_hash))
+            except FileNotFoundError:
+                pass
+            logger.info(f"Evicted {file_hash} from the blob cache")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# オラクルのチェックポイントストア
+# 処理済みブロックのカーソルと処理済みリクエストIDをSQLiteに永続化する
+
+import os
+import time
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DB_PATH = os.getenv('ORACLE_CHECKPOINT_DB', 'oracle_checkpoint.db')
+
+
+class CheckpointStore:
+    def __init__(self, path=CHECKPOINT_DB_PATH, name='default'):
+        self.path = path
+        self.name = name
+        self.conn = sqlite3.connect(path)
+        # 書き込みのたびにfsyncしないようにWALモードを使用
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS cursors ('
+            'name TEXT PRIMARY KEY, block_number INTEGER NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS processed_requests ('
+            'request_id BLOB PRIMARY KEY, block_number INTEGER, processed_at REAL NOT NULL, '
+            "state TEXT NOT NULL DEFAULT 'submitted')"
+        )
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(processed_requests)')]
+        if 'state' not in columns:
+            # 状態列がない古いデータベースは既存の行を送信済みとして扱う
+            self.conn.execute(
+                "ALTER TABLE processed_requests ADD COLUMN state TEXT NOT NULL DEFAULT 'submitted'"
+            )
+        self.conn.commit()
+
+    def get_cursor(self):
+        """最後に処理し終えたブロック番号を取得（未保存の場合はNone）"""
+        row = self.conn.execute(
+            'SELECT block_number FROM cursors WHERE name = ?', (self.name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, block_number):
+        """最後に処理し終えたブロック番号を保存（巻き戻しはしない）"""
+        self.conn.execute(
+            'INSERT INTO cursors (name, block_number, updated_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET block_number = excluded.block_number, updated_at = excluded.updated_at '
+            'WHERE excluded.block_number > cursors.block_number',
+            (self.name, block_number, time.time())
+        )
+        self.conn.commit()
+
+    def rewind(self, block_number):
+        """リオルグで置き換えられたブロック以降のカーソルと処理済み記録を取り消す"""
+        self.conn.execute(
+            'UPDATE cursors SET block_number = ?, updated_at = ? WHERE name = ? AND block_number >= ?',
+            (block_number - 1, time.time(), self.name, block_number)
+        )
+        self.conn.execute(
+            'DELETE FROM processed_requests WHERE block_number IS NOT NULL AND block_number >= ?',
+            (block_number,)
+        )
+        self.conn.commit()
+
+    def is_processed(self, request_id):
+        """リクエストが処理済みか確認"""
+        row = self.conn.execute(
+            'SELECT 1 FROM processed_requests WHERE request_id = ?', (bytes(request_id),)
+        ).fetchone()
+        return row is not None
+
+    def get_state(self, request_id):
+        """処理済みリクエストの状態（submitted / confirmed / failed）を取得（未処理の場合はNone）"""
+        row = self.conn.execute(
+            'SELECT state FROM processed_requests WHERE request_id = ?', (bytes(request_id),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def mark_processed(self, request_id, block_number=None, state='submitted'):
+        """リクエストを処理済みとして記録（状態は更新する）"""
+        self.conn.execute(
+            'INSERT INTO processed_requests (request_id, block_number, processed_at, state) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(request_id) DO UPDATE SET state = excluded.state, '
+            'block_number = COALESCE(excluded.block_number, processed_requests.block_number)',
+            (bytes(request_id), block_number, time.time(), state)
+        )
+        self.conn.commit()
+
+    def prune_processed(self, before_block):
+        """カーソルより十分古い処理済みリクエストを削除"""
+        self.conn.execute(
+            'DELETE FROM processed_requests WHERE block_number IS NOT NULL AND block_number < ?',
+            (before_block,)
+        )
+        self.conn.commit()
+
+    def close(self):
+        """接続をクローズ"""
+        self.conn.close()
@@ -0,0 +1,145 @@
+"""
+Streaming, segmented downloads of Fileverse files
+
+Files are streamed straight to disk. When the server supports range requests
+and the file is larger than one segment, segments are fetched in parallel and
+written at their offsets. The result is verified against the expected size and
+SHA-256 digest before it is handed back.
+
+Download protocol:
+    HEAD {api_url}/{file_hash}  -> Content-Length, Accept-Ranges, X-Content-SHA256 (optional)
+    GET  {api_url}/{file_hash}  (Range: bytes=start-end for segments)
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from content_index import file_digest
+
+logger = logging.getLogger(__name__)
+
+# Size of each range request
+SEGMENT_SIZE = int(os.getenv('FILEVERSE_DOWNLOAD_SEGMENT_SIZE', str(8 * 1024 * 1024)))
+# Number of segments of one file fetched at the same time
+SEGMENT_CONCURRENCY = int(os.getenv('FILEVERSE_DOWNLOAD_CONCURRENCY', '4'))
+# Attempts per segment before the download fails
+SEGMENT_RETRIES = 5
+# Size of the blocks written to disk while streaming
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+
+class IntegrityError(Exception):
+    """Raised when downloaded content does not match the expected size or digest."""
+
+
+class SegmentedDownloader:
+    def __init__(self, api_url, api_key, http_session=None, segment_size=SEGMENT_SIZE,
+                 concurrency=SEGMENT_CONCURRENCY, retries=SEGMENT_RETRIES):
+        """
+        Initialize the downloader.
+
+        Args:
+            api_url: Fileverse files endpoint
+            api_key: Fileverse API key
+            http_session: requests.Session to reuse (optional)
+            segment_size: Range request size in bytes
+            concurrency: Number of segments fetched in parallel
+            retries: Attempts per segment
+        """
+        self.api_url = api_url.rstrip('/')
+        self.api_key = api_key
+        self.http_session = http_session or requests.Session()
+        self.segment_size = segment_size
+        self.concurrency = concurrency
+        self.retries = retries
+
+    def _headers(self):
+        return {'Authorization': f'Bearer {self.api_key}'}
+
+    def download(self, file_hash, dest_path, expected_sha256=None, expected_size=None):
+        """
+        Download a file to dest_path and verify it.
+
+        Args:
+            file_hash: Fileverse file hash
+            dest_path: Path the file is written to
+            expected_sha256: SHA-256 hex digest the content must match (optional)
+            expected_size: Size in bytes the content must match (optional)
+
+        Returns:
+            Tuple of the SHA-256 hex digest of the downloaded content and whether
+            it was checked against a known digest (expected_sha256 or the
+            X-Content-SHA256 header)
+
+        Raises:
+            IntegrityError: If the content does not match the expected size or digest
+        """
+        url = f"{self.api_url}/{file_hash}"
+        response = self.http_session.head(url, headers=self._headers())
+        response.raise_for_status()
+        size = int(response.headers.get('Content-Length', -1))
+        expected_sha256 = expected_sha256 or response.headers.get('X-Content-SHA256')
+        if expected_size is not None and size >= 0 and size != expected_size:
+            raise IntegrityError(f"{file_hash}: server reports {size} bytes, expected {expected_size}")
+
+        if response.headers.get('Accept-Ranges') == 'bytes' and size > self.segment_size:
+            self._download_segments(url, dest_path, size)
+        else:
+            self._download_stream(url, dest_path)
+
+        actual_size = os.path.getsize(dest_path)
+        if expected_size is not None and actual_size != expected_size:
+            raise IntegrityError(f"{file_hash}: downloaded {actual_size} bytes, expected {expected_size}")
+        digest = file_digest(dest_path)
+        if expected_sha256 and digest != expected_sha256.lower():
+            raise IntegrityError(f"{file_hash}: SHA-256 mismatch")
+        return digest, bool(expected_sha256)
+
+    def _download_stream(self, url, dest_path):
+        """Stream the whole file to disk with one request."""
+        with self.http_session.get(url, headers=self._headers(), stream=True) as response:
+            response.raise_for_status()
+            with open(dest_path, 'wb') as f:
+                for block in response.iter_content(STREAM_BLOCK_SIZE):
+                    f.write(block)
+
+    def _download_segments(self, url, dest_path, size):
+        """Fetch byte ranges in parallel and write each at its offset."""
+        with open(dest_path, 'wb') as f:
+            f.truncate(size)
+
+        segments = [
+            (offset, min(offset + self.segment_size, size) - 1)
+            for offset in range(0, size, self.segment_size)
+        ]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for future in [executor.submit(self._get_segment, url, dest_path, *segment) for segment in segments]:
+                future.result()
+
+    def _get_segment(self, url, dest_path, start, end):
+        """Fetch one range, retrying with backoff."""
+        headers = dict(self._headers(), Range=f"bytes={start}-{end}")
+        for attempt in range(self.retries):
+            try:
+                with self.http_session.get(url, headers=headers, stream=True) as response:
+                    if response.status_code == 206:
+                        written = 0
+                        with open(dest_path, 'r+b') as f:
+                            f.seek(start)
+                            for block in response.iter_content(STREAM_BLOCK_SIZE):
+                                f.write(block)
+                                written += len(block)
+                        if written == end - start + 1:
+                            return
+                        logger.warning(f"Segment {start}-{end} truncated at {written} bytes")
+                    else:
+                        logger.warning(f"Segment {start}-{end} rejected ({response.status_code})")
+            except requests.RequestException as e:
+                logger.warning(f"Segment {start}-{end} failed: {e}")
+            time.sleep(min(2 ** attempt * 0.1, 5))
+
+        raise RuntimeError(f"Segment {start}-{end} failed after {self.retries} attempts")
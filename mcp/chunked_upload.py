@@ -0,0 +1,241 @@
+"""
+Chunked, resumable uploads for large Fileverse artifacts
+
+Files are streamed in fixed-size chunks, each sent with its SHA-256 checksum so
+the server can reject corrupted chunks. The upload session is persisted locally,
+so an interrupted upload resumes from the chunks the server already has instead
+of restarting from zero. Chunks are sent in parallel where the API allows it.
+
+Upload protocol:
+    POST {api_url}/uploads                       -> {"upload_id": ...}
+    GET  {api_url}/uploads/{upload_id}           -> {"received": [chunk indexes]}
+    PUT  {api_url}/uploads/{upload_id}/chunks/N  (X-Chunk-SHA256 header)
+    POST {api_url}/uploads/{upload_id}/complete  -> {"hash": ...}
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Size of each uploaded chunk
+CHUNK_SIZE = int(os.getenv('FILEVERSE_CHUNK_SIZE', str(8 * 1024 * 1024)))
+# Number of chunks sent at the same time
+CHUNK_CONCURRENCY = int(os.getenv('FILEVERSE_CHUNK_CONCURRENCY', '4'))
+# Attempts per chunk before the upload is suspended
+CHUNK_RETRIES = 5
+# Files at least this large are uploaded in chunks
+CHUNKED_UPLOAD_THRESHOLD = int(os.getenv('FILEVERSE_CHUNKED_UPLOAD_THRESHOLD', str(64 * 1024 * 1024)))
+# Directory where resumable upload sessions are stored
+UPLOAD_SESSION_DIR = os.getenv('FILEVERSE_UPLOAD_SESSION_DIR', '.fileverse_uploads')
+
+
+def chunk_ranges(size, chunk_size):
+    """Split a file size into (index, offset, length) chunk ranges."""
+    return [
+        (index, offset, min(chunk_size, size - offset))
+        for index, offset in enumerate(range(0, size, chunk_size))
+    ]
+
+
+def read_chunk(file_path, offset, length):
+    """Read one chunk of a file."""
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+class UploadSessionStore:
+    """Persists upload sessions so interrupted uploads can be resumed."""
+
+    def __init__(self, directory=UPLOAD_SESSION_DIR):
+        # The directory is created when the first session is saved
+        self.directory = directory
+
+    def key(self, file_path, chunk_size):
+        """Session key for a file; changes when the file is modified."""
+        stat = os.stat(file_path)
+        identity = f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}:{chunk_size}"
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key):
+        """Load a session, or None if there is none."""
+        try:
+            with open(self._path(key), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def save(self, key, session):
+        """Write a session atomically."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(session, f)
+        os.replace(tmp_path, self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class ChunkedUploader:
+    def __init__(self, api_url, api_key, http_session=None, chunk_size=CHUNK_SIZE,
+                 concurrency=CHUNK_CONCURRENCY, retries=CHUNK_RETRIES, session_store=None):
+        """
+        Initialize the chunked uploader.
+
+        Args:
+            api_url: Fileverse files endpoint
+            api_key: Fileverse API key
+            http_session: requests.Session to reuse (optional)
+            chunk_size: Chunk size in bytes
+            concurrency: Number of chunks sent in parallel
+            retries: Attempts per chunk
+            session_store: UploadSessionStore for resumable sessions (optional)
+        """
+        self.api_url = api_url.rstrip('/')
+        self.api_key = api_key
+        self.http_session = http_session or requests.Session()
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.retries = retries
+        self.session_store = session_store or UploadSessionStore()
+
+    def _headers(self):
+        return {'Authorization': f'Bearer {self.api_key}'}
+
+    def upload(self, file_path, name, mime_type, metadata):
+        """
+        Upload a file in chunks, resuming a previous session when one exists.
+
+        Args:
+            file_path: Path to the file to upload
+            name: File name
+            mime_type: File MIME type
+            metadata: Metadata sent when the upload session is created
+
+        Returns:
+            File hash if successful, None otherwise (the session is kept for resuming)
+        """
+        size = os.path.getsize(file_path)
+        key = self.session_store.key(file_path, self.chunk_size)
+        chunks = chunk_ranges(size, self.chunk_size)
+
+        try:
+            session = self._resume_session(key)
+            if session is None:
+                session = self._create_session(key, name, mime_type, size, len(chunks), metadata)
+
+            received = set(session['received'])
+            pending = [chunk for chunk in chunks if chunk[0] not in received]
+            if received:
+                logger.info(f"Resuming upload {session['upload_id']}: {len(received)}/{len(chunks)} chunks already sent")
+
+            lock = threading.Lock()
+
+            def send(chunk):
+                index, offset, length = chunk
+                self._put_chunk(session['upload_id'], index, file_path, offset, length)
+                with lock:
+                    session['received'].append(index)
+                    self.session_store.save(key, session)
+
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                # Raise the first failure after the other chunks have finished
+                for future in [executor.submit(send, chunk) for chunk in pending]:
+                    future.result()
+
+            response = self.http_session.post(
+                f"{self.api_url}/uploads/{session['upload_id']}/complete",
+                headers=self._headers()
+            )
+            response.raise_for_status()
+            file_hash = response.json().get('hash')
+            if not file_hash:
+                logger.error("File hash not found in Fileverse response")
+                return None
+
+            self.session_store.delete(key)
+            logger.info(f"Chunked upload completed: {file_hash}")
+            return file_hash
+
+        except Exception as e:
+            logger.error(f"Chunked upload suspended, it will resume on the next attempt: {e}")
+            return None
+
+    def _resume_session(self, key):
+        """Reload a stored session and sync its received chunks with the server."""
+        session = self.session_store.load(key)
+        if session is None:
+            return None
+
+        response = self.http_session.get(
+            f"{self.api_url}/uploads/{session['upload_id']}",
+            headers=self._headers()
+        )
+        if response.status_code == 404:
+            # The server expired the session; start over
+            self.session_store.delete(key)
+            return None
+        response.raise_for_status()
+
+        session['received'] = sorted(set(response.json().get('received', [])))
+        self.session_store.save(key, session)
+        return session
+
+    def _create_session(self, key, name, mime_type, size, chunk_count, metadata):
+        response = self.http_session.post(
+            f"{self.api_url}/uploads",
+            json={
+                'name': name,
+                'mime_type': mime_type,
+                'size': size,
+                'chunk_size': self.chunk_size,
+                'chunk_count': chunk_count,
+                'metadata': metadata
+            },
+            headers=self._headers()
+        )
+        response.raise_for_status()
+        session = {'upload_id': response.json()['upload_id'], 'received': []}
+        self.session_store.save(key, session)
+        return session
+
+    def _put_chunk(self, upload_id, index, file_path, offset, length):
+        """Send one chunk with its checksum, retrying with backoff."""
+        data = read_chunk(file_path, offset, length)
+        checksum = hashlib.sha256(data).hexdigest()
+        headers = dict(self._headers(), **{
+            'X-Chunk-SHA256': checksum,
+            'Content-Range': f"bytes {offset}-{offset + length - 1}/*"
+        })
+
+        for attempt in range(self.retries):
+            try:
+                response = self.http_session.put(
+                    f"{self.api_url}/uploads/{upload_id}/chunks/{index}",
+                    data=data,
+                    headers=headers
+                )
+                if response.status_code in (200, 201, 204):
+                    return
+                logger.warning(f"Chunk {index} rejected ({response.status_code}): {response.text}")
+            except requests.RequestException as e:
+                logger.warning(f"Chunk {index} failed: {e}")
+            time.sleep(min(2 ** attempt * 0.1, 5))
+
+        raise RuntimeError(f"Chunk {index} failed after {self.retries} attempts")
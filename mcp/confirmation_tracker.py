@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# ブロック駆動の確認トラッカー
+# トランザクションごとに受領をポーリングするのではなく、新しいブロックごとに
+# 監視中の全トランザクションの受領をまとめて取得し、待機中のFutureを解決する
+# 確認数が指定された場合は、受領のブロックが十分な深さになるまで解決しない
+# （リオルグで受領が消えたり別のブロックに移った場合も毎ブロック取り直すので追従する）
+
+import asyncio
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 新しいブロックの確認間隔（秒）
+BLOCK_POLL_INTERVAL = 1
+# 解決済みの受領を保持する件数（解決後にwatchされた場合に使う）
+RECEIPT_CACHE_SIZE = 1000
+# 受領を確定とみなす確認数（1の場合は採掘された時点で確定）
+CONFIRMATIONS = 1
+
+
+class ConfirmationTracker:
+    def __init__(self, web3, poll_interval=BLOCK_POLL_INTERVAL, confirmations=CONFIRMATIONS):
+        self.web3 = web3
+        self.poll_interval = poll_interval
+        self.confirmations = confirmations
+        self.last_block = None
+        # tx_hash -> 受領を待つFuture
+        self.watched = {}
+        self.recent_receipts = OrderedDict()
+        # 新しいブロックごとに呼ばれるコールバック（async def callback(block_number)）
+        self.block_listeners = []
+
+    def watch(self, tx_hash):
+        """トランザクションの受領を待つFutureを返す"""
+        future = self.watched.get(tx_hash)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            if tx_hash in self.recent_receipts:
+                future.set_result(self.recent_receipts[tx_hash])
+            else:
+                self.watched[tx_hash] = future
+        return future
+
+    def unwatch(self, tx_hash):
+        """監視を取りやめる"""
+        future = self.watched.pop(tx_hash, None)
+        if future and not future.done():
+            future.cancel()
+
+    async def wait_for_receipt(self, tx_hash, timeout=None):
+        """受領が得られるまで待機"""
+        return await asyncio.wait_for(asyncio.shield(self.watch(tx_hash)), timeout)
+
+    def add_block_listener(self, callback):
+        """新しいブロックごとのコールバックを登録"""
+        self.block_listeners.append(callback)
+
+    async def run(self):
+        """新しいブロックを検出するたびに受領を確認する"""
+        while True:
+            try:
+                block_number = await self.web3.eth.block_number
+                if self.last_block is None or block_number > self.last_block:
+                    self.last_block = block_number
+                    await self.on_new_block(block_number)
+            except Exception as e:
+                logger.error(f"ブロック確認エラー: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def on_new_block(self, block_number):
+        """監視中のトランザクションの受領をまとめて取得し、リスナーに通知"""
+        if self.watched:
+            tx_hashes = list(self.watched)
+            receipts = await asyncio.gather(
+                *(self._get_receipt(tx_hash) for tx_hash in tx_hashes)
+            )
+            for tx_hash, receipt in zip(tx_hashes, receipts):
+                if receipt is None:
+                    continue
+                if self.confirmations > 1 and block_number - receipt['blockNumber'] + 1 < self.confirmations:
+                    # 確認数が足りない間は監視を続ける
+                    continue
+                future = self.watched.pop(tx_hash, None)
+                if future and not future.done():
+                    future.set_result(receipt)
+                self.recent_receipts[tx_hash] = receipt
+                if len(self.recent_receipts) > RECEIPT_CACHE_SIZE:
+                    self.recent_receipts.popitem(last=False)
+
+        for callback in self.block_listeners:
+            try:
+                await callback(block_number)
+            except Exception as e:
+                logger.error(f"ブロックリスナーエラー: {str(e)}")
+
+    async def _get_receipt(self, tx_hash):
+        try:
+            return await self.web3.eth.get_transaction_receipt(tx_hash)
+        except Exception:
+            # 未採掘（TransactionNotFound）
+            return None
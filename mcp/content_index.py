@@ -0,0 +1,100 @@
+"""
+Content-addressed index of files already uploaded to Fileverse
+
+Maps the SHA-256 digest of a file's bytes to the Fileverse hash it was stored
+under, so byte-identical artifacts (re-saved screenshots, PDFs, ...) are linked
+to the existing Fileverse file instead of being uploaded again.
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# SQLite database holding the content index
+CONTENT_INDEX_DB = os.getenv('FILEVERSE_CONTENT_INDEX_DB', '.fileverse_content_index.db')
+# Block size used when hashing files
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_digest(file_path):
+    """SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ContentIndex:
+    def __init__(self, path=CONTENT_INDEX_DB):
+        """
+        Open (or create) the content index.
+
+        Args:
+            path: SQLite database path
+        """
+        self.path = path
+        # Uploads may run on worker threads
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS contents ('
+            'sha256 TEXT PRIMARY KEY, file_hash TEXT NOT NULL, size INTEGER NOT NULL, '
+            'mime_type TEXT, uploaded_at REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS contents_file_hash ON contents (file_hash)')
+        self.conn.commit()
+
+    def lookup(self, digest, size):
+        """
+        Find the Fileverse file holding the given content.
+
+        Args:
+            digest: SHA-256 hex digest of the content
+            size: Content size in bytes
+
+        Returns:
+            Dict with file_hash, size and mime_type, or None if the content is unknown
+        """
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT file_hash, size, mime_type FROM contents WHERE sha256 = ?', (digest,)
+            ).fetchone()
+        if row is None or row[1] != size:
+            return None
+        return {'file_hash': row[0], 'size': row[1], 'mime_type': row[2]}
+
+    def digest_for(self, file_hash):
+        """Return the SHA-256 hex digest recorded for a Fileverse hash, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT sha256 FROM contents WHERE file_hash = ?', (file_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def add(self, digest, file_hash, size, mime_type):
+        """Record that the content with this digest is stored under file_hash."""
+        with self.lock:
+            self.conn.execute(
+                'INSERT INTO contents (sha256, file_hash, size, mime_type, uploaded_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(sha256) DO UPDATE SET file_hash = excluded.file_hash, size = excluded.size, '
+                'mime_type = excluded.mime_type, uploaded_at = excluded.uploaded_at',
+                (digest, file_hash, size, mime_type, time.time())
+            )
+            self.conn.commit()
+
+    def remove(self, digest):
+        """Forget a content digest (e.g. when the Fileverse file was deleted)."""
+        with self.lock:
+            self.conn.execute('DELETE FROM contents WHERE sha256 = ?', (digest,))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# コントラクトイベントをSQLiteに取り込むインデクサーの共通部分
+# カーソルの保存、リオルグでの取り消しと再スキャン、チェックポイント、起動処理をまとめ、
+# 各インデクサーはイベントの解釈と記録だけを実装する
+
+import os
+import asyncio
+import sqlite3
+import logging
+from abc import ABC, abstractmethod
+
+from web3 import AsyncWeb3
+
+from event_scanner import EventScanner
+from confirmation_tracker import ConfirmationTracker
+from header_tracker import HeaderTracker
+from rpc_client import BatchingAsyncHTTPProvider
+
+logger = logging.getLogger(__name__)
+
+# カーソルの保存間隔（秒）
+INDEX_CHECKPOINT_INTERVAL = 10
+
+
+class EventIndex(ABC):
+    """イベントを記録するSQLiteデータベース（テーブルはcreate_tablesで作成）"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS cursors (name TEXT PRIMARY KEY, block_number INTEGER NOT NULL)'
+        )
+        self.create_tables()
+        self.conn.commit()
+
+    @abstractmethod
+    def create_tables(self):
+        """イベントを記録するテーブルとインデックスを作成"""
+
+    @abstractmethod
+    def discard_from(self, block_number):
+        """指定したブロック以降の記録を取り消す（コミットはrewindで行う）"""
+
+    def get_cursor(self, name='default'):
+        """最後に取り込み終えたブロック番号を取得（未保存の場合はNone）"""
+        row = self.conn.execute('SELECT block_number FROM cursors WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, block_number, name='default'):
+        """最後に取り込み終えたブロック番号を保存"""
+        self.conn.execute(
+            'INSERT INTO cursors (name, block_number) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET block_number = excluded.block_number',
+            (name, block_number)
+        )
+        self.conn.commit()
+
+    def rewind(self, block_number, name='default'):
+        """リオルグで置き換えられたブロック以降の記録を取り消し、カーソルを戻す"""
+        self.discard_from(block_number)
+        self.conn.execute(
+            'UPDATE cursors SET block_number = ? WHERE name = ? AND block_number >= ?',
+            (block_number - 1, name, block_number)
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class EventIndexer(ABC):
+    """event_namesのイベントをスキャンし、handle_eventでindexに記録し続ける"""
+
+    # 取り込むイベント
+    event_names = []
+    # リオルグのログに表示する記録の種類
+    record_label = 'イベント'
+
+    def __init__(self, web3, contract, index, ws_url=None, start_block=None):
+        self.web3 = web3
+        self.contract = contract
+        self.index = index
+        cursor = index.get_cursor()
+        self.scanner = EventScanner(
+            web3,
+            contract,
+            self.event_names,
+            ws_url=ws_url,
+            start_block=cursor + 1 if cursor is not None else start_block
+        )
+        # 新しいブロックごとにリオルグを確認する
+        self.block_tracker = ConfirmationTracker(web3)
+        self.header_tracker = HeaderTracker(web3)
+        self.header_tracker.add_reorg_listener(self.handle_reorg)
+        self.block_tracker.add_block_listener(self.header_tracker.on_new_block)
+
+    @abstractmethod
+    async def handle_event(self, event):
+        """スキャンしたイベントを1件記録する"""
+
+    async def handle_reorg(self, fork_block):
+        """置き換えられたブロック以降の記録を消して再スキャンする"""
+        logger.warning(f"リオルグ: ブロック{fork_block}以降の{self.record_label}記録を取り込み直します")
+        self.index.rewind(fork_block)
+        self.scanner.rewind(fork_block)
+
+    def save_checkpoint(self):
+        """取り込み終えたブロックまでをカーソルとして保存"""
+        if self.scanner.next_block is not None and self.scanner.next_block > 0:
+            self.index.set_cursor(self.scanner.next_block - 1)
+
+    async def checkpoint_loop(self):
+        while True:
+            await asyncio.sleep(INDEX_CHECKPOINT_INTERVAL)
+            try:
+                self.save_checkpoint()
+            except Exception as e:
+                logger.error(f"チェックポイント保存エラー: {str(e)}")
+
+    async def run(self):
+        """イベントを取り込み続ける"""
+        workers = [
+            asyncio.create_task(self.block_tracker.run()),
+            asyncio.create_task(self.checkpoint_loop())
+        ]
+        try:
+            async for event in self.scanner.events():
+                await self.handle_event(event)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self.save_checkpoint()
+
+
+async def run_indexer(indexer_class, index, address, abi, start_block=None):
+    """環境変数のノードに接続し、indexを閉じるまでインデクサーを実行する"""
+    web3 = AsyncWeb3(BatchingAsyncHTTPProvider(os.getenv('WEB3_PROVIDER_URL', 'http://localhost:8545')))
+    contract = web3.eth.contract(address=address, abi=abi)
+    indexer = indexer_class(
+        web3,
+        contract,
+        index,
+        ws_url=os.getenv('WEB3_WS_URL') or None,
+        start_block=int(start_block) if start_block else None
+    )
+    try:
+        await indexer.run()
+    finally:
+        index.close()
+
+
+def run_main(main):
+    """コマンドラインからインデクサーを起動する"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("インデクサーを終了します")
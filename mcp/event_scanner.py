@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# コントラクトイベントスキャナー
+# WebSocketのeth_subscribeでログを購読し、利用できない場合や遅れを取り戻す場合は
+# eth_getLogsをブロック範囲ごとにまとめて取得する
+
+import json
+import asyncio
+import logging
+from collections import deque
+
+import websockets
+from hexbytes import HexBytes
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+# eth_getLogsのブロック範囲設定
+INITIAL_BLOCK_RANGE = 1000
+MIN_BLOCK_RANGE = 1
+MAX_BLOCK_RANGE = 10000
+# 1回のクエリで目安とするログ件数（これより少なければ範囲を広げる）
+TARGET_LOGS_PER_QUERY = 500
+# HTTPポーリング間隔（秒）
+POLL_INTERVAL = 2
+# WebSocket再接続の最大待機時間（秒）
+MAX_RECONNECT_DELAY = 30
+# 重複配信防止のために保持するログキー数
+SEEN_LOG_CACHE_SIZE = 10000
+# 起動時の取りこぼし回収で並列実行するeth_getLogsの数
+CATCH_UP_CONCURRENCY = 8
+# 範囲の上限以外で失敗したeth_getLogsの再試行回数と最初の待機時間（秒、再試行ごとに2倍）
+GET_LOGS_RETRIES = 3
+GET_LOGS_RETRY_DELAY = 0.5
+# 結果件数やブロック範囲の上限に当たったことを示すエラーの文言（プロバイダーごとに異なる）
+# レート制限（-32005など）は範囲を縮めても解消しないため含めない
+RANGE_ERROR_MARKERS = (
+    'more than', 'too many', 'too large', 'too wide', 'block range', 'response size', 'limited to'
+)
+
+
+def is_range_error(error):
+    """eth_getLogsのエラーが結果件数やブロック範囲の上限によるものか判定"""
+    message = str(error).lower()
+    return any(marker in message for marker in RANGE_ERROR_MARKERS)
+
+
+class EventScanner:
+    def __init__(self, web3, contract, event_names, ws_url=None, start_block=None,
+                 initial_block_range=INITIAL_BLOCK_RANGE, max_block_range=MAX_BLOCK_RANGE,
+                 poll_interval=POLL_INTERVAL, catch_up_concurrency=CATCH_UP_CONCURRENCY):
+        self.web3 = web3
+        self.contract = contract
+        self.ws_url = ws_url
+        self.next_block = start_block
+        self.block_range = initial_block_range
+        self.max_block_range = max_block_range
+        self.poll_interval = poll_interval
+        self.catch_up_concurrency = catch_up_concurrency
+
+        # topic0 -> イベント名
+        self.event_topics = {}
+        for event_abi in self.contract.abi:
+            if event_abi.get('type') != 'event' or event_abi['name'] not in event_names:
+                continue
+            name = event_abi['name']
+            signature = f"{name}({','.join(arg['type'] for arg in event_abi['inputs'])})"
+            self.event_topics[Web3.keccak(text=signature)] = name
+
+        self._seen_keys = set()
+        self._seen_order = deque()
+        # リオルグで再スキャンが必要になった場合に立てる
+        self._rewound = False
+
+    def log_filter(self):
+        """アドレスとイベントトピック（OR条件）のフィルター"""
+        return {
+            'address': self.contract.address,
+            'topics': [[Web3.to_hex(topic) for topic in self.event_topics]]
+        }
+
+    async def get_block_number(self):
+        """最新ブロック番号を取得"""
+        return await self.web3.eth.block_number
+
+    async def get_logs(self, from_block, to_block):
+        """1回のeth_getLogsで指定範囲のログを取得"""
+        params = dict(self.log_filter(), fromBlock=from_block, toBlock=to_block)
+        return await self.web3.eth.get_logs(params)
+
+    async def get_logs_with_retry(self, from_block, to_block):
+        """
+        eth_getLogsを実行し、範囲の上限以外のエラーは待機時間を延ばしながら再試行する
+        範囲の上限によるエラーは呼び出し元で範囲を縮めるためそのまま送出する
+        """
+        delay = GET_LOGS_RETRY_DELAY
+        for attempt in range(GET_LOGS_RETRIES + 1):
+            try:
+                return await self.get_logs(from_block, to_block)
+            except Exception as e:
+                if is_range_error(e) or attempt == GET_LOGS_RETRIES:
+                    raise
+                logger.warning(f"eth_getLogs失敗のため{delay}秒後に再試行します（{from_block}-{to_block}）: {str(e)}")
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    async def scan_range(self, from_block, to_block):
+        """ブロック範囲を適応的なチャンクに分割してログを取得"""
+        events = []
+        current = from_block
+        while current <= to_block:
+            chunk_end = min(current + self.block_range - 1, to_block)
+            try:
+                logs = await self.get_logs_with_retry(current, chunk_end)
+            except Exception as e:
+                # 結果件数や範囲の上限に当たった場合は範囲を縮めて再試行
+                if not is_range_error(e) or self.block_range <= MIN_BLOCK_RANGE:
+                    raise
+                self.block_range = max(MIN_BLOCK_RANGE, self.block_range // 2)
+                logger.warning(f"eth_getLogs失敗のため範囲を{self.block_range}ブロックに縮小: {str(e)}")
+                continue
+
+            for log in logs:
+                event = self.decode_log(log)
+                if event:
+                    events.append(event)
+
+            # ログが少なければ範囲を広げる
+            if len(logs) < TARGET_LOGS_PER_QUERY // 2:
+                self.block_range = min(self.max_block_range, self.block_range * 2)
+            elif len(logs) > TARGET_LOGS_PER_QUERY:
+                self.block_range = max(MIN_BLOCK_RANGE, self.block_range // 2)
+
+            current = chunk_end + 1
+        return events
+
+    async def scan_range_parallel(self, from_block, to_block):
+        """ブロック範囲をチャンクに分割し、eth_getLogsを並列実行して取得"""
+        semaphore = asyncio.Semaphore(self.catch_up_concurrency)
+
+        async def fetch(start, end):
+            try:
+                async with semaphore:
+                    return list(await self.get_logs_with_retry(start, end))
+            except Exception as e:
+                # 結果件数や範囲の上限に当たったチャンクは二分割して再試行
+                if not is_range_error(e) or start >= end:
+                    raise
+                middle = (start + end) // 2
+                logger.warning(f"eth_getLogs失敗のためチャンク{start}-{end}を分割: {str(e)}")
+                left, right = await asyncio.gather(fetch(start, middle), fetch(middle + 1, end))
+                return left + right
+
+        chunks = [
+            (start, min(start + self.block_range - 1, to_block))
+            for start in range(from_block, to_block + 1, self.block_range)
+        ]
+        results = await asyncio.gather(*(fetch(start, end) for start, end in chunks))
+
+        events = []
+        for logs in results:
+            for log in logs:
+                event = self.decode_log(log)
+                if event:
+                    events.append(event)
+        events.sort(key=lambda event: (event['block_number'], event['log_index']))
+        return events
+
+    def decode_log(self, log):
+        """ログをデコードしてイベント辞書に変換（対象外や重複の場合はNone）"""
+        log = self._normalize_log(log)
+        if log.get('removed'):
+            return None
+
+        name = self.event_topics.get(log['topics'][0]) if log['topics'] else None
+        if not name:
+            return None
+
+        # リオルグで別のブロックに取り込み直されたログは新しいイベントとして扱う
+        key = (log['blockHash'], log['transactionHash'], log['logIndex'])
+        if key in self._seen_keys:
+            return None
+        self._seen_keys.add(key)
+        self._seen_order.append(key)
+        if len(self._seen_order) > SEEN_LOG_CACHE_SIZE:
+            self._seen_keys.discard(self._seen_order.popleft())
+
+        decoded = self.contract.events[name]().process_log(log)
+        event = dict(decoded['args'])
+        event.update({
+            'event': name,
+            'block_number': log['blockNumber'],
+            'block_hash': log['blockHash'],
+            'transaction_hash': log['transactionHash'],
+            'log_index': log['logIndex']
+        })
+        return event
+
+    def _normalize_log(self, log):
+        """WebSocketで受信した16進文字列のログをweb3形式に揃える"""
+        log = dict(log)
+        log['topics'] = [HexBytes(topic) for topic in log.get('topics', [])]
+        for field in ('blockHash', 'transactionHash'):
+            if log.get(field) is not None:
+                log[field] = HexBytes(log[field])
+        for field in ('blockNumber', 'logIndex', 'transactionIndex'):
+            if isinstance(log.get(field), str):
+                log[field] = int(log[field], 16)
+        if isinstance(log.get('data'), str):
+            log['data'] = HexBytes(log['data'])
+        return log
+
+    def rewind(self, block_number):
+        """リオルグで置き換えられたブロックから再スキャンする"""
+        if self.next_block is not None and block_number < self.next_block:
+            logger.warning(f"ブロック{block_number}から再スキャンします")
+            self.next_block = block_number
+            self._rewound = True
+
+    async def catch_up(self):
+        """next_blockから最新ブロックまでをまとめて取得"""
+        self._rewound = False
+        head = await self.get_block_number()
+        if self.next_block is None:
+            self.next_block = head + 1
+            return []
+        if self.next_block > head:
+            return []
+
+        if head - self.next_block + 1 > self.block_range * 2:
+            logger.info(f"ブロック{self.next_block}から{head}までを並列で取得します")
+            events = await self.scan_range_parallel(self.next_block, head)
+        else:
+            events = await self.scan_range(self.next_block, head)
+        self.next_block = head + 1
+        return events
+
+    async def events(self):
+        """イベントを順に配信する非同期ジェネレーター"""
+        reconnect_delay = 1
+        while True:
+            if self.ws_url:
+                try:
+                    async for event in self.subscribe():
+                        reconnect_delay = 1
+                        yield event
+                except Exception as e:
+                    logger.error(f"WebSocket購読エラー: {str(e)}")
+
+                # 再接続までの間はHTTPで取りこぼしを回収
+                for event in await self.catch_up():
+                    yield event
+                await asyncio.sleep(reconnect_delay)
+                reconnect_delay = min(reconnect_delay * 2, MAX_RECONNECT_DELAY)
+            else:
+                for event in await self.catch_up():
+                    yield event
+                await asyncio.sleep(self.poll_interval)
+
+    async def subscribe(self):
+        """eth_subscribeでログを購読しながら、購読開始前の分をeth_getLogsで回収"""
+        async with websockets.connect(self.ws_url) as ws:
+            await ws.send(json.dumps({
+                'jsonrpc': '2.0',
+                'id': 1,
+                'method': 'eth_subscribe',
+                'params': ['logs', self.log_filter()]
+            }))
+            response = json.loads(await ws.recv())
+            if 'error' in response:
+                raise RuntimeError(f"eth_subscribe失敗: {response['error']}")
+            subscription_id = response['result']
+            logger.info(f"ログ購読を開始しました: {subscription_id}")
+
+            # 取りこぼし回収中に届いたログを溜めておく
+            queue = asyncio.Queue()
+
+            async def reader():
+                async for message in ws:
+                    data = json.loads(message)
+                    params = data.get('params', {})
+                    if data.get('method') == 'eth_subscription' and params.get('subscription') == subscription_id:
+                        await queue.put(params['result'])
+                await queue.put(None)
+
+            reader_task = asyncio.create_task(reader())
+            try:
+                for event in await self.catch_up():
+                    yield event
+
+                while True:
+                    if self._rewound:
+                        for event in await self.catch_up():
+                            yield event
+                    try:
+                        log = await asyncio.wait_for(queue.get(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        continue
+                    if log is None:
+                        raise ConnectionError("WebSocket接続が切断されました")
+                    event = self.decode_log(log)
+                    if event:
+                        # 再接続時はこのブロックから再スキャンする（重複は_seen_keysで除外）
+                        self.next_block = max(self.next_block, event['block_number'])
+                        yield event
+            finally:
+                reader_task.cancel()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# ガス見積もりと手数料戦略
+# 関数シグネチャごとのガス見積もりを安全マージン付きでキャッシュし、
+# EIP-1559対応チェーンではeth_feeHistoryからmaxFeePerGas/maxPriorityFeePerGasを決める
+# 詰まったトランザクションは手数料を引き上げて同じノンスで置き換える
+
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ガス見積もりに掛ける安全マージン
+GAS_LIMIT_MARGIN = 1.2
+# eth_feeHistoryで参照するブロック数と優先手数料のパーセンタイル
+FEE_HISTORY_BLOCKS = 10
+PRIORITY_FEE_PERCENTILE = 50
+# maxFeePerGasは次ブロックのベース手数料の何倍まで許容するか
+BASE_FEE_MULTIPLIER = 2
+# 手数料パラメータを再取得するまでの秒数
+FEE_CACHE_TTL = 3
+# 置き換え時の手数料の引き上げ率（ノードは最低10%を要求する）
+REPLACEMENT_BUMP = 1.125
+
+
+def fees_from_history(fee_history):
+    """eth_feeHistoryの結果からEIP-1559の手数料パラメータを計算"""
+    # baseFeePerGasの最後の要素は次のブロックのベース手数料
+    next_base_fee = fee_history['baseFeePerGas'][-1]
+    rewards = sorted(reward[0] for reward in fee_history.get('reward', []) if reward)
+    priority_fee = rewards[len(rewards) // 2] if rewards else 0
+    return {
+        'maxPriorityFeePerGas': priority_fee,
+        'maxFeePerGas': next_base_fee * BASE_FEE_MULTIPLIER + priority_fee
+    }
+
+
+def bump_fee_params(fee_params):
+    """置き換え用に手数料を引き上げる"""
+    return {key: int(value * REPLACEMENT_BUMP) + 1 for key, value in fee_params.items()}
+
+
+def suggest_fee_params(web3):
+    """同期版のWeb3で手数料パラメータを取得（デプロイスクリプト用）"""
+    latest = web3.eth.get_block('latest')
+    if latest.get('baseFeePerGas') is None:
+        return {'gasPrice': web3.eth.gas_price}
+    fee_history = web3.eth.fee_history(FEE_HISTORY_BLOCKS, 'latest', [PRIORITY_FEE_PERCENTILE])
+    return fees_from_history(fee_history)
+
+
+def estimate_gas_limit(estimated_gas):
+    """見積もりに安全マージンを掛けたガス上限"""
+    return int(estimated_gas * GAS_LIMIT_MARGIN)
+
+
+class FeeStrategy:
+    def __init__(self, web3, fee_cache_ttl=FEE_CACHE_TTL):
+        self.web3 = web3
+        self.fee_cache_ttl = fee_cache_ttl
+        # キー（関数シグネチャなど） -> マージン込みのガス上限
+        self.gas_limits = {}
+        self.supports_eip1559 = None
+        self._fee_params = None
+        self._fee_params_at = 0
+
+    async def gas_limit(self, key, function, tx_params):
+        """キーごとに1回だけガスを見積もり、以降はキャッシュを使う"""
+        if key not in self.gas_limits:
+            estimated = await function.estimate_gas(tx_params)
+            self.gas_limits[key] = estimate_gas_limit(estimated)
+            logger.info(f"ガス見積もり: {key} -> {self.gas_limits[key]}")
+        return self.gas_limits[key]
+
+    def invalidate_gas_limit(self, key):
+        """ガス不足で失敗した場合などに見積もりを破棄"""
+        self.gas_limits.pop(key, None)
+
+    async def fee_params(self):
+        """手数料パラメータを取得（短時間はキャッシュ）"""
+        now = time.time()
+        if self._fee_params is not None and now - self._fee_params_at < self.fee_cache_ttl:
+            return dict(self._fee_params)
+
+        if self.supports_eip1559 is None:
+            latest = await self.web3.eth.get_block('latest')
+            self.supports_eip1559 = latest.get('baseFeePerGas') is not None
+
+        if self.supports_eip1559:
+            fee_history = await self.web3.eth.fee_history(FEE_HISTORY_BLOCKS, 'latest', [PRIORITY_FEE_PERCENTILE])
+            self._fee_params = fees_from_history(fee_history)
+        else:
+            self._fee_params = {'gasPrice': await self.web3.eth.gas_price}
+        self._fee_params_at = now
+        return dict(self._fee_params)
+
+    async def replacement_fee_params(self, tx):
+        """置き換え用の手数料（元の手数料の引き上げと現在の相場の高い方）"""
+        fee_keys = ('maxFeePerGas', 'maxPriorityFeePerGas') if 'maxFeePerGas' in tx else ('gasPrice',)
+        bumped = bump_fee_params({key: tx[key] for key in fee_keys})
+        current = await self.fee_params()
+        return {key: max(bumped[key], current.get(key, 0)) for key in fee_keys}
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# Fileverseファイルのローカルインデックス
+# FileUploaded / FileAccessGrantedイベントをSQLiteに取り込み、タスク・アップローダー・
+# MIMEタイプ・期間・アクセス権を持つユーザーでの検索をチェーンに問い合わせずに行う
+# （コントラクトの一覧のように100件ずつページを読み出す必要もない）
+
+import os
+import re
+import json
+from collections import OrderedDict
+
+from web3 import Web3
+
+from event_indexer import EventIndex, EventIndexer, run_indexer, run_main
+
+FILE_INDEX_DB_PATH = os.getenv('FILE_INDEX_DB', 'file_index.db')
+# 取り込むイベント
+FILE_INDEX_EVENT_NAMES = ['FileUploaded', 'FileAccessGranted']
+# 初回起動時にスキャンを開始するブロック（未設定の場合は最新ブロックから）
+FILE_INDEX_START_BLOCK = os.getenv('FILE_INDEX_START_BLOCK')
+# 保持するブロックタイムスタンプの数
+BLOCK_TIMESTAMP_CACHE_SIZE = 1024
+
+# FileUploadedのmetadata（"名前 (MIMEタイプ, サイズ bytes)"）
+METADATA_PATTERN = re.compile(r'^(.*) \(([^,()]*), (\d+) bytes\)$', re.DOTALL)
+
+FILE_COLUMNS = (
+    'file_hash', 'task_id', 'uploader', 'name', 'mime_type', 'size',
+    'block_number', 'timestamp', 'transaction_hash', 'log_index'
+)
+
+
+def parse_metadata(metadata):
+    """FileUploadedのmetadata文字列を(名前, MIMEタイプ, サイズ)に分解"""
+    match = METADATA_PATTERN.match(metadata)
+    if not match:
+        return metadata, None, None
+    return match.group(1), match.group(2), int(match.group(3))
+
+
+class FileIndex(EventIndex):
+    def __init__(self, path=FILE_INDEX_DB_PATH):
+        super().__init__(path)
+
+    def create_tables(self):
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'transaction_hash TEXT NOT NULL, log_index INTEGER NOT NULL, file_hash TEXT NOT NULL, '
+            'task_id TEXT NOT NULL, uploader TEXT NOT NULL, name TEXT, mime_type TEXT, size INTEGER, '
+            'block_number INTEGER NOT NULL, timestamp INTEGER, PRIMARY KEY (transaction_hash, log_index))'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS file_access ('
+            'transaction_hash TEXT NOT NULL, log_index INTEGER NOT NULL, file_hash TEXT NOT NULL, '
+            'user TEXT NOT NULL, grantor TEXT NOT NULL, block_number INTEGER NOT NULL, '
+            'PRIMARY KEY (transaction_hash, log_index))'
+        )
+        for table, column in (('files', 'task_id'), ('files', 'uploader'), ('files', 'mime_type'),
+                              ('files', 'timestamp'), ('files', 'file_hash'), ('files', 'block_number'),
+                              ('file_access', 'user'), ('file_access', 'block_number')):
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column})')
+
+    def add_event(self, event, timestamp=None):
+        """FileUploaded / FileAccessGrantedイベントを取り込む（同じログは上書き）"""
+        key = (Web3.to_hex(event['transaction_hash']), event['log_index'])
+        if event['event'] == 'FileUploaded':
+            name, mime_type, size = parse_metadata(event['metadata'])
+            self.conn.execute(
+                'INSERT OR REPLACE INTO files (transaction_hash, log_index, file_hash, task_id, uploader, '
+                'name, mime_type, size, block_number, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                key + (
+                    Web3.to_hex(event['file_hash']), Web3.to_hex(event['task_id']),
+                    Web3.to_checksum_address(event['uploader']), name, mime_type, size,
+                    event['block_number'], timestamp
+                )
+            )
+        elif event['event'] == 'FileAccessGranted':
+            self.conn.execute(
+                'INSERT OR REPLACE INTO file_access (transaction_hash, log_index, file_hash, user, grantor, '
+                'block_number) VALUES (?, ?, ?, ?, ?, ?)',
+                key + (
+                    Web3.to_hex(event['file_hash']), Web3.to_checksum_address(event['user']),
+                    Web3.to_checksum_address(event['grantor']), event['block_number']
+                )
+            )
+        self.conn.commit()
+
+    def discard_from(self, block_number):
+        """リオルグで置き換えられたブロック以降の記録を取り消す"""
+        self.conn.execute('DELETE FROM files WHERE block_number >= ?', (block_number,))
+        self.conn.execute('DELETE FROM file_access WHERE block_number >= ?', (block_number,))
+
+    def query(self, task_id=None, uploader=None, mime_type=None, since=None, until=None,
+              grantee=None, limit=None, offset=0):
+        """
+        条件に一致するファイルの記録を古い順に返す
+        mime_typeは'image/*'のように末尾を*にすると前方一致
+        since / untilはブロックタイムスタンプ（秒）の範囲
+        granteeはアクセス権を持つユーザー（アップローダー本人を含む）
+        """
+        conditions = []
+        params = []
+        if task_id is not None:
+            conditions.append('task_id = ?')
+            params.append(Web3.to_hex(task_id) if isinstance(task_id, bytes) else task_id.lower())
+        if uploader is not None:
+            conditions.append('uploader = ?')
+            params.append(Web3.to_checksum_address(uploader))
+        if mime_type is not None:
+            if mime_type.endswith('*'):
+                conditions.append('mime_type LIKE ?')
+                params.append(mime_type[:-1] + '%')
+            else:
+                conditions.append('mime_type = ?')
+                params.append(mime_type)
+        if since is not None:
+            conditions.append('timestamp >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('timestamp < ?')
+            params.append(until)
+        if grantee is not None:
+            grantee = Web3.to_checksum_address(grantee)
+            conditions.append('(uploader = ? OR file_hash IN (SELECT file_hash FROM file_access WHERE user = ?))')
+            params.extend([grantee, grantee])
+
+        sql = f"SELECT {', '.join(FILE_COLUMNS)} FROM files"
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY block_number, log_index'
+        if limit is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params.extend([limit, offset])
+        return [dict(zip(FILE_COLUMNS, row)) for row in self.conn.execute(sql, params)]
+
+
+class FileIndexer(EventIndexer):
+    event_names = FILE_INDEX_EVENT_NAMES
+    record_label = 'ファイル'
+
+    def __init__(self, web3, contract, index, ws_url=None, start_block=None):
+        super().__init__(web3, contract, index, ws_url=ws_url, start_block=start_block)
+        # ブロック番号 -> タイムスタンプ
+        self.timestamps = OrderedDict()
+
+    async def get_timestamp(self, block_number):
+        """ブロックのタイムスタンプを取得（同じブロックのイベントでは1回だけ取得）"""
+        timestamp = self.timestamps.get(block_number)
+        if timestamp is None:
+            block = await self.web3.eth.get_block(block_number)
+            timestamp = block['timestamp']
+            self.timestamps[block_number] = timestamp
+            while len(self.timestamps) > BLOCK_TIMESTAMP_CACHE_SIZE:
+                self.timestamps.popitem(last=False)
+        return timestamp
+
+    async def handle_event(self, event):
+        timestamp = None
+        if event['event'] == 'FileUploaded':
+            timestamp = await self.get_timestamp(event['block_number'])
+        self.index.add_event(event, timestamp)
+
+    async def handle_reorg(self, fork_block):
+        await super().handle_reorg(fork_block)
+        for block_number in [n for n in self.timestamps if n >= fork_block]:
+            del self.timestamps[block_number]
+
+
+async def main():
+    """メイン関数"""
+    with open('abis/FileverseIntegration.json', 'r') as f:
+        abi = json.load(f)
+    await run_indexer(FileIndexer, FileIndex(), os.getenv('FILEVERSE_INTEGRATION_ADDRESS'), abi,
+                      FILE_INDEX_START_BLOCK)
+
+if __name__ == "__main__":
+    run_main(main)
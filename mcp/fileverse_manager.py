@@ -7,11 +7,26 @@ produced by the Myrdal agent.
 
 import os
 import json
+import shutil
+import asyncio
+import tempfile
 import logging
+import threading
+import aiohttp
 import requests
 from dotenv import load_dotenv
 from web3 import Web3
 
+from rpc_client import CachingHTTPProvider, batch_call
+from chunked_upload import ChunkedUploader, UploadSessionStore, CHUNKED_UPLOAD_THRESHOLD, UPLOAD_SESSION_DIR
+from content_index import ContentIndex, file_digest, CONTENT_INDEX_DB
+from batcher import Batcher
+from metadata_cache import MetadataCache
+from file_indexer import FileIndex, FILE_INDEX_DB_PATH
+from blob_cache import BlobCache, BLOB_CACHE_DIR
+from chunked_download import SegmentedDownloader
+from upload_pipeline import UploadPipeline
+
 # Load environment variables
 load_dotenv()
 
@@ -19,23 +34,74 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+FILEVERSE_API_URL = os.getenv('FILEVERSE_API_URL', 'https://api.fileverse.io/v1/files')
+# Number of files uploaded at the same time by upload_many
+UPLOAD_CONCURRENCY = int(os.getenv('FILEVERSE_UPLOAD_CONCURRENCY', '4'))
+# Number of files downloaded at the same time by download_many (each file may
+# also be split into FILEVERSE_DOWNLOAD_CONCURRENCY parallel segments, see chunked_download)
+DOWNLOAD_MANY_CONCURRENCY = int(os.getenv('FILEVERSE_DOWNLOAD_MANY_CONCURRENCY', '4'))
+# Files recorded per record_file_uploads transaction (MAX_RECORD_BATCH in contracts/Myrdal.vy)
+RECORD_BATCH_SIZE = int(os.getenv('FILEVERSE_RECORD_BATCH_SIZE', '50'))
+# Seconds a queued record waits for more files before the batch is sent
+RECORD_BATCH_LATENCY = float(os.getenv('FILEVERSE_RECORD_BATCH_LATENCY', '2'))
+# Files read per get_files_metadata call (bound of the contract view)
+METADATA_BATCH_SIZE = 100
+# Entries returned per get_task_files page (MAX_PAGE_SIZE in contracts/fileverse/FileverseIntegration.vy)
+FILE_LIST_PAGE_SIZE = 100
+
 class FileverseManager:
-    def __init__(self, web3_provider=None):
+    def __init__(self, web3_provider=None, content_index_path=CONTENT_INDEX_DB, file_index_path=FILE_INDEX_DB_PATH,
+                 blob_cache_dir=BLOB_CACHE_DIR, upload_session_dir=UPLOAD_SESSION_DIR):
         """
         Initialize the Fileverse manager.
         
+        The local stores and the upload pipeline are created on first use, so a
+        manager that never uploads or downloads creates no files; close releases
+        them. The default store locations come from
+        FILEVERSE_CONTENT_INDEX_DB, FILE_INDEX_DB, FILEVERSE_BLOB_CACHE_DIR and
+        FILEVERSE_UPLOAD_SESSION_DIR.
+        
         Args:
             web3_provider: Web3 provider URL (optional)
+            content_index_path: SQLite database of content already on Fileverse
+            file_index_path: SQLite database kept by file_indexer.py
+            blob_cache_dir: Directory of the downloaded file cache
+            upload_session_dir: Directory of resumable chunked upload sessions
         """
         self.api_key = os.getenv('FILEVERSE_API_KEY')
         if not self.api_key:
             logger.warning("Fileverse API key not found in environment variables")
+        self.api_url = FILEVERSE_API_URL
+        
+        # Keep-alive session shared by synchronous uploads
+        self.session = requests.Session()
+        
+        # Downloads are streamed in parallel segments and kept in a local blob cache
+        self.downloader = SegmentedDownloader(self.api_url, self.api_key, self.session)
+        
+        # Local stores and the upload pipeline, created by the properties below on first use
+        self.content_index_path = content_index_path
+        self.file_index_path = file_index_path
+        self.blob_cache_dir = blob_cache_dir
+        self.upload_session_dir = upload_session_dir
+        self._stores = {}
+        self._stores_lock = threading.Lock()
+        
+        # On-chain records queued by upload_file(batch_record=True)
+        self.record_batch_size = RECORD_BATCH_SIZE
+        self.record_batch_latency = RECORD_BATCH_LATENCY
+        self._record_queue = []
+        self._record_lock = threading.Lock()
+        self._record_timer = None
+        
+        # Recorded file metadata does not change, so reads are cached
+        self.metadata_cache = MetadataCache()
             
-        # Initialize Web3
+        # Initialize Web3 (cached reads, batched metadata lookups)
         if web3_provider:
-            self.web3 = Web3(Web3.HTTPProvider(web3_provider))
+            self.web3 = Web3(CachingHTTPProvider(web3_provider))
         else:
-            self.web3 = Web3(Web3.HTTPProvider(os.getenv('WEB3_PROVIDER_URL', 'http://localhost:8545')))
+            self.web3 = Web3(CachingHTTPProvider(os.getenv('WEB3_PROVIDER_URL', 'http://localhost:8545')))
         
         # Load contract ABIs
         self.load_contract_abis()
@@ -43,6 +109,69 @@ class FileverseManager:
         # Initialize contracts
         self.initialize_contracts()
         
+    def _store(self, name, factory):
+        """Return the named local store, creating it on first use."""
+        with self._stores_lock:
+            if name not in self._stores:
+                self._stores[name] = factory()
+            return self._stores[name]
+    
+    @property
+    def pipeline(self):
+        """MIME detection and optional compression before upload."""
+        return self._store('pipeline', UploadPipeline)
+    
+    @pipeline.setter
+    def pipeline(self, pipeline):
+        with self._stores_lock:
+            self._stores['pipeline'] = pipeline
+    
+    @property
+    def content_index(self):
+        """Content already on Fileverse, so it is linked instead of uploaded again."""
+        return self._store('content_index', lambda: ContentIndex(self.content_index_path))
+    
+    @property
+    def file_index(self):
+        """Local index of FileUploaded / FileAccessGranted events kept by file_indexer.py."""
+        return self._store('file_index', lambda: FileIndex(self.file_index_path))
+    
+    @property
+    def blob_cache(self):
+        """Cache of downloaded files."""
+        return self._store('blob_cache', lambda: BlobCache(self.blob_cache_dir))
+    
+    @property
+    def chunked_uploader(self):
+        """Resumable uploader for large files."""
+        return self._store('chunked_uploader', lambda: ChunkedUploader(
+            self.api_url, self.api_key, self.session, session_store=UploadSessionStore(self.upload_session_dir)
+        ))
+    
+    def close(self):
+        """
+        Send queued on-chain records and release the local resources.
+        
+        Shuts down the upload pipeline's worker processes, removes its temporary
+        work directory and closes the SQLite stores that were opened.
+        """
+        if self._record_queue or self._record_timer is not None:
+            self.flush_records()
+        with self._stores_lock:
+            stores, self._stores = self._stores, {}
+        if 'pipeline' in stores:
+            stores['pipeline'].close()
+        for name in ('content_index', 'file_index'):
+            if name in stores:
+                stores[name].close()
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
     def load_contract_abis(self):
         """Load contract ABIs from JSON files"""
         try:
@@ -74,16 +203,24 @@ class FileverseManager:
             logger.error(f"Error initializing contracts: {e}")
             self.fileverse_integration = None
     
-    def upload_file(self, file_path, task_id, name=None, description=None, mime_type=None):
+    def upload_file(self, file_path, task_id, name=None, description=None, mime_type=None, batch_record=False):
         """
         Upload a file to Fileverse and record it on the blockchain.
         
+        The file first goes through the upload pipeline (MIME detection and, when
+        enabled, image recompression and text compression). If byte-identical
+        content was uploaded before, the upload is skipped and the existing file
+        is linked to the task on-chain; its recorded metadata (uploader, name,
+        description) is left unchanged.
+        
         Args:
             file_path: Path to the file to upload
             task_id: Task ID associated with the file
             name: File name (optional)
             description: File description (optional)
             mime_type: File MIME type (optional)
+            batch_record: Queue the on-chain record instead of sending it now; queued
+                records are sent together by flush_records (optional)
             
         Returns:
             File hash if successful, None otherwise
@@ -92,104 +229,379 @@ class FileverseManager:
             logger.error("Fileverse API key not available")
             return None
             
+        artifact = None
         try:
-            # Prepare file metadata
-            if not name:
-                name = os.path.basename(file_path)
-                
-            if not mime_type:
-                # Simple MIME type detection based on extension
-                ext = os.path.splitext(file_path)[1].lower()
-                if ext == '.pdf':
-                    mime_type = 'application/pdf'
-                elif ext in ['.jpg', '.jpeg']:
-                    mime_type = 'image/jpeg'
-                elif ext == '.png':
-                    mime_type = 'image/png'
-                elif ext in ['.txt', '.md']:
-                    mime_type = 'text/plain'
-                elif ext == '.json':
-                    mime_type = 'application/json'
+            artifact = self.pipeline.run(file_path, name, mime_type)
+            upload_path, name, mime_type, size = artifact['path'], artifact['name'], artifact['mime_type'], artifact['size']
+            digest = file_digest(upload_path)
+            
+            existing = self.content_index.lookup(digest, size)
+            if existing:
+                file_hash = existing['file_hash']
+                logger.info(f"Identical content already on Fileverse, skipping upload: {file_hash}")
+            else:
+                # Upload file to Fileverse
+                metadata = self._build_metadata(task_id, name, description, artifact.get('original_mime_type'))
+                if size >= CHUNKED_UPLOAD_THRESHOLD:
+                    file_hash = self.chunked_uploader.upload(upload_path, name, mime_type, metadata)
                 else:
-                    mime_type = 'application/octet-stream'
+                    file_hash = self._upload_multipart(upload_path, name, mime_type, metadata)
+                if not file_hash:
+                    return None
+                self.content_index.add(digest, file_hash, size, mime_type)
             
-            # Get file size
-            size = os.path.getsize(file_path)
+            # Record file upload on blockchain (the contract only links files it already knows)
+            if self.fileverse_integration:
+                if batch_record:
+                    self.queue_record(task_id, file_hash, name, description, mime_type, size)
+                elif existing:
+                    tx = self._send_link_transaction(task_id, file_hash)
+                    receipt = self.web3.eth.wait_for_transaction_receipt(tx)
+                    logger.info(f"Existing file linked to task on blockchain: {receipt.transactionHash.hex()}")
+                else:
+                    tx = self._send_record_transaction(task_id, file_hash, name, description, mime_type, size)
+                    receipt = self.web3.eth.wait_for_transaction_receipt(tx)
+                    logger.info(f"File upload recorded on blockchain: {receipt.transactionHash.hex()}")
             
-            # Upload file to Fileverse
-            with open(file_path, 'rb') as f:
-                files = {'file': (name, f, mime_type)}
-                
-                metadata = {
-                    'name': name,
-                    'description': description or f"File uploaded by Myrdal agent for task {task_id}",
-                    'task_id': task_id
-                }
-                
-                headers = {
-                    'Authorization': f'Bearer {self.api_key}'
-                }
-                
-                response = requests.post(
-                    'https://api.fileverse.io/v1/files',
-                    files=files,
-                    data={'metadata': json.dumps(metadata)},
-                    headers=headers
-                )
-                
-            if response.status_code != 200:
-                logger.error(f"Fileverse API error: {response.text}")
-                return None
-                
-            result = response.json()
-            file_hash = result.get('hash')
+            return file_hash
             
-            if not file_hash:
-                logger.error("File hash not found in Fileverse response")
-                return None
-                
-            logger.info(f"File uploaded to Fileverse: {file_hash}")
+        except Exception as e:
+            logger.error(f"Error uploading file: {e}")
+            return None
+        finally:
+            if artifact:
+                self.pipeline.cleanup(artifact)
+    
+    async def upload_many(self, files, concurrency=UPLOAD_CONCURRENCY):
+        """
+        Upload several files concurrently and record them on the blockchain.
+        
+        Uploads share one keep-alive HTTP session and run with bounded concurrency.
+        Finished uploads are recorded on-chain in record_file_uploads batches, flushed
+        when RECORD_BATCH_SIZE files are waiting or RECORD_BATCH_LATENCY seconds after
+        the first one, so recording overlaps with the remaining uploads.
+        Duplicate content, whether uploaded earlier or repeated within files, is
+        uploaded only once.
+        
+        Args:
+            files: List of dicts with file_path, task_id and optional name, description, mime_type
+            concurrency: Maximum number of simultaneous uploads
             
-            # Record file upload on blockchain
-            if self.fileverse_integration:
-                # Get account to send transaction
-                account = self.web3.eth.accounts[0]
-                
-                # Convert task_id to bytes32 if it's a string
-                if isinstance(task_id, str) and task_id.startswith('0x'):
-                    task_id_bytes = bytes.fromhex(task_id[2:])
-                else:
-                    task_id_bytes = self.web3.keccak(text=str(task_id))
+        Returns:
+            List of file hashes in the same order as files (None for failed files)
+        """
+        if not self.api_key:
+            logger.error("Fileverse API key not available")
+            return [None] * len(files)
+        
+        results = [None] * len(files)
+        semaphore = asyncio.Semaphore(concurrency)
+        # Uploads in progress by content digest, shared by identical files
+        in_flight = {}
+        
+        async def upload(index, spec, session):
+            artifact = None
+            try:
+                # CPU-bound preprocessing runs in worker processes while other files upload
+                artifact = await self.pipeline.run_async(spec['file_path'], spec.get('name'), spec.get('mime_type'))
+                upload_path, name, mime_type, size = artifact['path'], artifact['name'], artifact['mime_type'], artifact['size']
+                digest = await asyncio.to_thread(file_digest, upload_path)
                 
-                # Convert file_hash to bytes32 if it's a string
-                if isinstance(file_hash, str) and file_hash.startswith('0x'):
-                    file_hash_bytes = bytes.fromhex(file_hash[2:])
+                existing = self.content_index.lookup(digest, size)
+                if existing:
+                    file_hash = existing['file_hash']
+                    logger.info(f"Identical content already on Fileverse, skipping upload: {file_hash}")
+                elif digest in in_flight:
+                    file_hash = await asyncio.shield(in_flight[digest])
                 else:
-                    file_hash_bytes = self.web3.keccak(text=file_hash)
-                
-                # Submit record
-                tx = self.fileverse_integration.functions.record_file_upload(
-                    task_id_bytes,
-                    file_hash_bytes,
-                    name,
-                    description or "",
-                    mime_type,
-                    size
-                ).transact({'from': account})
-                
+                    in_flight[digest] = asyncio.get_running_loop().create_future()
+                    file_hash = None
+                    try:
+                        async with semaphore:
+                            metadata = self._build_metadata(
+                                spec['task_id'], name, spec.get('description'), artifact.get('original_mime_type')
+                            )
+                            if size >= CHUNKED_UPLOAD_THRESHOLD:
+                                file_hash = await asyncio.to_thread(
+                                    self.chunked_uploader.upload, upload_path, name, mime_type, metadata
+                                )
+                            else:
+                                file_hash = await self._upload_async(session, upload_path, name, mime_type, metadata)
+                    finally:
+                        in_flight.pop(digest).set_result(file_hash)
+                    if file_hash:
+                        self.content_index.add(digest, file_hash, size, mime_type)
+            except Exception as e:
+                logger.error(f"Error uploading file {spec['file_path']}: {e}")
+                return
+            finally:
+                if artifact:
+                    self.pipeline.cleanup(artifact)
+            if file_hash:
+                results[index] = file_hash
+                if batcher:
+                    await batcher.add((index, (spec['task_id'], file_hash, name, spec.get('description'), mime_type, size)))
+        
+        async def record(batch):
+            try:
+                tx = await asyncio.to_thread(self._send_record_batch_transaction, [record_args for _, record_args in batch])
+                receipt = await asyncio.to_thread(self.web3.eth.wait_for_transaction_receipt, tx)
+                logger.info(f"{len(batch)} file uploads recorded on blockchain: {receipt.transactionHash.hex()}")
+            except Exception as e:
+                logger.error(f"Error recording file uploads: {e}")
+                for index, _ in batch:
+                    results[index] = None
+        
+        batcher = None
+        if self.fileverse_integration:
+            # One record transaction at a time, since each is signed with the same account
+            batcher = Batcher(record, self.record_batch_size, self.record_batch_latency)
+        
+        connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=60)
+        async with aiohttp.ClientSession(connector=connector, headers=self._auth_headers()) as session:
+            await asyncio.gather(*(upload(index, spec, session) for index, spec in enumerate(files)))
+        if batcher:
+            await batcher.close()
+        
+        return results
+    
+    def queue_record(self, task_id, file_hash, name, description, mime_type, size):
+        """
+        Queue an on-chain file record.
+        
+        The queue is sent when record_batch_size records are waiting, or
+        record_batch_latency seconds after the first record was queued.
+        """
+        with self._record_lock:
+            self._record_queue.append((task_id, file_hash, name, description, mime_type, size))
+            full = len(self._record_queue) >= self.record_batch_size
+            if not full and self._record_timer is None:
+                self._record_timer = threading.Timer(self.record_batch_latency, self.flush_records)
+                self._record_timer.daemon = True
+                self._record_timer.start()
+        if full:
+            self.flush_records()
+    
+    def flush_records(self):
+        """
+        Send the queued file records and wait for their receipts.
+        
+        Returns:
+            Number of files recorded on the blockchain
+        """
+        with self._record_lock:
+            if self._record_timer is not None:
+                self._record_timer.cancel()
+                self._record_timer = None
+            records, self._record_queue = self._record_queue, []
+        
+        recorded = 0
+        for start in range(0, len(records), self.record_batch_size):
+            batch = records[start:start + self.record_batch_size]
+            try:
+                tx = self._send_record_batch_transaction(batch)
                 receipt = self.web3.eth.wait_for_transaction_receipt(tx)
-                logger.info(f"File upload recorded on blockchain: {receipt.transactionHash.hex()}")
+                logger.info(f"{len(batch)} file uploads recorded on blockchain: {receipt.transactionHash.hex()}")
+                recorded += len(batch)
+            except Exception as e:
+                logger.error(f"Error recording file uploads: {e}")
+        return recorded
+    
+    def download_file(self, file_hash, dest_path=None):
+        """
+        Download a file from Fileverse, serving it from the local blob cache when possible.
+        
+        The content is verified against its SHA-256 digest (recorded when this
+        manager uploaded it, or reported by Fileverse) and its on-chain size when
+        the metadata is cached. Only verified content is kept in the blob cache
+        and the content index; content with no known digest is written to
+        dest_path (or a new temporary file) and fetched again on the next call.
+        
+        Args:
+            file_hash: Fileverse file hash
+            dest_path: Path to copy the file to (optional, defaults to the cached copy)
             
-            return file_hash
+        Returns:
+            Local path of the file if successful, None otherwise
+        """
+        key = self._file_hash_key(file_hash)
+        path = self.blob_cache.get(key)
+        if path is None:
+            if not self.api_key:
+                logger.error("Fileverse API key not available")
+                return None
             
+            partial_path = self.blob_cache.partial_path()
+            try:
+                metadata = self.metadata_cache.get(key)
+                digest, verified = self.downloader.download(
+                    file_hash,
+                    partial_path,
+                    expected_sha256=self.content_index.digest_for(file_hash),
+                    expected_size=metadata['size'] if metadata else None
+                )
+                if not verified:
+                    logger.warning(f"No SHA-256 digest known for {file_hash}, the file is not cached")
+                    if dest_path is None:
+                        dest_path = os.path.join(tempfile.mkdtemp(prefix='fileverse-'), file_hash)
+                    else:
+                        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+                    shutil.move(partial_path, dest_path)
+                    return dest_path
+                size = os.path.getsize(partial_path)
+                path = self.blob_cache.put(key, partial_path)
+                # Lets a later upload of the same content reuse this file
+                self.content_index.add(digest, file_hash, size, metadata['mime_type'] if metadata else None)
+                logger.info(f"File downloaded from Fileverse: {file_hash}")
+            except Exception as e:
+                logger.error(f"Error downloading file {file_hash}: {e}")
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                return None
+        
+        if dest_path is None:
+            return path
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+            shutil.copyfile(path, dest_path)
+            return dest_path
         except Exception as e:
-            logger.error(f"Error uploading file: {e}")
+            logger.error(f"Error copying file {file_hash}: {e}")
             return None
     
+    async def download_many(self, file_hashes, dest_dir=None, concurrency=DOWNLOAD_MANY_CONCURRENCY):
+        """
+        Download several files concurrently.
+        
+        Args:
+            file_hashes: List of Fileverse file hashes
+            dest_dir: Directory to copy the files to, named by hash (optional)
+            concurrency: Maximum number of files downloaded at the same time
+            
+        Returns:
+            List of local paths in the same order as file_hashes (None for failed files)
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        in_flight = {}
+        
+        async def download(file_hash):
+            dest_path = os.path.join(dest_dir, file_hash) if dest_dir else None
+            key = self._file_hash_key(file_hash)
+            if key not in in_flight:
+                # The same hash listed twice is fetched once
+                async def fetch():
+                    async with semaphore:
+                        return await asyncio.to_thread(self.download_file, file_hash, dest_path)
+                in_flight[key] = asyncio.ensure_future(fetch())
+            path = await in_flight[key]
+            if path is None or dest_path is None or path == dest_path:
+                return path
+            return await asyncio.to_thread(self.download_file, file_hash, dest_path)
+        
+        return await asyncio.gather(*(download(file_hash) for file_hash in file_hashes))
+    
+    def _upload_multipart(self, file_path, name, mime_type, metadata):
+        """Upload one file in a single multipart request."""
+        with open(file_path, 'rb') as f:
+            response = self.session.post(
+                self.api_url,
+                files={'file': (name, f, mime_type)},
+                data={'metadata': json.dumps(metadata)},
+                headers=self._auth_headers()
+            )
+            
+        if response.status_code != 200:
+            logger.error(f"Fileverse API error: {response.text}")
+            return None
+            
+        return self._parse_upload_response(response.json())
+    
+    async def _upload_async(self, session, file_path, name, mime_type, metadata):
+        """Upload one file with the shared aiohttp session."""
+        with open(file_path, 'rb') as f:
+            form = aiohttp.FormData()
+            form.add_field('file', f, filename=name, content_type=mime_type)
+            form.add_field('metadata', json.dumps(metadata))
+            
+            async with session.post(self.api_url, data=form) as response:
+                if response.status != 200:
+                    logger.error(f"Fileverse API error: {await response.text()}")
+                    return None
+                return self._parse_upload_response(await response.json())
+    
+    def _auth_headers(self):
+        return {'Authorization': f'Bearer {self.api_key}'}
+    
+    def _build_metadata(self, task_id, name, description, original_mime_type=None):
+        metadata = {
+            'name': name,
+            'description': description or f"File uploaded by Myrdal agent for task {task_id}",
+            'task_id': task_id
+        }
+        if original_mime_type:
+            # The pipeline gzipped the file; record what it decompresses to
+            metadata['original_mime_type'] = original_mime_type
+        return metadata
+    
+    def _parse_upload_response(self, result):
+        """Extract the file hash from a Fileverse upload response."""
+        file_hash = result.get('hash')
+        
+        if not file_hash:
+            logger.error("File hash not found in Fileverse response")
+            return None
+            
+        logger.info(f"File uploaded to Fileverse: {file_hash}")
+        return file_hash
+    
+    def _send_record_transaction(self, task_id, file_hash, name, description, mime_type, size):
+        """Send the record_file_upload transaction and return its hash without waiting."""
+        # Get account to send transaction
+        account = self.web3.eth.accounts[0]
+        
+        return self.fileverse_integration.functions.record_file_upload(
+            self._task_id_bytes(task_id),
+            self._file_hash_bytes(file_hash),
+            name,
+            description or "",
+            mime_type,
+            size
+        ).transact({'from': account})
+    
+    def _send_link_transaction(self, task_id, file_hash):
+        """Send the link_file_to_task transaction for an already recorded file and return its hash."""
+        account = self.web3.eth.accounts[0]
+        
+        return self.fileverse_integration.functions.link_file_to_task(
+            self._task_id_bytes(task_id),
+            self._file_hash_bytes(file_hash)
+        ).transact({'from': account})
+    
+    def _send_record_batch_transaction(self, records):
+        """
+        Send one record_file_uploads transaction for several files and return its hash.
+        
+        Files the contract already knows are only linked to their task.
+        """
+        account = self.web3.eth.accounts[0]
+        task_ids, file_hashes, names, descriptions, mime_types, sizes = zip(*records)
+        
+        return self.fileverse_integration.functions.record_file_uploads(
+            [self._task_id_bytes(task_id) for task_id in task_ids],
+            [self._file_hash_bytes(file_hash) for file_hash in file_hashes],
+            list(names),
+            [description or "" for description in descriptions],
+            list(mime_types),
+            list(sizes)
+        ).transact({'from': account})
+    
     def get_task_files(self, task_id):
         """
         Get files associated with a task.
         
+        The contract returns the list in pages of FILE_LIST_PAGE_SIZE entries;
+        every page is read.
+        
         Args:
             task_id: Task ID
             
@@ -201,14 +613,12 @@ class FileverseManager:
             return []
             
         try:
-            # Convert task_id to bytes32 if it's a string
-            if isinstance(task_id, str) and task_id.startswith('0x'):
-                task_id_bytes = bytes.fromhex(task_id[2:])
-            else:
-                task_id_bytes = self.web3.keccak(text=str(task_id))
-                
-            # Get file hashes
-            file_hashes = self.fileverse_integration.functions.get_task_files(task_id_bytes).call()
+            functions = self.fileverse_integration.functions
+            task_id = self._task_id_bytes(task_id)
+            count = functions.task_file_count(task_id).call()
+            file_hashes = []
+            for offset in range(0, count, FILE_LIST_PAGE_SIZE):
+                file_hashes.extend(functions.get_task_files(task_id, offset, FILE_LIST_PAGE_SIZE).call())
             
             return file_hashes
             
@@ -226,30 +636,174 @@ class FileverseManager:
         Returns:
             File metadata
         """
+        key = self._file_hash_key(file_hash)
+        metadata = self.metadata_cache.get(key)
+        if metadata is not None:
+            return metadata
+        
         if not self.fileverse_integration:
             logger.error("FileverseIntegration contract not initialized")
             return None
             
         try:
-            # Convert file_hash to bytes32 if it's a string
-            if isinstance(file_hash, str) and file_hash.startswith('0x'):
-                file_hash_bytes = bytes.fromhex(file_hash[2:])
-            else:
-                file_hash_bytes = self.web3.keccak(text=file_hash)
-                
             # Get file metadata
-            name, description, mime_type, size = self.fileverse_integration.functions.get_file_metadata(file_hash_bytes).call()
+            values = self.fileverse_integration.functions.get_file_metadata(
+                self._file_hash_bytes(file_hash)
+            ).call()
             
-            return {
-                'name': name,
-                'description': description,
-                'mime_type': mime_type,
-                'size': size
-            }
+            metadata = self._format_metadata(values)
+            self.metadata_cache.put(key, metadata)
+            return metadata
             
         except Exception as e:
             logger.error(f"Error getting file metadata: {e}")
             return None
+    
+    def get_files_metadata(self, file_hashes):
+        """
+        Get metadata for several files.
+        
+        Cached files are served locally; the rest are read with one
+        get_files_metadata contract call per METADATA_BATCH_SIZE files.
+        
+        Args:
+            file_hashes: List of file hashes
+            
+        Returns:
+            List of file metadata in the same order (None for files that could not be read)
+        """
+        keys = [self._file_hash_key(file_hash) for file_hash in file_hashes]
+        found = {}
+        for key in keys:
+            if key not in found:
+                metadata = self.metadata_cache.get(key)
+                if metadata is not None:
+                    found[key] = metadata
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        
+        if missing and not self.fileverse_integration:
+            logger.error("FileverseIntegration contract not initialized")
+        elif missing:
+            try:
+                for start in range(0, len(missing), METADATA_BATCH_SIZE):
+                    found.update(self._read_files_metadata(missing[start:start + METADATA_BATCH_SIZE]))
+            except Exception as e:
+                logger.error(f"Error getting files metadata: {e}")
+        
+        return [found.get(key) for key in keys]
+    
+    def get_task_files_metadata(self, task_id):
+        """
+        Get metadata for every file of a task.
+        
+        Args:
+            task_id: Task ID
+            
+        Returns:
+            List of (file hash, file metadata) tuples
+        """
+        file_hashes = [self._file_hash_key(file_hash) for file_hash in self.get_task_files(task_id)]
+        return list(zip(file_hashes, self.get_files_metadata(file_hashes)))
+    
+    def find_files(self, task_id=None, uploader=None, mime_type=None, since=None, until=None,
+                   grantee=None, limit=None, offset=0):
+        """
+        Search recorded files in the local index without querying the chain.
+        
+        The index is filled from contract events by file_indexer.py, so no
+        contract list has to be paged through.
+        
+        Args:
+            task_id: Task ID (optional)
+            uploader: Uploader address (optional)
+            mime_type: MIME type, or a prefix ending in '*' such as 'image/*' (optional)
+            since: Earliest upload timestamp, inclusive (optional)
+            until: Latest upload timestamp, exclusive (optional)
+            grantee: Address that has access to the files (optional)
+            limit: Maximum number of records (optional)
+            offset: Number of records to skip
+            
+        Returns:
+            List of file records (file_hash, task_id, uploader, name, mime_type, size,
+            block_number, timestamp, transaction_hash, log_index), oldest first
+        """
+        try:
+            return self.file_index.query(
+                task_id=self._task_id_bytes(task_id) if task_id is not None else None,
+                uploader=uploader,
+                mime_type=mime_type,
+                since=since,
+                until=until,
+                grantee=grantee,
+                limit=limit,
+                offset=offset
+            )
+        except Exception as e:
+            logger.error(f"Error searching file index: {e}")
+            return []
+    
+    def _read_files_metadata(self, keys):
+        """Read metadata for uncached files from the contract and cache it."""
+        file_hashes = [bytes.fromhex(key[2:]) for key in keys]
+        try:
+            entries = self.fileverse_integration.functions.get_files_metadata(file_hashes).call()
+        except Exception as e:
+            # Contracts deployed before the bulk view: batch the single-file reads instead
+            logger.warning(f"Bulk metadata read failed, falling back to batched calls: {e}")
+            functions = [
+                self.fileverse_integration.functions.get_file_metadata(file_hash)
+                for file_hash in file_hashes
+            ]
+            entries = [
+                None if values is None else (file_hash, values[5]) + tuple(values[:5]) + (values[6],)
+                for file_hash, values in zip(file_hashes, batch_call(self.web3, functions))
+            ]
+        
+        found = {}
+        for key, file_hash, entry in zip(keys, file_hashes, entries):
+            # Unknown or inaccessible files come back as empty metadata
+            if entry is None or bytes(entry[0]) != file_hash:
+                continue
+            _, uploader, name, description, mime_type, size, upload_timestamp, task_id = entry
+            metadata = self._format_metadata(
+                (name, description, mime_type, size, upload_timestamp, uploader, task_id)
+            )
+            self.metadata_cache.put(key, metadata)
+            found[key] = metadata
+        return found
+    
+    def _task_id_bytes(self, task_id):
+        """Convert a task ID to bytes32."""
+        if isinstance(task_id, bytes):
+            return task_id
+        if isinstance(task_id, str) and task_id.startswith('0x'):
+            return bytes.fromhex(task_id[2:])
+        return self.web3.keccak(text=str(task_id))
+    
+    def _file_hash_bytes(self, file_hash):
+        """Convert a file hash to bytes32."""
+        if isinstance(file_hash, bytes):
+            return file_hash
+        if isinstance(file_hash, str) and file_hash.startswith('0x'):
+            return bytes.fromhex(file_hash[2:])
+        return self.web3.keccak(text=file_hash)
+    
+    def _file_hash_key(self, file_hash):
+        """Normalized 0x-prefixed hex form of a file hash."""
+        return Web3.to_hex(self._file_hash_bytes(file_hash))
+    
+    def _format_metadata(self, values):
+        """Convert the get_file_metadata return values to a dictionary."""
+        name, description, mime_type, size, upload_timestamp, uploader, task_id = values
+        return {
+            'name': name,
+            'description': description,
+            'mime_type': mime_type,
+            'size': size,
+            'upload_timestamp': upload_timestamp,
+            'uploader': uploader,
+            'task_id': Web3.to_hex(task_id)
+        }
 
 # Example usage
 if __name__ == "__main__":
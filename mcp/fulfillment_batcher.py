@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+# 結果送信のバッチャー
+# 結果を溜めておき、件数が上限に達したときか最初の結果から一定時間が経ったときに
+# まとめて1トランザクションで送信する
+
+from batcher import Batcher
+
+# contracts/Myrdal.vyのMAX_FULFILL_BATCHと揃える
+MAX_BATCH_SIZE = 20
+# 最初の結果を受け取ってから送信するまでの最大待ち時間（秒）
+MAX_BATCH_LATENCY = 1.0
+# 同時に送信処理を行うバッチ数
+MAX_INFLIGHT_BATCHES = 4
+
+
+class FulfillmentBatcher(Batcher):
+    def __init__(self, flush_callback, max_batch_size=MAX_BATCH_SIZE,
+                 max_latency=MAX_BATCH_LATENCY, max_inflight=MAX_INFLIGHT_BATCHES):
+        super().__init__(flush_callback, max_batch_size, max_latency, max_inflight)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# ブロックヘッダートラッカー
+# 直近のブロックハッシュを保持し、親ハッシュの不一致からチェーンのリオルグを検出して
+# 分岐したブロック番号を通知する
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ハッシュを保持する直近のブロック数（これより深いリオルグは検出できない）
+REORG_WINDOW = 128
+
+
+class HeaderTracker:
+    def __init__(self, web3, window=REORG_WINDOW):
+        self.web3 = web3
+        self.window = window
+        # ブロック番号 -> ブロックハッシュ（正規チェーンとして確認したもの）
+        self.hashes = {}
+        # リオルグ時に呼ばれるコールバック（async def callback(fork_block)）
+        self.reorg_listeners = []
+
+    def add_reorg_listener(self, callback):
+        """リオルグ検出時のコールバックを登録"""
+        self.reorg_listeners.append(callback)
+
+    async def get_block(self, block_number):
+        return await self.web3.eth.get_block(block_number)
+
+    async def on_new_block(self, head):
+        """新しいヘッドまでのヘッダーを取り込み、リオルグがあればリスナーに通知"""
+        fork_block = await self.update(head)
+        if fork_block is None:
+            return
+        for callback in self.reorg_listeners:
+            try:
+                await callback(fork_block)
+            except Exception as e:
+                logger.error(f"リオルグリスナーエラー: {str(e)}")
+
+    async def update(self, head):
+        """
+        新しいヘッドまでのヘッダーを取り込む
+        戻り値: リオルグで置き換えられた最初のブロック番号（リオルグがなければNone）
+        """
+        fork_block = None
+        if self.hashes:
+            # 保持している最新ブロックがまだ正規チェーン上にあるか確認
+            tip = min(max(self.hashes), head)
+            block = await self.get_block(tip)
+            if tip in self.hashes and block['hash'] != self.hashes[tip]:
+                fork_block = await self._find_fork(tip)
+                logger.warning(f"リオルグを検出しました: ブロック{fork_block}以降が置き換えられました")
+                for block_number in [n for n in self.hashes if n >= fork_block]:
+                    del self.hashes[block_number]
+
+        start = max(self.hashes) + 1 if self.hashes else head
+        for block_number in range(max(start, head - self.window + 1), head + 1):
+            block = await self.get_block(block_number)
+            parent_hash = self.hashes.get(block_number - 1)
+            if parent_hash is not None and block['parentHash'] != parent_hash:
+                # 取り込み中に別のリオルグが起きた場合は次回の更新で検出する
+                break
+            self.hashes[block_number] = block['hash']
+
+        for block_number in [n for n in self.hashes if n <= head - self.window]:
+            del self.hashes[block_number]
+        return fork_block
+
+    async def _find_fork(self, block_number):
+        """保持しているハッシュと一致するまで遡り、分岐したブロック番号を返す"""
+        while block_number - 1 in self.hashes:
+            block = await self.get_block(block_number - 1)
+            if block['hash'] == self.hashes[block_number - 1]:
+                return block_number
+            block_number -= 1
+        logger.error(f"リオルグが保持範囲（{self.window}ブロック）を超えています")
+        return block_number
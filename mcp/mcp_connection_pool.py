@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# MCPサーバーへのWebSocket接続プール
+# 1接続につき同時に1リクエストのみ送受信し、接続数でバックエンドごとの並列度を制御する
+
+import os
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import websockets
+from websockets.exceptions import ConnectionClosed
+from websockets.protocol import State
+
+logger = logging.getLogger(__name__)
+
+# 応答を待つ最大時間（秒）
+MCP_RESPONSE_TIMEOUT = float(os.getenv('MCP_RESPONSE_TIMEOUT', '120'))
+
+
+class MCPConnectionPool:
+    def __init__(self, name, url, size=1, timeout=MCP_RESPONSE_TIMEOUT):
+        self.name = name
+        self.url = url
+        self.size = size
+        self.timeout = timeout
+        # Noneは未接続のスロット（使用時に接続する）
+        self._idle = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(None)
+        self._connections = set()
+
+    async def connect(self):
+        """全スロットの接続を確立"""
+        slots = [await self._idle.get() for _ in range(self.size)]
+        try:
+            for i, ws in enumerate(slots):
+                if ws is None:
+                    slots[i] = await self._open()
+            logger.info(f"{self.name} MCPサーバーに{self.size}本の接続を確立しました")
+        except Exception as e:
+            logger.error(f"{self.name} MCPサーバー接続エラー: {str(e)}")
+        finally:
+            for ws in slots:
+                self._idle.put_nowait(ws)
+
+    async def _open(self):
+        ws = await websockets.connect(self.url)
+        self._connections.add(ws)
+        return ws
+
+    @asynccontextmanager
+    async def connection(self):
+        """空いている接続を1本借りる（切断されていれば再接続）"""
+        ws = await self._idle.get()
+        try:
+            if ws is None or ws.state is not State.OPEN:
+                self._connections.discard(ws)
+                ws = await self._open()
+            yield ws
+        except BaseException:
+            # 応答途中で失敗・キャンセルされた接続は前の応答が残っている可能性があるため再利用しない
+            broken, ws = ws, None
+            if broken is not None:
+                self._connections.discard(broken)
+                await broken.close()
+            raise
+        finally:
+            self._idle.put_nowait(ws)
+
+    async def request(self, request):
+        """リクエストを送信して応答を待つ"""
+        message = json.dumps(request)
+        sent = False
+        try:
+            async with self.connection() as ws:
+                await ws.send(message)
+                sent = True
+                return json.loads(await asyncio.wait_for(ws.recv(), self.timeout))
+        except ConnectionClosed:
+            # 送信前に切断されていた接続ならリクエストは届いていないため、新しい接続で1回だけ送り直す
+            if sent:
+                raise
+            logger.warning(f"{self.name} MCPサーバーとの接続が切れていたため再接続します")
+        async with self.connection() as ws:
+            await ws.send(message)
+            return json.loads(await asyncio.wait_for(ws.recv(), self.timeout))
+
+    async def close(self):
+        """全接続をクローズ"""
+        for ws in list(self._connections):
+            await ws.close()
+        self._connections.clear()
@@ -4,13 +4,25 @@
 
 import json
 import asyncio
-import websockets
 import logging
-from web3 import Web3
+import aiohttp
+from web3 import AsyncWeb3, Web3
 import os
 import sys
-import time
-import requests
+
+from collections import Counter, deque
+
+from event_scanner import EventScanner
+from checkpoint_store import CheckpointStore
+from mcp_connection_pool import MCPConnectionPool
+from signer_pool import SignerPool, SELECTION_LEAST_PENDING
+from confirmation_tracker import ConfirmationTracker
+from header_tracker import HeaderTracker, REORG_WINDOW
+from fulfillment_batcher import FulfillmentBatcher, MAX_BATCH_SIZE as MAX_FULFILL_BATCH
+from fee_strategy import FeeStrategy
+from rpc_client import BatchingAsyncHTTPProvider
+from result_store import ResultStore, encode_result
+from request_dedup import RequestDeduplicator, ActionResultCache, STATE_EXECUTING, STATE_SUBMITTED, STATE_CONFIRMED, STATE_FAILED
 
 # ロギング設定
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -18,20 +30,135 @@ logger = logging.getLogger(__name__)
 
 # 設定
 OASIS_RPC_URL = "https://sapphire.testnet.oasis.io"
-MCP_INTEGRATION_CONTRACT_ADDRESS = "0x0000000000000000000000000000000000000000"  # 実際のデプロイアドレスに置き換え
+OASIS_WS_URL = os.getenv('OASIS_WS_URL', "wss://testnet.sapphire.oasis.io/ws")  # 空文字の場合はHTTPポーリング
+MYRDAL_CONTRACT_ADDRESS = "0x0000000000000000000000000000000000000000"  # 実際のデプロイアドレスに置き換え
+MYRDAL_START_BLOCK = None  # 初回起動時にスキャンを開始するブロック（Noneの場合は最新ブロックから）
 ORACLE_PRIVATE_KEY = "0x0000000000000000000000000000000000000000000000000000000000000000"  # 実際の秘密鍵に置き換え
+ORACLE_PRIVATE_KEYS = [key for key in os.getenv('ORACLE_PRIVATE_KEYS', '').split(',') if key]  # 複数の署名アカウント（add_mcp_fulfillerで登録）
+SIGNER_SELECTION = os.getenv('SIGNER_SELECTION', SELECTION_LEAST_PENDING)  # 署名アカウントの選択方法（least_pending / round_robin）
+CHECKPOINT_INTERVAL = 10  # チェックポイント保存間隔（秒）
+CONFIRMATION_DEPTH = int(os.getenv('CONFIRMATION_DEPTH', '1'))  # 結果送信トランザクションを確定とみなす確認数
+RPC_CONNECTION_LIMIT = int(os.getenv('RPC_CONNECTION_LIMIT', '20'))  # RPCノードへの同時HTTP接続数
 FIREFOX_MCP_SERVER_URL = "ws://localhost:8765"
 PYPPETEER_MCP_SERVER_URL = "ws://localhost:8766"
 
-# コントラクトABI（実際のABIに置き換え）
-MCP_INTEGRATION_ABI = [
+# パイプライン設定（取り込み → MCPワーカー → オンチェーン送信）
+FIREFOX_CONCURRENCY = int(os.getenv('FIREFOX_CONCURRENCY', '2'))  # Firefox MCPサーバーへの同時リクエスト数
+PYPPETEER_CONCURRENCY = int(os.getenv('PYPPETEER_CONCURRENCY', '4'))  # pyppeteer MCPサーバーへの同時リクエスト数
+FULFILL_CONCURRENCY = int(os.getenv('FULFILL_CONCURRENCY', '4'))  # 同時に送信処理を行うバッチ数
+FULFILL_BATCH_SIZE = min(int(os.getenv('FULFILL_BATCH_SIZE', '20')), MAX_FULFILL_BATCH)  # 1トランザクションで完了するリクエスト数（MAX_FULFILL_BATCHを超える値は切り詰める）
+FULFILL_BATCH_LATENCY = float(os.getenv('FULFILL_BATCH_LATENCY', '1.0'))  # バッチを送信するまでの最大待ち時間（秒）
+BACKEND_QUEUE_SIZE = int(os.getenv('BACKEND_QUEUE_SIZE', '100'))  # バックエンドごとの待ちキュー長
+FULFILL_QUEUE_SIZE = int(os.getenv('FULFILL_QUEUE_SIZE', '100'))  # 送信待ちキュー長
+RESULT_STORE_BACKEND = os.getenv('RESULT_STORE_BACKEND', 'local')  # 大きな結果の保存先（local / fileverse）
+
+if FULFILL_BATCH_SIZE < 1:
+    raise ValueError(f"FULFILL_BATCH_SIZEは1以上にしてください: {FULFILL_BATCH_SIZE}")
+
+# アクションタイプ（contracts/Myrdal.vyのMCP_TYPE_*）
+MCP_TYPE_FIREFOX = 1
+MCP_TYPE_PYPPETEER = 2
+
+# 監視するイベント
+ORACLE_EVENT_NAMES = ['MCPRequestCreated', 'OracleRequestCreated']
+
+# MCPリクエストの構造体（contracts/Myrdal.vyのMCPRequest）
+MCP_REQUEST_COMPONENTS = [
+    {"name": "id", "type": "bytes32"},
+    {"name": "task_id", "type": "bytes32"},
+    {"name": "action_type", "type": "uint8"},
+    {"name": "action_data", "type": "string"},
+    {"name": "callback_function_selector", "type": "bytes4"},
+    {"name": "timestamp", "type": "uint256"},
+    {"name": "fulfilled", "type": "bool"},
+    {"name": "result", "type": "string"}
+]
+
+# オラクルリクエストの構造体（contracts/Myrdal.vyのOracleRequest）
+ORACLE_REQUEST_COMPONENTS = [
+    {"name": "id", "type": "bytes32"},
+    {"name": "task_id", "type": "bytes32"},
+    {"name": "data", "type": "string"},
+    {"name": "callback_function_selector", "type": "bytes4"},
+    {"name": "timestamp", "type": "uint256"},
+    {"name": "fulfilled", "type": "bool"},
+    {"name": "result", "type": "string"}
+]
+
+# コントラクトABI（contracts/Myrdal.vyのうちオラクルが使用する部分）
+MYRDAL_ORACLE_ABI = [
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": False, "name": "request_id", "type": "bytes32"},
+            {"indexed": False, "name": "task_id", "type": "bytes32"},
+            {"indexed": False, "name": "action_type", "type": "uint8"},
+            {"indexed": False, "name": "timestamp", "type": "uint256"}
+        ],
+        "name": "MCPRequestCreated",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": False, "name": "request_id", "type": "bytes32"},
+            {"indexed": False, "name": "task_id", "type": "bytes32"},
+            {"indexed": False, "name": "timestamp", "type": "uint256"}
+        ],
+        "name": "OracleRequestCreated",
+        "type": "event"
+    },
+    {
+        "inputs": [{"name": "request_id", "type": "bytes32"}],
+        "name": "get_mcp_request",
+        "outputs": [{"components": MCP_REQUEST_COMPONENTS, "name": "", "type": "tuple"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "request_id", "type": "bytes32"}],
+        "name": "get_oracle_request",
+        "outputs": [{"components": ORACLE_REQUEST_COMPONENTS, "name": "", "type": "tuple"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"name": "request_id", "type": "bytes32"},
+            {"name": "result", "type": "string"}
+        ],
+        "name": "complete_mcp_request",
+        "outputs": [{"name": "", "type": "bool"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
     {
         "inputs": [
             {"name": "request_id", "type": "bytes32"},
             {"name": "result", "type": "string"}
         ],
-        "name": "fulfill_request",
-        "outputs": [],
+        "name": "complete_oracle_request",
+        "outputs": [{"name": "", "type": "bool"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"name": "request_ids", "type": "bytes32[]"},
+            {"name": "results", "type": "string[]"}
+        ],
+        "name": "complete_mcp_requests",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"name": "request_ids", "type": "bytes32[]"},
+            {"name": "results", "type": "string[]"}
+        ],
+        "name": "complete_oracle_requests",
+        "outputs": [{"name": "", "type": "uint256"}],
         "stateMutability": "nonpayable",
         "type": "function"
     }
@@ -39,149 +166,427 @@ MCP_INTEGRATION_ABI = [
 
 class MCPOracle:
     def __init__(self):
-        self.web3 = Web3(Web3.HTTPProvider(OASIS_RPC_URL))
-        self.account = self.web3.eth.account.from_key(ORACLE_PRIVATE_KEY)
+        # イベントループを止めないよう非同期プロバイダーを使用
+        # （同時に発行された読み出しはJSON-RPCバッチにまとめ、変化しない応答はキャッシュする）
+        self.web3 = AsyncWeb3(BatchingAsyncHTTPProvider(OASIS_RPC_URL))
+        self.http_session = None
+        self.accounts = [
+            self.web3.eth.account.from_key(key)
+            for key in (ORACLE_PRIVATE_KEYS or [ORACLE_PRIVATE_KEY])
+        ]
+        # 読み出しの送信元には最初のアカウントを使う
+        self.account = self.accounts[0]
         self.contract = self.web3.eth.contract(
-            address=MCP_INTEGRATION_CONTRACT_ADDRESS,
-            abi=MCP_INTEGRATION_ABI
+            address=MYRDAL_CONTRACT_ADDRESS,
+            abi=MYRDAL_ORACLE_ABI
+        )
+        # 前回処理したブロックの次から再開
+        self.checkpoint_store = CheckpointStore(name=MYRDAL_CONTRACT_ADDRESS)
+        cursor = self.checkpoint_store.get_cursor()
+        self.scanner = EventScanner(
+            self.web3,
+            self.contract,
+            ORACLE_EVENT_NAMES,
+            ws_url=OASIS_WS_URL or None,
+            start_block=cursor + 1 if cursor is not None else MYRDAL_START_BLOCK
+        )
+        # 同じrequest_idは1回だけ実行・送信する（送信済み以降の状態はチェックポイントストアに保存）
+        self.deduplicator = RequestDeduplicator(self.checkpoint_store)
+        # 同一の(action, params)はACTION_CACHE_TTLの間1回の実行結果を共有する
+        self.action_cache = ActionResultCache()
+        # 受領は新しいブロックごとにまとめて確認する
+        self.confirmation_tracker = ConfirmationTracker(self.web3, confirmations=CONFIRMATION_DEPTH)
+        # 親ハッシュの不一致でリオルグを検出し、影響を受けたリクエストを再取り込み・再送する
+        self.header_tracker = HeaderTracker(self.web3)
+        self.header_tracker.add_reorg_listener(self.handle_reorg)
+        # 確定した結果送信（受領のブロック番号, 送信した結果）をリオルグ検出範囲の分だけ保持
+        self.recent_fulfillments = deque(maxlen=REORG_WINDOW)
+        # ガス見積もりのキャッシュとEIP-1559の手数料
+        self.fee_strategy = FeeStrategy(self.web3)
+        # アカウントごとにノンスをローカルで払い出し、受領を待たずに次のトランザクションを送信する
+        self.signer_pool = SignerPool(
+            self.web3, self.accounts, self.confirmation_tracker, self.fee_strategy,
+            selection=SIGNER_SELECTION, confirmations=CONFIRMATION_DEPTH
+        )
+        self.confirmation_tracker.add_block_listener(self.header_tracker.on_new_block)
+        self.confirmation_tracker.add_block_listener(self.reconcile_transactions)
+        # 結果は件数か待ち時間の上限でまとめて送信する
+        self.fulfillment_batcher = FulfillmentBatcher(
+            self.fulfill_batch,
+            max_batch_size=FULFILL_BATCH_SIZE,
+            max_latency=FULFILL_BATCH_LATENCY,
+            max_inflight=FULFILL_CONCURRENCY
         )
-        self.firefox_ws = None
-        self.pyppeteer_ws = None
-        self.pending_requests = {}
+        # 大きな結果はオフチェーンに保存し、オンチェーンにはハッシュと要約のみを送る
+        fileverse_manager = None
+        if RESULT_STORE_BACKEND == 'fileverse':
+            from fileverse_manager import FileverseManager
+            fileverse_manager = FileverseManager(OASIS_RPC_URL)
+        self.result_store = ResultStore(fileverse_manager=fileverse_manager)
+        # 配信済みで処理が終わっていないイベントのブロック番号
+        self.inflight_blocks = Counter()
+        # バックエンドごとの接続プール（接続数 = 同時実行数）
+        self.mcp_pools = {
+            MCP_TYPE_FIREFOX: MCPConnectionPool('Firefox', FIREFOX_MCP_SERVER_URL, FIREFOX_CONCURRENCY),
+            MCP_TYPE_PYPPETEER: MCPConnectionPool('pyppeteer', PYPPETEER_MCP_SERVER_URL, PYPPETEER_CONCURRENCY)
+        }
+    
+    async def connect_to_chain(self):
+        """RPCノードへのHTTP接続をキープアライブ付きのセッションで共有"""
+        self.http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=RPC_CONNECTION_LIMIT, keepalive_timeout=60)
+        )
+        await self.web3.provider.cache_async_session(self.http_session)
+        logger.info(f"RPCノードに接続しました: chain_id={await self.web3.eth.chain_id}")
     
     async def connect_to_mcp_servers(self):
         """MCPサーバーに接続"""
-        try:
-            self.firefox_ws = await websockets.connect(FIREFOX_MCP_SERVER_URL)
-            logger.info("Firefox MCPサーバーに接続しました")
-        except Exception as e:
-            logger.error(f"Firefox MCPサーバー接続エラー: {str(e)}")
-        
-        try:
-            self.pyppeteer_ws = await websockets.connect(PYPPETEER_MCP_SERVER_URL)
-            logger.info("pyppeteer MCPサーバーに接続しました")
-        except Exception as e:
-            logger.error(f"pyppeteer MCPサーバー接続エラー: {str(e)}")
+        for pool in self.mcp_pools.values():
+            await pool.connect()
     
     async def listen_for_events(self):
-        """コントラクトイベントをリッスン"""
-        # 実際の実装ではWeb3.pyのイベントフィルターを使用
-        # ここではモック実装
+        """コントラクトイベントをリッスンし、パイプラインに流す"""
         logger.info("コントラクトイベントのリッスンを開始")
+        backend_queues = {
+            action_type: asyncio.Queue(maxsize=BACKEND_QUEUE_SIZE)
+            for action_type in self.mcp_pools
+        }
+        fulfill_queue = asyncio.Queue(maxsize=FULFILL_QUEUE_SIZE)
+        
+        workers = [
+            asyncio.create_task(self.checkpoint_loop()),
+            asyncio.create_task(self.confirmation_tracker.run())
+        ]
+        for action_type, pool in self.mcp_pools.items():
+            for _ in range(pool.size):
+                workers.append(asyncio.create_task(
+                    self.dispatch_worker(backend_queues[action_type], fulfill_queue)
+                ))
+        workers.append(asyncio.create_task(self.fulfill_worker(fulfill_queue)))
+        
+        try:
+            async for event in self.scanner.events():
+                self.inflight_blocks[event['block_number']] += 1
+                if not self.deduplicator.claim(event['request_id']):
+                    # 再スキャンやリトライで受け取った重複イベント
+                    logger.info(f"重複したリクエストをスキップ: {Web3.to_hex(event['request_id'])}")
+                    self.finish_event(event)
+                    continue
+                queue = backend_queues.get(event.get('action_type'))
+                if event.get('event') != 'MCPRequestCreated' or queue is None:
+                    # MCPアクション以外はここで処理を終える
+                    await self.process_event(event)
+                    self.finish_event(event)
+                    continue
+                # キューが満杯の場合は空くまで取り込みを待つ
+                await queue.put(event)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self.save_checkpoint()
+    
+    async def dispatch_worker(self, queue, fulfill_queue):
+        """MCPサーバーでアクションを実行し、結果を送信キューに渡す"""
         while True:
-            # モックイベントデータ（実際の実装では削除）
-            mock_events = self.get_mock_events()
-            for event in mock_events:
-                await self.process_event(event)
+            event = await queue.get()
+            try:
+                result = await self.execute_event(event)
+            except Exception as e:
+                logger.error(f"イベント処理エラー: {str(e)}")
+                result = None
             
-            await asyncio.sleep(5)  # ポーリング間隔
+            if result is None:
+                self.deduplicator.release(event['request_id'])
+                self.finish_event(event)
+            else:
+                await fulfill_queue.put((event, result))
     
-    def get_mock_events(self):
-        """モックイベントを生成（実際の実装では削除）"""
-        # 実際の実装では削除し、Web3.pyのイベントフィルターを使用
-        return []
+    async def fulfill_worker(self, fulfill_queue):
+        """実行結果をバッチャーに渡す"""
+        while True:
+            event, result = await fulfill_queue.get()
+            await self.fulfillment_batcher.add((event, result))
+    
+    async def fulfill_batch(self, items):
+        """まとめた結果をコントラクトに送信し、処理済みとして記録"""
+        try:
+            sent = await self.send_results_to_contract(
+                [(event['request_id'], result) for event, result in items]
+            )
+            for event, _ in items:
+                if sent:
+                    self.deduplicator.set_state(event['request_id'], STATE_SUBMITTED, event.get('block_number'))
+                else:
+                    self.deduplicator.release(event['request_id'])
+        finally:
+            for event, _ in items:
+                self.finish_event(event)
+    
+    def finish_event(self, event):
+        """イベントの処理完了を記録"""
+        block_number = event['block_number']
+        self.inflight_blocks[block_number] -= 1
+        if self.inflight_blocks[block_number] <= 0:
+            del self.inflight_blocks[block_number]
+    
+    def save_checkpoint(self):
+        """処理が完了したブロックまでをカーソルとして保存"""
+        if self.scanner.next_block is None:
+            return
+        cursor = self.scanner.next_block - 1
+        if self.inflight_blocks:
+            cursor = min(cursor, min(self.inflight_blocks) - 1)
+        if cursor >= 0:
+            self.checkpoint_store.set_cursor(cursor)
+            # カーソルより前のイベントはリオルグ（分岐以降の記録は取り消される）以外で再取り込みされないため、
+            # 確認数より古いブロックの処理済み記録は削除する
+            self.checkpoint_store.prune_processed(cursor - CONFIRMATION_DEPTH)
+    
+    async def checkpoint_loop(self):
+        """定期的にチェックポイントを保存"""
+        while True:
+            await asyncio.sleep(CHECKPOINT_INTERVAL)
+            try:
+                self.save_checkpoint()
+            except Exception as e:
+                logger.error(f"チェックポイント保存エラー: {str(e)}")
+    
+    async def reconcile_transactions(self, block_number):
+        """新しいブロックごとに送信済みトランザクションを確認し、置き換えられたものを再送"""
+        mined, replaced = await self.signer_pool.reconcile()
+        for entry in mined:
+            if entry.receipt.status == 1:
+                for request_id, _ in entry.meta or []:
+                    self.deduplicator.set_state(request_id, STATE_CONFIRMED)
+                if entry.meta:
+                    self.recent_fulfillments.append((entry.receipt.blockNumber, entry.meta))
+            else:
+                logger.error(f"トランザクションが失敗しました: {entry.tx_hash.hex()}")
+                if entry.tx and entry.receipt.gasUsed >= entry.tx.get('gas', 0):
+                    # ガス不足の場合は見積もりを破棄して再送
+                    self.fee_strategy.gas_limits.clear()
+                    if entry.meta:
+                        await self.send_results_to_contract(entry.meta)
+                elif entry.meta:
+                    await self.handle_reverted_results(entry.meta)
+        for entry in replaced:
+            if entry.meta:
+                await self.send_results_to_contract(entry.meta)
+    
+    async def handle_reverted_results(self, results):
+        """
+        ガス不足以外の理由でリバートした結果送信を処理
+        まとめて送った結果は1件ずつ送り直し、1件で失敗したものは失敗として記録する
+        （送信済みのまま残ると再起動後も再送も解放もされないため）
+        """
+        if len(results) > 1:
+            for request_id, result in results:
+                if not await self.send_results_to_contract([(request_id, result)]):
+                    # 送信前の見積もりでリバートした場合など
+                    self.deduplicator.set_state(request_id, STATE_FAILED)
+            return
+        
+        request_id, _ = results[0]
+        try:
+            request = await self.contract.functions.get_mcp_request(request_id).call(
+                {'from': self.account.address}
+            )
+            fulfilled = request[6]
+        except Exception:
+            # リクエストが存在しない
+            fulfilled = False
+        if fulfilled:
+            # 他の送信で既に完了していた
+            self.deduplicator.set_state(request_id, STATE_CONFIRMED)
+        else:
+            logger.error(f"リクエストを完了できませんでした: {Web3.to_hex(request_id)}")
+            self.deduplicator.set_state(request_id, STATE_FAILED)
+    
+    async def handle_reorg(self, fork_block):
+        """リオルグで置き換えられたブロック以降のイベントを再取り込みし、失われた結果を再送"""
+        logger.warning(f"リオルグ: ブロック{fork_block}以降のリクエストを再確認します")
+        # イベントの再スキャン（チェーンに残ったリクエストは処理済み記録を消して再取り込み）
+        self.checkpoint_store.rewind(fork_block)
+        self.scanner.rewind(fork_block)
+        
+        affected = [results for block_number, results in self.recent_fulfillments if block_number >= fork_block]
+        kept = [entry for entry in self.recent_fulfillments if entry[0] < fork_block]
+        self.recent_fulfillments.clear()
+        self.recent_fulfillments.extend(kept)
+        
+        # 取り消された結果送信のうち、まだ完了していないリクエストを再送
+        for results in affected:
+            pending = []
+            for request_id, result in results:
+                try:
+                    request = await self.contract.functions.get_mcp_request(request_id).call(
+                        {'from': self.account.address}
+                    )
+                except Exception:
+                    # リクエスト自体がリオルグで消えた
+                    continue
+                if not request[6]:
+                    pending.append((request_id, result))
+            if pending:
+                await self.send_results_to_contract(pending)
+    
+    async def load_request(self, event):
+        """イベントに対応するリクエスト内容をコントラクトから読み出す（完了済みの場合はNone）"""
+        request_id = event['request_id']
+        if event['event'] == 'MCPRequestCreated':
+            request = await self.contract.functions.get_mcp_request(request_id).call(
+                {'from': self.account.address}
+            )
+            if request[6]:
+                return None
+            return json.loads(request[3] or '{}')
+        
+        request = await self.contract.functions.get_oracle_request(request_id).call(
+            {'from': self.account.address}
+        )
+        if request[5]:
+            return None
+        return {'prompt': request[2]}
     
     async def process_event(self, event):
-        """イベントを処理"""
+        """イベントを処理（アクション実行から結果送信まで）"""
+        result = await self.execute_event(event)
+        if result is None:
+            self.deduplicator.release(event['request_id'])
+        else:
+            await self.fulfill_event(event, result)
+    
+    async def execute_event(self, event):
+        """イベントに対応するアクションを実行して結果を返す（処理不要の場合はNone）"""
         request_id = event.get('request_id')
         action_type = event.get('action_type')
-        action_data = event.get('action_data')
         
-        logger.info(f"イベント処理: request_id={request_id}, action_type={action_type}")
+        logger.info(f"イベント処理: request_id={Web3.to_hex(request_id)}, event={event.get('event')}, action_type={action_type}")
+        
+        if event.get('event') == 'OracleRequestCreated':
+            # LLM補完リクエストはこのオラクルでは処理しない
+            logger.warning(f"LLMオラクルリクエストは未対応です: {Web3.to_hex(request_id)}")
+            return None
+        
+        if action_type not in self.mcp_pools:
+            logger.error(f"不明なアクションタイプ: {action_type}")
+            return None
+        
+        self.deduplicator.set_state(request_id, STATE_EXECUTING)
+        action_data = await self.load_request(event)
+        if action_data is None:
+            # リオルグ後の再取り込みなどで既に完了しているリクエスト
+            logger.info(f"完了済みのリクエストをスキップ: {Web3.to_hex(request_id)}")
+            self.deduplicator.set_state(request_id, STATE_CONFIRMED, event.get('block_number'))
+            return None
         
         # アクションタイプに基づいて適切なMCPサーバーを選択
-        if action_type == 1:  # Firefox
+        if action_type == MCP_TYPE_FIREFOX:
             result = await self.execute_firefox_action(request_id, action_data)
-        elif action_type == 2:  # pyppeteer
-            result = await self.execute_pyppeteer_action(request_id, action_data)
         else:
-            logger.error(f"不明なアクションタイプ: {action_type}")
-            return
+            result = await self.execute_pyppeteer_action(request_id, action_data)
         
-        # 結果をコントラクトに送信
-        await self.send_result_to_contract(request_id, result)
+        try:
+            return await self.result_store.prepare(result, Web3.to_hex(event['task_id']))
+        except Exception as e:
+            logger.error(f"結果の保存エラー: {str(e)}")
+            return {'status': 'error', 'message': f"result too large to submit: {str(e)}"}
+    
+    async def fulfill_event(self, event, result):
+        """結果をコントラクトに送信し、処理済みとして記録"""
+        request_id = event['request_id']
+        if await self.send_result_to_contract(request_id, result):
+            self.deduplicator.set_state(request_id, STATE_SUBMITTED, event.get('block_number'))
+        else:
+            self.deduplicator.release(request_id)
     
     async def execute_firefox_action(self, request_id, action_data):
         """Firefox MCPサーバーでアクションを実行"""
-        if not self.firefox_ws:
-            logger.error("Firefox MCPサーバーに接続されていません")
-            return {'status': 'error', 'message': 'Firefox MCPサーバーに接続されていません'}
-        
-        try:
-            request = {
-                'id': request_id,
-                'action': action_data.get('action', ''),
-                'params': action_data.get('params', {})
-            }
-            
-            await self.firefox_ws.send(json.dumps(request))
-            response = await self.firefox_ws.recv()
-            return json.loads(response).get('result', {})
-        except Exception as e:
-            logger.error(f"Firefox MCPアクション実行エラー: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+        return await self.execute_mcp_action(self.mcp_pools[MCP_TYPE_FIREFOX], request_id, action_data)
     
     async def execute_pyppeteer_action(self, request_id, action_data):
         """pyppeteer MCPサーバーでアクションを実行"""
-        if not self.pyppeteer_ws:
-            logger.error("pyppeteer MCPサーバーに接続されていません")
-            return {'status': 'error', 'message': 'pyppeteer MCPサーバーに接続されていません'}
-        
+        return await self.execute_mcp_action(self.mcp_pools[MCP_TYPE_PYPPETEER], request_id, action_data)
+    
+    async def execute_mcp_action(self, pool, request_id, action_data):
+        """接続プールから1本借りてMCPアクションを実行"""
         try:
             request = {
-                'id': request_id,
+                'id': Web3.to_hex(request_id),
                 'action': action_data.get('action', ''),
                 'params': action_data.get('params', {})
             }
             
-            await self.pyppeteer_ws.send(json.dumps(request))
-            response = await self.pyppeteer_ws.recv()
-            return json.loads(response).get('result', {})
+            async def execute():
+                response = await pool.request(request)
+                return response.get('result', {})
+            
+            # 同一の(action, params)が実行中・キャッシュ済みであれば結果を共有する
+            return await self.action_cache.run(request['action'], request['params'], execute)
         except Exception as e:
-            logger.error(f"pyppeteer MCPアクション実行エラー: {str(e)}")
+            logger.error(f"{pool.name} MCPアクション実行エラー: {str(e)}")
             return {'status': 'error', 'message': str(e)}
     
     async def send_result_to_contract(self, request_id, result):
         """結果をスマートコントラクトに送信"""
-        logger.info(f"結果をコントラクトに送信: {request_id}")
+        return await self.send_results_to_contract([(request_id, result)])
+    
+    async def send_results_to_contract(self, results):
+        """
+        複数の結果を1トランザクションでスマートコントラクトに送信
+        （受領は待たずに確認トラッカーで確認）
+        """
+        request_ids = [request_id for request_id, _ in results]
+        logger.info(f"結果をコントラクトに送信: {len(results)}件 {[Web3.to_hex(request_id) for request_id in request_ids]}")
         
+        signer = self.signer_pool.select()
+        nonce_manager = signer.nonce_manager
+        nonce = await nonce_manager.allocate()
         try:
             # 結果をJSON文字列に変換
-            result_str = json.dumps(result)
+            result_strs = [encode_result(result) for _, result in results]
+            
+            # トランザクション作成（1件の場合は単体の関数を使用）
+            if len(results) == 1:
+                function = self.contract.functions.complete_mcp_request(request_ids[0], result_strs[0])
+            else:
+                function = self.contract.functions.complete_mcp_requests(request_ids, result_strs)
             
-            # トランザクション作成
-            tx = self.contract.functions.fulfill_request(
-                request_id,
-                result_str
-            ).build_transaction({
-                'from': self.account.address,
-                'nonce': self.web3.eth.get_transaction_count(self.account.address),
-                'gas': 500000,
-                'gasPrice': self.web3.eth.gas_price
-            })
+            # ガスは件数と結果の長さ（256バイト単位）ごとに1回だけ見積もる
+            gas_key = (function.fn_name, len(results), max(len(result_str.encode()) for result_str in result_strs) // 256)
+            tx_params = {'from': signer.address, 'nonce': nonce}
+            tx_params['gas'] = await self.fee_strategy.gas_limit(gas_key, function, tx_params)
+            tx_params.update(await self.fee_strategy.fee_params())
+            tx = await function.build_transaction(tx_params)
             
             # トランザクション署名
-            signed_tx = self.web3.eth.account.sign_transaction(tx, self.account.key)
+            signed_tx = self.web3.eth.account.sign_transaction(tx, signer.account.key)
             
             # トランザクション送信
-            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            
-            # トランザクション確認待ち
-            receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
-            
-            logger.info(f"トランザクション完了: {receipt.transactionHash.hex()}")
-            return True
+            tx_hash = await self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
         except Exception as e:
+            nonce_manager.release(nonce)
             logger.error(f"コントラクト送信エラー: {str(e)}")
             return False
+        
+        nonce_manager.track(nonce, tx_hash, signed_tx.rawTransaction, meta=results, tx=tx)
+        logger.info(f"トランザクション送信: from={signer.address}, nonce={nonce}, tx={tx_hash.hex()}")
+        return True
     
     async def cleanup(self):
         """リソースのクリーンアップ"""
-        if self.firefox_ws:
-            await self.firefox_ws.close()
+        await self.fulfillment_batcher.close()
+        
+        for pool in self.mcp_pools.values():
+            await pool.close()
+        
+        if self.http_session:
+            await self.http_session.close()
+        
+        if self.result_store.fileverse_manager:
+            await asyncio.to_thread(self.result_store.fileverse_manager.close)
         
-        if self.pyppeteer_ws:
-            await self.pyppeteer_ws.close()
+        self.checkpoint_store.close()
         
         logger.info("接続をクローズしました")
 
@@ -189,6 +594,7 @@ async def main():
     """メイン関数"""
     oracle = MCPOracle()
     try:
+        await oracle.connect_to_chain()
         await oracle.connect_to_mcp_servers()
         await oracle.listen_for_events()
     finally:
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# Myrdalメモリのオフチェーンインデックス
+# MemoryStored / MemoryDeletedイベントをSQLiteに取り込み、複数タグのAND / OR検索を
+# eth_callのガス上限やコントラクトの走査上限（MAX_LIST_SCAN）に制限されずに行う
+
+import os
+
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from event_indexer import EventIndex, EventIndexer, run_indexer, run_main
+
+MEMORY_INDEX_DB_PATH = os.getenv('MEMORY_INDEX_DB', 'memory_index.db')
+# 取り込むイベント
+MEMORY_INDEX_EVENT_NAMES = ['MemoryStored', 'MemoryDeleted']
+# 初回起動時にスキャンを開始するブロック（未設定の場合は最新ブロックから）
+MEMORY_INDEX_START_BLOCK = os.getenv('MEMORY_INDEX_START_BLOCK')
+
+# メモリの構造体（contracts/Myrdal.vyのMemoryEntry）
+MEMORY_ENTRY_COMPONENTS = [
+    {"name": "id", "type": "bytes32"},
+    {"name": "owner", "type": "address"},
+    {"name": "content", "type": "string"},
+    {"name": "created_at", "type": "uint256"},
+    {"name": "priority", "type": "uint8"},
+    {"name": "tags", "type": "string[]"},
+    {"name": "encrypted", "type": "bool"}
+]
+
+# コントラクトABI（contracts/Myrdal.vyのうちインデクサーが使用する部分）
+MYRDAL_MEMORY_ABI = [
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": False, "name": "memory_id", "type": "bytes32"},
+            {"indexed": False, "name": "task_id", "type": "bytes32"},
+            {"indexed": False, "name": "timestamp", "type": "uint256"}
+        ],
+        "name": "MemoryStored",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": False, "name": "memory_id", "type": "bytes32"},
+            {"indexed": False, "name": "timestamp", "type": "uint256"}
+        ],
+        "name": "MemoryDeleted",
+        "type": "event"
+    },
+    {
+        "inputs": [{"name": "memory_id", "type": "bytes32"}],
+        "name": "get_memory",
+        "outputs": [{"components": MEMORY_ENTRY_COMPONENTS, "name": "", "type": "tuple"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+MEMORY_COLUMNS = ('memory_id', 'owner', 'task_id', 'priority', 'created_at', 'block_number')
+
+
+class MemoryIndex(EventIndex):
+    def __init__(self, path=MEMORY_INDEX_DB_PATH):
+        super().__init__(path)
+
+    def create_tables(self):
+        # 削除はdeleted_blockで記録する（リオルグで削除が取り消された場合に戻せるように）
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS memories ('
+            'memory_id TEXT PRIMARY KEY, owner TEXT, task_id TEXT, priority INTEGER, created_at INTEGER, '
+            'block_number INTEGER NOT NULL, log_index INTEGER NOT NULL, deleted_block INTEGER)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS memory_tags ('
+            'memory_id TEXT NOT NULL, tag TEXT NOT NULL, PRIMARY KEY (tag, memory_id))'
+        )
+        for table, column in (('memories', 'owner'), ('memories', 'block_number'),
+                              ('memories', 'deleted_block'), ('memory_tags', 'memory_id')):
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column})')
+
+    def add_memory(self, event, memory=None):
+        """
+        MemoryStoredイベントを取り込む（同じメモリは上書き）
+        memoryはget_memoryの結果（取得できなかった場合はNoneでタグなしとして記録）
+        """
+        memory_id = Web3.to_hex(event['memory_id'])
+        task_id = event['task_id']
+        self.conn.execute(
+            'INSERT OR REPLACE INTO memories (memory_id, owner, task_id, priority, created_at, block_number, '
+            'log_index, deleted_block) VALUES (?, ?, ?, ?, ?, ?, ?, NULL)',
+            (
+                memory_id,
+                Web3.to_checksum_address(memory['owner']) if memory else None,
+                Web3.to_hex(task_id) if any(task_id) else None,
+                memory['priority'] if memory else None,
+                event['timestamp'],
+                event['block_number'],
+                event['log_index']
+            )
+        )
+        self.conn.execute('DELETE FROM memory_tags WHERE memory_id = ?', (memory_id,))
+        if memory:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO memory_tags (memory_id, tag) VALUES (?, ?)',
+                [(memory_id, tag) for tag in memory['tags']]
+            )
+        self.conn.commit()
+
+    def delete_memory(self, event):
+        """MemoryDeletedイベントを取り込む"""
+        self.conn.execute(
+            'UPDATE memories SET deleted_block = ? WHERE memory_id = ?',
+            (event['block_number'], Web3.to_hex(event['memory_id']))
+        )
+        self.conn.commit()
+
+    def discard_from(self, block_number):
+        """リオルグで置き換えられたブロック以降の保存・削除を取り消す"""
+        self.conn.execute(
+            'DELETE FROM memory_tags WHERE memory_id IN (SELECT memory_id FROM memories WHERE block_number >= ?)',
+            (block_number,)
+        )
+        self.conn.execute('DELETE FROM memories WHERE block_number >= ?', (block_number,))
+        self.conn.execute('UPDATE memories SET deleted_block = NULL WHERE deleted_block >= ?', (block_number,))
+
+    def search(self, tags, require_all=True, owner=None, limit=None, offset=0):
+        """
+        タグでメモリを検索し、古い順に返す
+        require_all=Trueは全てのタグを持つメモリ（AND）、Falseはいずれかのタグを持つメモリ（OR、重複なし）
+        ownerを指定するとそのユーザーのメモリに絞り込む
+        """
+        tags = list(dict.fromkeys(tags))
+        if not tags:
+            raise ValueError("At least one tag is required")
+
+        params = list(tags)
+        sql = (
+            f"SELECT {', '.join('m.' + column for column in MEMORY_COLUMNS)} FROM memories m "
+            f"JOIN memory_tags t ON t.memory_id = m.memory_id "
+            f"WHERE t.tag IN ({', '.join('?' * len(tags))}) AND m.deleted_block IS NULL"
+        )
+        if owner is not None:
+            sql += ' AND m.owner = ?'
+            params.append(Web3.to_checksum_address(owner))
+        sql += ' GROUP BY m.memory_id'
+        if require_all:
+            sql += ' HAVING COUNT(*) = ?'
+            params.append(len(tags))
+        sql += ' ORDER BY m.block_number, m.log_index'
+        if limit is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params.extend([limit, offset])
+        return [dict(zip(MEMORY_COLUMNS, row)) for row in self.conn.execute(sql, params)]
+
+
+class MemoryIndexer(EventIndexer):
+    event_names = MEMORY_INDEX_EVENT_NAMES
+    record_label = 'メモリ'
+
+    async def get_memory(self, memory_id):
+        """メモリのタグと所有者を取得（既に削除されている場合はNone）"""
+        try:
+            memory = await self.contract.functions.get_memory(memory_id).call()
+        except ContractLogicError:
+            # 後続のMemoryDeletedイベントで削除済みとして記録される
+            return None
+        return dict(zip((component['name'] for component in MEMORY_ENTRY_COMPONENTS), memory))
+
+    async def handle_event(self, event):
+        if event['event'] == 'MemoryStored':
+            self.index.add_memory(event, await self.get_memory(event['memory_id']))
+        elif event['event'] == 'MemoryDeleted':
+            self.index.delete_memory(event)
+
+
+async def main():
+    """メイン関数"""
+    await run_indexer(MemoryIndexer, MemoryIndex(), os.getenv('MYRDAL_CONTRACT_ADDRESS'), MYRDAL_MEMORY_ABI,
+                      MEMORY_INDEX_START_BLOCK)
+
+if __name__ == "__main__":
+    run_main(main)
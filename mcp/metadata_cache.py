@@ -0,0 +1,93 @@
+"""
+Cache of on-chain Fileverse file metadata
+
+File metadata does not change once it is recorded, so lookups are served from
+an in-memory LRU and, optionally, a SQLite file that survives restarts.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Number of entries kept in memory
+METADATA_CACHE_SIZE = int(os.getenv('FILEVERSE_METADATA_CACHE_SIZE', '10000'))
+# SQLite file for persisting the cache (memory only when unset)
+METADATA_CACHE_PATH = os.getenv('FILEVERSE_METADATA_CACHE_PATH')
+
+
+class MetadataCache:
+    def __init__(self, max_size=METADATA_CACHE_SIZE, path=METADATA_CACHE_PATH):
+        """
+        Initialize the metadata cache.
+
+        Args:
+            max_size: Maximum number of entries kept in memory
+            path: SQLite file for on-disk persistence (optional)
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS file_metadata (file_hash TEXT PRIMARY KEY, metadata TEXT NOT NULL)'
+            )
+            self.conn.commit()
+
+    def get(self, file_hash):
+        """Return the cached metadata for a file hash, or None."""
+        with self.lock:
+            metadata = self.entries.get(file_hash)
+            if metadata is not None:
+                self.entries.move_to_end(file_hash)
+                self.hits += 1
+                return metadata
+
+            if self.conn is not None:
+                row = self.conn.execute(
+                    'SELECT metadata FROM file_metadata WHERE file_hash = ?', (file_hash,)
+                ).fetchone()
+                if row is not None:
+                    metadata = json.loads(row[0])
+                    self._remember(file_hash, metadata)
+                    self.hits += 1
+                    return metadata
+
+            self.misses += 1
+            return None
+
+    def put(self, file_hash, metadata):
+        """Cache metadata for a file hash."""
+        with self.lock:
+            self._remember(file_hash, metadata)
+            if self.conn is not None:
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO file_metadata (file_hash, metadata) VALUES (?, ?)',
+                    (file_hash, json.dumps(metadata))
+                )
+                self.conn.commit()
+
+    def discard(self, file_hash):
+        """Drop a file hash, e.g. when this manager records it again."""
+        with self.lock:
+            self.entries.pop(file_hash, None)
+            if self.conn is not None:
+                self.conn.execute('DELETE FROM file_metadata WHERE file_hash = ?', (file_hash,))
+                self.conn.commit()
+
+    def _remember(self, file_hash, metadata):
+        self.entries[file_hash] = metadata
+        self.entries.move_to_end(file_hash)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
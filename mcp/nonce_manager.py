@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# ノンスマネージャー
+# ローカルで連番のノンスを払い出し、受領を待たずに送信したトランザクションを追跡する
+# 送信失敗で空いたノンスは再利用し、消えたトランザクションは再送して欠番を埋める
+
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 送信後この秒数を過ぎてもノードが認識していないトランザクションは消失とみなす
+DROP_TIMEOUT = 60
+# 送信後この秒数を過ぎても採掘されないトランザクションは手数料を上げて置き換える
+STUCK_TIMEOUT = 30
+# 採掘を確定とみなす確認数
+CONFIRMATIONS = 1
+
+
+class PendingTransaction:
+    def __init__(self, nonce, tx_hash, raw_transaction, meta=None, tx=None):
+        self.nonce = nonce
+        self.tx_hash = tx_hash
+        # 手数料引き上げで置き換えた場合も含め、このノンスで送信した全ハッシュ
+        self.tx_hashes = [tx_hash]
+        self.raw_transaction = raw_transaction
+        self.tx = tx
+        self.meta = meta
+        self.sent_at = time.time()
+        self.receipt = None
+        self.receipt_future = None
+
+
+class NonceManager:
+    def __init__(self, web3, account, confirmation_tracker=None, fee_strategy=None,
+                 drop_timeout=DROP_TIMEOUT, stuck_timeout=STUCK_TIMEOUT, confirmations=CONFIRMATIONS):
+        self.web3 = web3
+        self.account = account
+        self.confirmation_tracker = confirmation_tracker
+        self.fee_strategy = fee_strategy
+        self.stuck_timeout = stuck_timeout
+        self.address = account.address
+        self.drop_timeout = drop_timeout
+        self.confirmations = confirmations
+        self.next_nonce = None
+        # 送信済みで未確定のトランザクション（nonce -> PendingTransaction）
+        self.pending = {}
+        # 払い出したが送信に失敗したノンス
+        self.gaps = set()
+        self.lock = asyncio.Lock()
+
+    async def get_transaction_count(self, block_identifier):
+        return await self.web3.eth.get_transaction_count(self.address, block_identifier)
+
+    async def sync(self):
+        """ノードの保留中トランザクション数からノンスを再同期"""
+        async with self.lock:
+            await self._sync()
+
+    async def _sync(self):
+        chain_nonce = await self.get_transaction_count('pending')
+        if self.next_nonce is None or chain_nonce > self.next_nonce:
+            # 他のクライアントが同じアカウントで送信した場合も追従する
+            self.next_nonce = chain_nonce
+            self.gaps = {nonce for nonce in self.gaps if nonce >= chain_nonce}
+
+    async def allocate(self):
+        """次に使うノンスを払い出す（欠番があれば先に埋める）"""
+        async with self.lock:
+            if self.next_nonce is None:
+                await self._sync()
+            if self.gaps:
+                nonce = min(self.gaps)
+                self.gaps.discard(nonce)
+                return nonce
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    def release(self, nonce):
+        """送信に失敗したノンスを返却"""
+        if nonce == self.next_nonce - 1:
+            self.next_nonce -= 1
+        else:
+            self.gaps.add(nonce)
+
+    def track(self, nonce, tx_hash, raw_transaction, meta=None, tx=None):
+        """送信したトランザクションを保留中として記録（txを渡すと手数料引き上げで置き換え可能）"""
+        entry = PendingTransaction(nonce, tx_hash, raw_transaction, meta, tx)
+        if self.confirmation_tracker:
+            entry.receipt_future = self.confirmation_tracker.watch(tx_hash)
+        self.pending[nonce] = entry
+        return entry
+
+    async def reconcile(self):
+        """
+        保留中トランザクションの状態をチェーンと突き合わせる
+        戻り値: (採掘済みのPendingTransactionリスト, 別のトランザクションに置き換えられたリスト)
+        """
+        if not self.pending:
+            return [], []
+
+        await self._fill_gaps()
+
+        latest_nonce = await self.get_transaction_count('latest')
+        if self.confirmations > 1:
+            # 確認数を満たしたブロック時点で消費済みのノンスだけを確定扱いにする
+            head = await self.web3.eth.block_number
+            mined_nonce = await self.get_transaction_count(max(0, head - self.confirmations + 1))
+        else:
+            mined_nonce = latest_nonce
+        mined, replaced = [], []
+        for nonce in sorted(self.pending):
+            entry = self.pending[nonce]
+            if nonce < mined_nonce:
+                # ノンスは消費済み。自分のトランザクションかどうかを受領で確認
+                del self.pending[nonce]
+                receipt = await self._get_receipt(entry)
+                if receipt is None:
+                    logger.warning(f"ノンス{nonce}のトランザクションが置き換えられました: {entry.tx_hash.hex()}")
+                    replaced.append(entry)
+                else:
+                    entry.receipt = receipt
+                    mined.append(entry)
+            elif nonce < latest_nonce:
+                # 採掘済みで確認待ち（リオルグで戻った場合は保留中のまま扱う）
+                continue
+            elif time.time() - entry.sent_at > min(self.drop_timeout, self.stuck_timeout):
+                await self._handle_stale(entry)
+
+        return mined, replaced
+
+    async def _fill_gaps(self):
+        """後続のトランザクションを詰まらせている欠番を自分宛ての0送金で埋める"""
+        async with self.lock:
+            stuck = sorted(nonce for nonce in self.gaps if nonce < max(self.pending))
+            self.gaps.difference_update(stuck)
+
+        for nonce in stuck:
+            try:
+                tx = {
+                    'from': self.address,
+                    'to': self.address,
+                    'value': 0,
+                    'gas': 21000,
+                    'nonce': nonce,
+                    'chainId': await self.web3.eth.chain_id
+                }
+                if self.fee_strategy:
+                    tx.update(await self.fee_strategy.fee_params())
+                else:
+                    tx['gasPrice'] = await self.web3.eth.gas_price
+                signed_tx = self.account.sign_transaction(tx)
+                tx_hash = await self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+                self.track(nonce, tx_hash, signed_tx.rawTransaction, tx=tx)
+                logger.info(f"欠番のノンス{nonce}を埋めました: {tx_hash.hex()}")
+            except Exception as e:
+                logger.error(f"欠番の補填エラー: {str(e)}")
+                self.gaps.add(nonce)
+
+    async def _get_receipt(self, entry):
+        # 確認トラッカーが受領を取得済みならそれを使う
+        if entry.receipt_future is not None and entry.receipt_future.done() and not entry.receipt_future.cancelled():
+            return entry.receipt_future.result()
+        try:
+            # 置き換え前のトランザクションが採掘された場合もあるため全ハッシュを確認
+            for tx_hash in reversed(entry.tx_hashes):
+                try:
+                    return await self.web3.eth.get_transaction_receipt(tx_hash)
+                except Exception:
+                    continue
+            return None
+        finally:
+            if self.confirmation_tracker:
+                self.confirmation_tracker.unwatch(entry.tx_hash)
+
+    async def _handle_stale(self, entry):
+        """採掘されないトランザクションを再送または手数料引き上げで置き換える"""
+        try:
+            await self.web3.eth.get_transaction(entry.tx_hash)
+            known = True
+        except Exception:
+            known = False
+
+        elapsed = time.time() - entry.sent_at
+        if not known and elapsed > self.drop_timeout:
+            await self._rebroadcast(entry)
+        elif known and elapsed > self.stuck_timeout and self.fee_strategy and entry.tx:
+            await self._replace_with_higher_fee(entry)
+
+    async def _rebroadcast(self, entry):
+        """メモリプールから消えたトランザクションを再送して欠番を防ぐ"""
+        logger.warning(f"ノンス{entry.nonce}のトランザクションが見つからないため再送します: {entry.tx_hash.hex()}")
+        try:
+            await self.web3.eth.send_raw_transaction(entry.raw_transaction)
+        except Exception as e:
+            # 既に取り込まれている場合などは次回の突き合わせで判定する
+            logger.warning(f"再送エラー: {str(e)}")
+        entry.sent_at = time.time()
+
+    async def _replace_with_higher_fee(self, entry):
+        """同じノンスで手数料を引き上げたトランザクションを送信"""
+        tx = dict(entry.tx)
+        tx.update(await self.fee_strategy.replacement_fee_params(entry.tx))
+        try:
+            signed_tx = self.account.sign_transaction(tx)
+            tx_hash = await self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        except Exception as e:
+            logger.warning(f"ノンス{entry.nonce}の置き換えエラー: {str(e)}")
+            entry.sent_at = time.time()
+            return
+
+        logger.info(f"ノンス{entry.nonce}を手数料を上げて置き換えました: {entry.tx_hash.hex()} -> {tx_hash.hex()}")
+        if self.confirmation_tracker:
+            self.confirmation_tracker.unwatch(entry.tx_hash)
+            entry.receipt_future = self.confirmation_tracker.watch(tx_hash)
+        entry.tx = tx
+        entry.tx_hash = tx_hash
+        entry.tx_hashes.append(tx_hash)
+        entry.raw_transaction = signed_tx.rawTransaction
+        entry.sent_at = time.time()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# リクエストの重複排除とアクション結果のキャッシュ
+# 再スキャンやリトライで同じrequest_idを複数回受け取っても、ブラウザアクションの実行と
+# トランザクション送信は1回だけ行う
+# 同一の(action, params)のリクエストはTTLの間1回の実行結果を共有する
+
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# リクエストの状態
+STATE_SEEN = 'seen'
+STATE_EXECUTING = 'executing'
+STATE_SUBMITTED = 'submitted'
+STATE_CONFIRMED = 'confirmed'
+# 結果送信トランザクションがリバートし、1件ずつ送り直しても完了できなかった
+STATE_FAILED = 'failed'
+# チェックポイントストアに永続化する状態
+PERSISTENT_STATES = (STATE_SUBMITTED, STATE_CONFIRMED, STATE_FAILED)
+
+# アクション結果をキャッシュする秒数（0の場合はキャッシュしない）
+ACTION_CACHE_TTL = float(os.getenv('ACTION_CACHE_TTL', '0'))
+ACTION_CACHE_SIZE = 1000
+
+
+class RequestDeduplicator:
+    def __init__(self, checkpoint_store=None):
+        # 送信済み・確定済みの状態は再起動後も保持する
+        self.checkpoint_store = checkpoint_store
+        # request_id -> 状態（処理中のもの）
+        self.states = {}
+
+    def state(self, request_id):
+        """リクエストの現在の状態を取得（未知の場合はNone）"""
+        request_id = bytes(request_id)
+        if request_id in self.states:
+            return self.states[request_id]
+        if self.checkpoint_store:
+            return self.checkpoint_store.get_state(request_id)
+        return None
+
+    def claim(self, request_id):
+        """初めて見たリクエストならseenとして登録してTrueを返す"""
+        if self.state(request_id) is not None:
+            return False
+        self.states[bytes(request_id)] = STATE_SEEN
+        return True
+
+    def set_state(self, request_id, state, block_number=None):
+        """状態を更新（送信済み以降はチェックポイントストアに記録）"""
+        request_id = bytes(request_id)
+        if state in PERSISTENT_STATES and self.checkpoint_store:
+            self.checkpoint_store.mark_processed(request_id, block_number, state)
+            self.states.pop(request_id, None)
+        else:
+            self.states[request_id] = state
+
+    def release(self, request_id):
+        """実行や送信に失敗したリクエストを再処理できるように登録を外す"""
+        self.states.pop(bytes(request_id), None)
+
+
+class ActionResultCache:
+    def __init__(self, ttl=ACTION_CACHE_TTL, max_size=ACTION_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        # キー -> (保存時刻, 結果)
+        self.results = OrderedDict()
+        # キー -> 実行中のFuture（同時に来た同一リクエストは実行を待つ）
+        self.inflight = {}
+
+    @staticmethod
+    def key(action, params):
+        return json.dumps([action, params], sort_keys=True, separators=(',', ':'))
+
+    def get(self, key):
+        """TTL内の結果を取得（ない場合はNone）"""
+        entry = self.results.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.time() - stored_at > self.ttl:
+            del self.results[key]
+            return None
+        return result
+
+    def put(self, key, result):
+        self.results[key] = (time.time(), result)
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    async def run(self, action, params, execute):
+        """キャッシュにあれば結果を返し、なければexecute()を1回だけ実行する"""
+        if self.ttl <= 0:
+            return await execute()
+
+        key = self.key(action, params)
+        result = self.get(key)
+        if result is not None:
+            logger.info(f"アクション結果のキャッシュを使用: {action}")
+            return result
+        while key in self.inflight:
+            future = self.inflight[key]
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 実行していたタスクがキャンセルされた場合は自分で実行する（自分のキャンセルはそのまま送出）
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            result = await execute()
+        except Exception as e:
+            future.set_exception(e)
+            # 待機者がいない場合の未取得例外の警告を抑止
+            future.exception()
+            raise
+        except BaseException:
+            # キャンセルされた場合も待機者が待ち続けないようにFutureを完了させる
+            future.cancel()
+            raise
+        finally:
+            del self.inflight[key]
+        future.set_result(result)
+        # エラー結果はキャッシュしない
+        if not (isinstance(result, dict) and result.get('status') == 'error'):
+            self.put(key, result)
+        return result
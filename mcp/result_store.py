@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# オラクル結果のオフチェーンストア
+# 大きな結果（HTMLなど）はSHA-256をキーにしたローカルストア（またはFileverse）に保存し、
+# オンチェーンにはハッシュと短い要約のみを書き込む
+
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+RESULT_STORE_DIR = os.getenv('ORACLE_RESULT_STORE_DIR', 'oracle_results')
+# この長さ（バイト）を超える結果はオフチェーンに保存する
+RESULT_INLINE_LIMIT = int(os.getenv('RESULT_INLINE_LIMIT', '512'))
+# contracts/Myrdal.vyの結果フィールド（String[1024]）の上限
+ONCHAIN_RESULT_LIMIT = 1024
+# 要約に残すフィールドと各値の最大長
+SUMMARY_FIELDS = ('status', 'title', 'url', 'message', 'element', 'path')
+SUMMARY_VALUE_LIMIT = 96
+
+
+def encode_result(result):
+    """結果をオンチェーンに書き込むJSON文字列に変換"""
+    return json.dumps(result, separators=(',', ':'), ensure_ascii=False)
+
+
+def summarize(result):
+    """結果から主要なフィールドだけを短くして取り出す"""
+    if not isinstance(result, dict):
+        return {'type': type(result).__name__}
+    summary = {}
+    for field in SUMMARY_FIELDS:
+        value = result.get(field)
+        if value is None:
+            continue
+        value = str(value)
+        if len(value) > SUMMARY_VALUE_LIMIT:
+            value = value[:SUMMARY_VALUE_LIMIT - 3] + '...'
+        summary[field] = value
+    return summary
+
+
+class ResultStore:
+    def __init__(self, root=RESULT_STORE_DIR, inline_limit=RESULT_INLINE_LIMIT, fileverse_manager=None):
+        self.root = root
+        self.inline_limit = inline_limit
+        # 指定した場合は保存した結果をFileverseにもアップロードする
+        self.fileverse_manager = fileverse_manager
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, digest):
+        """ダイジェストに対応するファイルパス"""
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data):
+        """内容を保存してSHA-256ダイジェストを返す（同じ内容は1回だけ書き込む）"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 書き込み途中のファイルが見えないように一時ファイルから置き換える
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest):
+        """ダイジェストから内容を取得（存在しない場合はNone）"""
+        try:
+            with open(self.path_for(digest), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if hashlib.sha256(data).hexdigest() != digest:
+            logger.error(f"保存済み結果のハッシュが一致しません: {digest}")
+            return None
+        return data
+
+    async def prepare(self, result, task_id=None):
+        """
+        結果をオンチェーン送信用に整える
+        小さい結果はそのまま返し、大きい結果は保存してハッシュと要約を返す
+        """
+        data = encode_result(result).encode()
+        if len(data) <= self.inline_limit:
+            return result
+
+        digest = await asyncio.to_thread(self.put, data)
+        pointer = {
+            'offchain': True,
+            'sha256': digest,
+            'size': len(data),
+            'summary': summarize(result)
+        }
+
+        if self.fileverse_manager and task_id is not None:
+            file_hash = await asyncio.to_thread(
+                self.fileverse_manager.upload_file,
+                self.path_for(digest),
+                task_id,
+                name=f"{digest}.json",
+                description="Myrdal oracle result",
+                mime_type='application/json'
+            )
+            if file_hash:
+                pointer['uri'] = f"fileverse:{file_hash}"
+
+        # オンチェーンの上限に収まるまで要約を削る
+        while len(encode_result(pointer).encode()) > ONCHAIN_RESULT_LIMIT and pointer['summary']:
+            pointer['summary'].popitem()
+        return pointer
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# JSON-RPC応答のキャッシュ
+# チェーンIDや確定済みブロックのデータなど変化しない読み出しは保持し続け、
+# 最新ブロックに依存する読み出しは短時間だけキャッシュする
+
+import os
+import json
+import time
+import logging
+from collections import OrderedDict
+
+from header_tracker import REORG_WINDOW
+
+logger = logging.getLogger(__name__)
+
+# 常に同じ結果を返すメソッド
+IMMUTABLE_METHODS = {'eth_chainId', 'net_version', 'eth_getBlockByHash', 'eth_getTransactionByBlockHashAndIndex'}
+# ブロック指定の引数の位置（確定済みブロックなら不変、'latest'などなら短時間だけキャッシュ）
+BLOCK_PARAM_INDEX = {
+    'eth_call': 1,
+    'eth_getCode': 1,
+    'eth_getBalance': 1,
+    'eth_getStorageAt': 2,
+    'eth_getBlockByNumber': 0
+}
+# 最新ブロックに依存するメソッド
+HEAD_METHODS = {'eth_blockNumber', 'eth_gasPrice', 'eth_maxPriorityFeePerGas', 'eth_feeHistory'}
+# キャッシュしないブロック指定
+UNCACHEABLE_BLOCK_TAGS = {'pending'}
+
+# 最新ブロックに依存する読み出しのキャッシュ秒数
+HEAD_CACHE_TTL = float(os.getenv('RPC_HEAD_CACHE_TTL', '1'))
+# 最新ブロックからこの数だけ古いブロックは確定済みとして扱う
+# HeaderTrackerがリオルグを検出する範囲（REORG_WINDOW）のブロックを固定してしまわないよう、それ未満にはしない
+FINALITY_DEPTH = max(int(os.getenv('RPC_FINALITY_DEPTH', str(REORG_WINDOW))), REORG_WINDOW)
+# 保持する応答数
+RPC_CACHE_SIZE = 10000
+
+# キャッシュの種類
+POLICY_IMMUTABLE = 'immutable'
+POLICY_HEAD = 'head'
+
+
+def _json_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + bytes(value).hex()
+    return str(value)
+
+
+def _to_block_number(value):
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.startswith('0x'):
+        return int(value, 16)
+    return None
+
+
+class RPCCache:
+    def __init__(self, head_ttl=HEAD_CACHE_TTL, finality_depth=FINALITY_DEPTH, max_size=RPC_CACHE_SIZE):
+        self.head_ttl = head_ttl
+        self.finality_depth = finality_depth
+        self.max_size = max_size
+        # 最後に観測した最新ブロック番号
+        self.head = None
+        # キー -> (保存時刻, キャッシュの種類, 結果)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, method, params):
+        return json.dumps([method, params], sort_keys=True, default=_json_default)
+
+    def policy(self, method, params):
+        """メソッドと引数からキャッシュの種類を判定（キャッシュしない場合はNone）"""
+        if method in IMMUTABLE_METHODS:
+            return POLICY_IMMUTABLE
+        if method in HEAD_METHODS:
+            return POLICY_HEAD
+        if method not in BLOCK_PARAM_INDEX:
+            return None
+
+        params = list(params or [])
+        index = BLOCK_PARAM_INDEX[method]
+        block = params[index] if index < len(params) else 'latest'
+        if isinstance(block, dict):
+            # EIP-1898のブロックハッシュ指定
+            return POLICY_IMMUTABLE if 'blockHash' in block else None
+        if block in UNCACHEABLE_BLOCK_TAGS:
+            return None
+        block_number = _to_block_number(block)
+        if block_number is not None and self.head is not None and block_number <= self.head - self.finality_depth:
+            return POLICY_IMMUTABLE
+        return POLICY_HEAD
+
+    def get(self, method, params):
+        """キャッシュを参照（戻り値: (ヒットしたか, 結果)）"""
+        if self.policy(method, params) is None:
+            return False, None
+        key = self.key(method, params)
+        entry = self.entries.get(key)
+        if entry is not None:
+            stored_at, policy, result = entry
+            if policy == POLICY_IMMUTABLE or time.time() - stored_at <= self.head_ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, result
+            del self.entries[key]
+        self.misses += 1
+        return False, None
+
+    def put(self, method, params, result):
+        """応答を保存"""
+        if method == 'eth_blockNumber':
+            block_number = _to_block_number(result)
+            if block_number is not None and (self.head is None or block_number > self.head):
+                self.head = block_number
+        if result is None:
+            # 未確定の受領や存在しないブロックなどは後で変わるため保存しない
+            return
+        policy = self.policy(method, params)
+        if policy is None:
+            return
+        key = self.key(method, params)
+        self.entries[key] = (time.time(), policy, result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
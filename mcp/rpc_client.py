@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# 共有RPCレイヤー
+# 同時に発行されたJSON-RPC呼び出しを1回のバッチリクエストにまとめ、
+# 応答はRPCCacheのポリシーに従ってキャッシュするweb3プロバイダー
+
+import os
+import json
+import asyncio
+import logging
+import itertools
+
+from hexbytes import HexBytes
+from web3 import AsyncHTTPProvider, HTTPProvider
+from web3._utils.abi import get_abi_output_types
+from web3._utils.encoding import FriendlyJsonSerde, Web3JsonEncoder
+from web3._utils.request import async_make_post_request, make_post_request
+
+from rpc_cache import RPCCache
+
+logger = logging.getLogger(__name__)
+
+# 呼び出しをまとめるために待つ時間（秒）
+BATCH_WINDOW = float(os.getenv('RPC_BATCH_WINDOW', '0.005'))
+# 1回のバッチリクエストに含める最大呼び出し数
+MAX_BATCH_SIZE = int(os.getenv('RPC_MAX_BATCH_SIZE', '100'))
+
+
+def encode_rpc_requests(requests):
+    """(id, method, params)のリストをJSON-RPCのバッチリクエストに変換"""
+    serde = FriendlyJsonSerde()
+    return serde.json_encode([
+        {'jsonrpc': '2.0', 'method': method, 'params': params or [], 'id': request_id}
+        for request_id, method, params in requests
+    ], cls=Web3JsonEncoder).encode()
+
+
+def match_rpc_responses(requests, raw_response):
+    """バッチ応答をリクエストの順に並べ替える"""
+    responses = json.loads(raw_response)
+    if isinstance(responses, dict):
+        # ノードがバッチ全体をエラーとして返した場合
+        return [dict(responses, id=request_id) for request_id, _, _ in requests]
+    by_id = {response.get('id'): response for response in responses}
+    return [
+        by_id.get(request_id, {
+            'jsonrpc': '2.0',
+            'id': request_id,
+            'error': {'code': -32603, 'message': 'Missing response in JSON-RPC batch'}
+        })
+        for request_id, _, _ in requests
+    ]
+
+
+def cached_response(result):
+    return {'jsonrpc': '2.0', 'id': 0, 'result': result}
+
+
+class BatchingAsyncHTTPProvider(AsyncHTTPProvider):
+    """同時に発行された呼び出しをまとめて送信する非同期プロバイダー"""
+
+    def __init__(self, endpoint_uri=None, batch_window=BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE,
+                 cache=None, **kwargs):
+        super().__init__(endpoint_uri, **kwargs)
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.cache = cache or RPCCache()
+        self._ids = itertools.count()
+        # 送信待ちの(id, method, params, future)
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+
+    async def make_request(self, method, params):
+        hit, result = self.cache.get(method, params)
+        if hit:
+            return cached_response(result)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((next(self._ids), method, params, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+
+        response = await future
+        if 'result' in response:
+            self.cache.put(method, params, response['result'])
+        return response
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, batch):
+        requests = [(request_id, method, params) for request_id, method, params, _ in batch]
+        try:
+            raw_response = await async_make_post_request(
+                self.endpoint_uri, encode_rpc_requests(requests), **self.get_request_kwargs()
+            )
+            responses = match_rpc_responses(requests, raw_response)
+        except Exception as e:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, _, future), response in zip(batch, responses):
+            if not future.done():
+                future.set_result(response)
+
+
+class CachingHTTPProvider(HTTPProvider):
+    """応答をキャッシュし、明示的なバッチリクエストにも対応する同期プロバイダー"""
+
+    def __init__(self, endpoint_uri=None, cache=None, max_batch_size=MAX_BATCH_SIZE, **kwargs):
+        super().__init__(endpoint_uri, **kwargs)
+        self.cache = cache or RPCCache()
+        self.max_batch_size = max_batch_size
+        self._ids = itertools.count()
+
+    def make_request(self, method, params):
+        hit, result = self.cache.get(method, params)
+        if hit:
+            return cached_response(result)
+        response = super().make_request(method, params)
+        if 'result' in response:
+            self.cache.put(method, params, response['result'])
+        return response
+
+    def batch_request(self, calls):
+        """(method, params)のリストを最小回数のバッチリクエストで送信し、応答を同じ順で返す"""
+        responses = [None] * len(calls)
+        misses = []
+        for index, (method, params) in enumerate(calls):
+            hit, result = self.cache.get(method, params)
+            if hit:
+                responses[index] = cached_response(result)
+            else:
+                misses.append((index, next(self._ids), method, params))
+
+        for start in range(0, len(misses), self.max_batch_size):
+            chunk = misses[start:start + self.max_batch_size]
+            requests = [(request_id, method, params) for _, request_id, method, params in chunk]
+            raw_response = make_post_request(
+                self.endpoint_uri, encode_rpc_requests(requests), **self.get_request_kwargs()
+            )
+            for (index, _, method, params), response in zip(chunk, match_rpc_responses(requests, raw_response)):
+                if 'result' in response:
+                    self.cache.put(method, params, response['result'])
+                responses[index] = response
+        return responses
+
+
+def batch_call(web3, functions, block_identifier='latest'):
+    """
+    複数のコントラクト関数呼び出し（eth_call）を1回のバッチリクエストで実行
+    戻り値: 各呼び出しのデコード結果（失敗した呼び出しはNone）
+    """
+    block = block_identifier if isinstance(block_identifier, str) else hex(block_identifier)
+    calls = [
+        ('eth_call', [{'to': function.address, 'data': function._encode_transaction_data()}, block])
+        for function in functions
+    ]
+    results = []
+    for function, response in zip(functions, web3.provider.batch_request(calls)):
+        if 'error' in response:
+            logger.warning(f"{function.fn_name}の呼び出しに失敗: {response['error'].get('message')}")
+            results.append(None)
+            continue
+        output_types = get_abi_output_types(function.abi)
+        decoded = web3.codec.decode(output_types, HexBytes(response['result']))
+        results.append(decoded[0] if len(decoded) == 1 else decoded)
+    return results
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# オラクル署名アカウントのプール
+# 複数のアカウントにそれぞれノンスマネージャーを持たせ、送信ごとにアカウントを選ぶことで
+# 1アカウントのノンス列やノードの保留中トランザクション数の上限に縛られずに並列送信する
+
+import logging
+
+from nonce_manager import NonceManager
+
+logger = logging.getLogger(__name__)
+
+# アカウントの選択方法
+SELECTION_ROUND_ROBIN = 'round_robin'
+SELECTION_LEAST_PENDING = 'least_pending'
+
+
+class Signer:
+    def __init__(self, account, nonce_manager):
+        self.account = account
+        self.nonce_manager = nonce_manager
+        self.address = account.address
+
+
+class SignerPool:
+    def __init__(self, web3, accounts, confirmation_tracker=None, fee_strategy=None,
+                 selection=SELECTION_LEAST_PENDING, **nonce_manager_options):
+        if not accounts:
+            raise ValueError("署名アカウントが指定されていません")
+        if selection not in (SELECTION_ROUND_ROBIN, SELECTION_LEAST_PENDING):
+            raise ValueError(f"不明なアカウント選択方法: {selection}")
+        self.selection = selection
+        self.signers = [
+            Signer(account, NonceManager(web3, account, confirmation_tracker, fee_strategy, **nonce_manager_options))
+            for account in accounts
+        ]
+        self._next_index = 0
+
+    def __len__(self):
+        return len(self.signers)
+
+    def select(self):
+        """次の送信に使うアカウントを選ぶ"""
+        if self.selection == SELECTION_LEAST_PENDING:
+            # 保留中が最も少ないアカウント（同数の場合はラウンドロビン順）
+            order = self.signers[self._next_index:] + self.signers[:self._next_index]
+            signer = min(order, key=lambda signer: len(signer.nonce_manager.pending))
+        else:
+            signer = self.signers[self._next_index]
+        self._next_index = (self.signers.index(signer) + 1) % len(self.signers)
+        return signer
+
+    async def reconcile(self):
+        """
+        全アカウントの保留中トランザクションをチェーンと突き合わせる
+        戻り値: (採掘済みのリスト, 置き換えられたリスト)
+        """
+        mined, replaced = [], []
+        for signer in self.signers:
+            try:
+                signer_mined, signer_replaced = await signer.nonce_manager.reconcile()
+            except Exception as e:
+                logger.error(f"{signer.address}の突き合わせエラー: {str(e)}")
+                continue
+            mined.extend(signer_mined)
+            replaced.extend(signer_replaced)
+        return mined, replaced
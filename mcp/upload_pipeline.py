@@ -0,0 +1,243 @@
+"""
+Pre-upload processing pipeline for Fileverse artifacts
+
+Each file passes through a list of stages before it is uploaded. The default
+stages detect the MIME type from the file's magic bytes, and can optionally
+recompress screenshots and gzip text artifacts (HTML, JSON, logs). Stages are
+plain module-level functions so the pipeline can run in a process pool, letting
+CPU-bound work overlap with uploads that are already on the network.
+
+A stage takes an artifact dict (path, name, mime_type, size, temporary,
+work_dir) and returns it, possibly pointing at a new file in work_dir.
+"""
+
+import os
+import gzip
+import shutil
+import asyncio
+import logging
+import tempfile
+import mimetypes
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Gzip text artifacts (HTML, JSON, plain text) before upload
+COMPRESS_TEXT = os.getenv('FILEVERSE_COMPRESS_TEXT', 'false').lower() == 'true'
+# Text artifacts smaller than this are uploaded as they are
+COMPRESS_MIN_SIZE = int(os.getenv('FILEVERSE_COMPRESS_MIN_SIZE', '1024'))
+# Downscale images larger than this on their longest side (0 disables)
+IMAGE_MAX_DIMENSION = int(os.getenv('FILEVERSE_IMAGE_MAX_DIMENSION', '0'))
+# Re-encode images to this format: png (lossless, optimized), webp or jpeg ('' disables)
+IMAGE_FORMAT = os.getenv('FILEVERSE_IMAGE_FORMAT', '')
+# Quality used for lossy image formats
+IMAGE_QUALITY = int(os.getenv('FILEVERSE_IMAGE_QUALITY', '80'))
+# Worker processes used by run_async
+PIPELINE_WORKERS = int(os.getenv('FILEVERSE_PIPELINE_WORKERS', str(os.cpu_count() or 1)))
+# Bytes read for magic-byte detection
+SNIFF_BYTES = 512
+
+# (offset, magic bytes, MIME type)
+MAGIC_SIGNATURES = [
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (8, b'WEBP', 'image/webp'),
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'\x1f\x8b', 'application/gzip'),
+    (0, b'PK\x03\x04', 'application/zip'),
+    (4, b'ftyp', 'video/mp4'),
+    (0, b'\x1a\x45\xdf\xa3', 'video/webm'),
+]
+TEXT_MIME_TYPES = {'text/plain', 'text/html', 'text/markdown', 'text/csv', 'application/json', 'image/svg+xml'}
+IMAGE_FORMATS = {'png': ('PNG', 'image/png'), 'webp': ('WEBP', 'image/webp'), 'jpeg': ('JPEG', 'image/jpeg')}
+RECOMPRESSIBLE_IMAGES = {'image/png', 'image/jpeg', 'image/webp'}
+
+
+def sniff_mime(file_path):
+    """Detect a file's MIME type from its magic bytes, falling back to the extension."""
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+
+    for offset, magic, mime_type in MAGIC_SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return mime_type
+
+    guessed = mimetypes.guess_type(file_path)[0]
+    try:
+        text = head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character may be cut at the end of the sample
+        text = head[:e.start].decode('utf-8') if len(head) == SNIFF_BYTES and e.start >= len(head) - 3 else None
+    if text is None or '\x00' in text:
+        return guessed or 'application/octet-stream'
+
+    stripped = text.lstrip().lower()
+    if stripped.startswith(('<!doctype html', '<html')):
+        return 'text/html'
+    if stripped.startswith('<svg') or (stripped.startswith('<?xml') and '<svg' in stripped):
+        return 'image/svg+xml'
+    if guessed and (guessed.startswith('text/') or guessed in TEXT_MIME_TYPES):
+        return guessed
+    if stripped.startswith(('{', '[')):
+        return 'application/json'
+    return 'text/plain'
+
+
+def _output_path(artifact, suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=artifact['work_dir'])
+    os.close(fd)
+    return path
+
+
+def _replace(artifact, path, **changes):
+    """Point the artifact at a new file, removing the previous temporary one."""
+    if artifact['temporary']:
+        os.remove(artifact['path'])
+    return dict(artifact, path=path, size=os.path.getsize(path), temporary=True, **changes)
+
+
+def detect_mime_stage(artifact):
+    """Fill in the MIME type from magic bytes unless the caller provided one."""
+    if not artifact['mime_type']:
+        artifact = dict(artifact, mime_type=sniff_mime(artifact['path']))
+    return artifact
+
+
+def recompress_image_stage(artifact, max_dimension=IMAGE_MAX_DIMENSION, image_format=IMAGE_FORMAT,
+                           quality=IMAGE_QUALITY):
+    """Downscale and re-encode an image, keeping the result only if it is smaller."""
+    if artifact['mime_type'] not in RECOMPRESSIBLE_IMAGES:
+        return artifact
+
+    with Image.open(artifact['path']) as image:
+        image.load()
+        source_format = image.format or 'PNG'
+        resized = max_dimension and max(image.size) > max_dimension
+        if resized:
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        if image_format:
+            pil_format, mime_type = IMAGE_FORMATS[image_format]
+        elif resized:
+            pil_format, mime_type = source_format, artifact['mime_type']
+        else:
+            return artifact
+        if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        path = _output_path(artifact, '.' + pil_format.lower())
+        options = {'optimize': True} if pil_format == 'PNG' else {'quality': quality}
+        image.save(path, pil_format, **options)
+
+    if not resized and os.path.getsize(path) >= artifact['size']:
+        os.remove(path)
+        return artifact
+    name = os.path.splitext(artifact['name'])[0] + '.' + ('jpg' if pil_format == 'JPEG' else pil_format.lower())
+    return _replace(artifact, path, name=name, mime_type=mime_type)
+
+
+def compress_text_stage(artifact, min_size=COMPRESS_MIN_SIZE):
+    """Gzip text artifacts, keeping the result only if it is smaller."""
+    if artifact['mime_type'] not in TEXT_MIME_TYPES or artifact['size'] < min_size:
+        return artifact
+
+    path = _output_path(artifact, '.gz')
+    with open(artifact['path'], 'rb') as source, open(path, 'wb') as raw:
+        # mtime=0 keeps the output identical for identical input, so deduplication still works
+        with gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0) as compressed:
+            shutil.copyfileobj(source, compressed)
+
+    if os.path.getsize(path) >= artifact['size']:
+        os.remove(path)
+        return artifact
+    return _replace(
+        artifact, path,
+        name=artifact['name'] + '.gz',
+        mime_type='application/gzip',
+        original_mime_type=artifact['mime_type']
+    )
+
+
+def default_stages(compress_text=COMPRESS_TEXT, image_max_dimension=IMAGE_MAX_DIMENSION, image_format=IMAGE_FORMAT):
+    """Build the stage list from the pipeline settings."""
+    stages = [detect_mime_stage]
+    if image_max_dimension or image_format:
+        stages.append(partial(recompress_image_stage, max_dimension=image_max_dimension, image_format=image_format))
+    if compress_text:
+        stages.append(compress_text_stage)
+    return stages
+
+
+def run_stages(file_path, name, mime_type, stages, work_dir):
+    """Run the stages over one file (module level so it can run in a worker process)."""
+    artifact = {
+        'path': file_path,
+        'name': name or os.path.basename(file_path),
+        'mime_type': mime_type,
+        'size': os.path.getsize(file_path),
+        'temporary': False,
+        'work_dir': work_dir
+    }
+    for stage in stages:
+        try:
+            artifact = stage(artifact)
+        except Exception as e:
+            # A failing optional stage must not block the upload
+            logger.warning(f"Upload pipeline stage failed for {file_path}: {e}")
+    if not artifact['mime_type']:
+        artifact['mime_type'] = 'application/octet-stream'
+    return artifact
+
+
+class UploadPipeline:
+    def __init__(self, stages=None, work_dir=None, workers=PIPELINE_WORKERS):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages: List of stage functions (optional, defaults to default_stages())
+            work_dir: Directory for processed files (optional, defaults to a temporary
+                directory that close removes)
+            workers: Number of worker processes used by run_async
+        """
+        self.stages = stages if stages is not None else default_stages()
+        self.temporary_work_dir = not work_dir
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix='fileverse-pipeline-')
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.workers = workers
+        self.executor = None
+
+    def run(self, file_path, name=None, mime_type=None):
+        """
+        Process a file in the current process.
+
+        Returns:
+            Artifact dict with path, name, mime_type, size and temporary (True when
+            path is a processed copy that should be removed after upload)
+        """
+        return run_stages(file_path, name, mime_type, self.stages, self.work_dir)
+
+    async def run_async(self, file_path, name=None, mime_type=None):
+        """Process a file in the worker process pool."""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, run_stages, file_path, name, mime_type, self.stages, self.work_dir
+        )
+
+    def cleanup(self, artifact):
+        """Remove the processed copy of an artifact, if one was made."""
+        if artifact.get('temporary') and os.path.exists(artifact['path']):
+            os.remove(artifact['path'])
+
+    def close(self):
+        """Shut down the worker processes and remove the temporary work directory."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.temporary_work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+MCPオラクルのスループットベンチマーク
+
+ローカルのEVM（anvil）にMyrdal.vyをデプロイし、遅延を設定できるスタブの
+Firefox/pyppeteer MCPサーバーを起動した上で、request_firefox_action /
+request_pyppeteer_actionを大量に送信してMCPOracleの処理性能を計測します。
+
+計測結果:
+- イベント/秒（最初のリクエスト採掘から最後の結果書き込みまで、成功した結果のみ）
+- リクエスト採掘から結果書き込みまでのレイテンシ（p50 / p99、成功した結果のみ）
+- 1リクエストあたりの結果書き込みガス
+- 失敗した結果の件数と割合（--max-failure-rateを超えた場合は終了コード1）
+
+使用例:
+    python scripts/benchmark_oracle.py --requests 500 --firefox-latency 0.2 --pyppeteer-latency 0.05
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+
+import websockets
+from web3 import Web3
+from web3.logs import DISCARD
+from eth_account import Account
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(SCRIPTS_DIR, '..')
+sys.path.append(os.path.join(ROOT_DIR, 'mcp'))
+
+from compile_contracts import compile_contract
+from fee_strategy import suggest_fee_params, estimate_gas_limit
+
+# anvilの既定ニーモニックの開発用アカウント（ローカルチェーン専用）
+ANVIL_OWNER_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+ANVIL_ORACLE_KEY = "0x59c6995e998f97a5a0044966f0945389dc9e86dae88c7a8412f4603b6b78690d"
+
+MYRDAL_CONTRACT_PATH = os.path.join(ROOT_DIR, 'contracts', 'Myrdal.vy')
+# 1タスクに紐づけられるMCPリクエスト数（contracts/Myrdal.vyのTaskInfo.mcp_requests）
+REQUESTS_PER_TASK = 10
+# ブロックを確認する間隔（秒）
+OBSERVE_INTERVAL = 0.05
+# 失敗例として表示する結果の件数
+FAILURE_SAMPLE_SIZE = 5
+
+
+def percentile(values, pct):
+    """最近傍順位法によるパーセンタイル"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def result_status(result):
+    """
+    書き込まれた結果のステータスを取り出す
+    オフチェーンに保存された結果（result_storeのポインタ）は要約のステータスを使う
+    """
+    try:
+        payload = json.loads(result)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    if payload.get('offchain'):
+        payload = payload.get('summary') or {}
+    return payload.get('status')
+
+
+def start_anvil(port, block_time):
+    """anvilを起動してRPCが応答するまで待つ"""
+    command = ['anvil', '--port', str(port), '--silent']
+    if block_time:
+        command += ['--block-time', str(block_time)]
+    process = subprocess.Popen(command)
+    w3 = Web3(Web3.HTTPProvider(f"http://127.0.0.1:{port}"))
+    for _ in range(100):
+        try:
+            w3.eth.chain_id
+            return process
+        except Exception:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("anvilが起動しませんでした（foundryがインストールされているか確認してください）")
+
+
+class LoadGenerator:
+    """オーナーアカウントからタスクとMCPリクエストを送信する"""
+
+    def __init__(self, w3, contract, account):
+        self.w3 = w3
+        self.contract = contract
+        self.account = account
+        self.nonce = w3.eth.get_transaction_count(account.address)
+        self.chain_id = w3.eth.chain_id
+        self.fee_params = suggest_fee_params(w3)
+        self.gas_limits = {}
+
+    def send(self, function):
+        """ローカルのノンスで署名して送信（受領は待たない）"""
+        if function.fn_name not in self.gas_limits:
+            self.gas_limits[function.fn_name] = estimate_gas_limit(
+                function.estimate_gas({'from': self.account.address})
+            )
+        tx_params = {
+            'from': self.account.address,
+            'nonce': self.nonce,
+            'gas': self.gas_limits[function.fn_name],
+            'chainId': self.chain_id
+        }
+        tx_params.update(self.fee_params)
+        signed_tx = self.account.sign_transaction(function.build_transaction(tx_params))
+        self.nonce += 1
+        return self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+
+    def transact(self, function):
+        """送信して受領を待つ"""
+        receipt = self.w3.eth.wait_for_transaction_receipt(self.send(function))
+        if receipt.status != 1:
+            raise RuntimeError(f"{function.fn_name}が失敗しました")
+        return receipt
+
+    def create_tasks(self, count):
+        """リクエストを紐づけるタスクを作成"""
+        tx_hashes = [self.send(self.contract.functions.create_task(f"benchmark task {i}")) for i in range(count)]
+        task_ids = []
+        for tx_hash in tx_hashes:
+            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            for event in self.contract.events.TaskCreated().process_receipt(receipt, errors=DISCARD):
+                task_ids.append(event['args']['task_id'])
+        return task_ids
+
+    def flood(self, task_ids, count):
+        """Firefoxとpyppeteerのリクエストを交互に送信"""
+        for i in range(count):
+            task_id = task_ids[i // REQUESTS_PER_TASK]
+            action_data = json.dumps({'action': 'navigate', 'params': {'url': f"https://example.com/{i}"}})
+            if i % 2 == 0:
+                self.send(self.contract.functions.request_firefox_action(task_id, action_data))
+            else:
+                self.send(self.contract.functions.request_pyppeteer_action(task_id, action_data))
+
+
+class ChainObserver:
+    """新しいブロックを確認し、リクエスト作成と結果書き込みの時刻・ガスを記録する"""
+
+    def __init__(self, w3, contract, requester, oracle):
+        self.w3 = w3
+        self.contract = contract
+        self.requester = requester
+        self.oracle = oracle
+        self.next_block = w3.eth.block_number + 1
+        # request_id -> リクエスト採掘を確認した時刻
+        self.created = {}
+        # request_id -> 結果書き込みを確認した時刻（成否を問わない）
+        self.fulfilled = {}
+        # request_id -> 失敗した結果（statusがsuccess以外）
+        self.failed = {}
+        self.fulfillment_gas = 0
+        self.fulfillment_txs = 0
+
+    def poll(self):
+        head = self.w3.eth.block_number
+        while self.next_block <= head:
+            block = self.w3.eth.get_block(self.next_block, full_transactions=True)
+            observed_at = time.time()
+            for tx in block.transactions:
+                if tx['to'] != self.contract.address:
+                    continue
+                receipt = self.w3.eth.get_transaction_receipt(tx['hash'])
+                if receipt.status != 1:
+                    continue
+                if tx['from'] == self.requester:
+                    for event in self.contract.events.MCPRequestCreated().process_receipt(receipt, errors=DISCARD):
+                        self.created[event['args']['request_id']] = observed_at
+                elif tx['from'] == self.oracle:
+                    self.record_fulfillment(tx, receipt, observed_at)
+            self.next_block += 1
+
+    def record_fulfillment(self, tx, receipt, observed_at):
+        function, args = self.contract.decode_function_input(tx['input'])
+        request_ids = args['request_ids'] if 'request_ids' in args else [args['request_id']]
+        results = args['results'] if 'results' in args else [args['result']]
+        self.fulfillment_txs += 1
+        self.fulfillment_gas += receipt.gasUsed
+        for request_id, result in zip(request_ids, results):
+            if request_id in self.fulfilled:
+                continue
+            self.fulfilled[request_id] = observed_at
+            if result_status(result) != 'success':
+                self.failed[request_id] = result
+
+    def report(self, args):
+        # スループットとレイテンシは成功した結果だけで計測する
+        succeeded = {
+            request_id: fulfilled_at
+            for request_id, fulfilled_at in self.fulfilled.items()
+            if request_id not in self.failed
+        }
+        latencies = [
+            succeeded[request_id] - created_at
+            for request_id, created_at in self.created.items()
+            if request_id in succeeded
+        ]
+        fulfilled_count = len(latencies)
+        duration = (max(succeeded.values()) - min(self.created.values())) if latencies else 0
+        return {
+            'requests': args.requests,
+            'fulfilled': fulfilled_count,
+            'failed': len(self.failed),
+            'failure_rate': round(len(self.failed) / len(self.fulfilled), 4) if self.fulfilled else None,
+            'failure_samples': list(self.failed.values())[:FAILURE_SAMPLE_SIZE],
+            'duration_sec': round(duration, 3),
+            'events_per_sec': round(fulfilled_count / duration, 2) if duration else None,
+            'latency_p50_ms': round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+            'latency_p99_ms': round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+            'fulfillment_txs': self.fulfillment_txs,
+            'avg_batch_size': round(len(self.fulfilled) / self.fulfillment_txs, 2) if self.fulfillment_txs else None,
+            'gas_per_fulfillment': round(self.fulfillment_gas / len(self.fulfilled)) if self.fulfilled else None,
+            'firefox_latency_sec': args.firefox_latency,
+            'pyppeteer_latency_sec': args.pyppeteer_latency,
+            'block_time_sec': args.block_time
+        }
+
+
+async def stub_mcp_server(port, latency, result_bytes):
+    """指定した遅延の後に成功結果を返すスタブMCPサーバー"""
+    async def handler(ws, path=None):
+        async for message in ws:
+            request = json.loads(message)
+            await asyncio.sleep(latency)
+            result = {'status': 'success', 'title': f"Stub {request.get('action')}"}
+            result['url'] = request.get('params', {}).get('url')
+            if result_bytes:
+                result['content'] = 'x' * result_bytes
+            await ws.send(json.dumps({'id': request.get('id'), 'result': result}))
+
+    return await websockets.serve(handler, '127.0.0.1', port)
+
+
+def run_oracle_in_thread(args, rpc_url, ws_url, contract_address, ready):
+    """スタブMCPサーバーとMCPOracleを別スレッドのイベントループで実行"""
+    import logging
+    import mcp_oracle
+
+    logging.getLogger().setLevel(logging.WARNING)
+    mcp_oracle.OASIS_RPC_URL = rpc_url
+    mcp_oracle.OASIS_WS_URL = ws_url
+    mcp_oracle.MYRDAL_CONTRACT_ADDRESS = contract_address
+    mcp_oracle.ORACLE_PRIVATE_KEY = ANVIL_ORACLE_KEY
+    mcp_oracle.ORACLE_PRIVATE_KEYS = []
+    mcp_oracle.FIREFOX_MCP_SERVER_URL = f"ws://127.0.0.1:{args.firefox_port}"
+    mcp_oracle.PYPPETEER_MCP_SERVER_URL = f"ws://127.0.0.1:{args.pyppeteer_port}"
+
+    loop = asyncio.new_event_loop()
+    state = {}
+
+    async def run():
+        servers = [
+            await stub_mcp_server(args.firefox_port, args.firefox_latency, args.result_bytes),
+            await stub_mcp_server(args.pyppeteer_port, args.pyppeteer_latency, args.result_bytes)
+        ]
+        oracle = mcp_oracle.MCPOracle()
+        try:
+            await oracle.connect_to_chain()
+            await oracle.connect_to_mcp_servers()
+            state['task'] = asyncio.current_task()
+            ready.set()
+            await oracle.listen_for_events()
+        finally:
+            await oracle.cleanup()
+            for server in servers:
+                server.close()
+
+    def target():
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(run())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            ready.set()
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+
+    def stop():
+        if 'task' in state:
+            loop.call_soon_threadsafe(state['task'].cancel)
+        thread.join(timeout=10)
+
+    return stop
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="MCPオラクルのスループットベンチマーク")
+    parser.add_argument('--requests', type=int, default=200, help="送信するMCPリクエスト数")
+    parser.add_argument('--firefox-latency', type=float, default=0.1, help="スタブFirefoxサーバーの応答遅延（秒）")
+    parser.add_argument('--pyppeteer-latency', type=float, default=0.05, help="スタブpyppeteerサーバーの応答遅延（秒）")
+    parser.add_argument('--result-bytes', type=int, default=0, help="スタブの結果に付加するデータ量（バイト）")
+    parser.add_argument('--block-time', type=float, default=0, help="anvilのブロック間隔（0の場合は即時採掘）")
+    parser.add_argument('--rpc-port', type=int, default=18545)
+    parser.add_argument('--firefox-port', type=int, default=18765)
+    parser.add_argument('--pyppeteer-port', type=int, default=18766)
+    parser.add_argument('--timeout', type=float, default=300, help="全リクエストの完了を待つ最大秒数")
+    parser.add_argument('--output', help="結果をJSONで保存するファイル")
+    parser.add_argument('--max-failure-rate', type=float, default=0,
+                        help="許容する失敗した結果の割合（超えた場合は終了コード1）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix='myrdal-bench-')
+    # オラクルの永続化先はベンチマークごとに分ける（mcp_oracleのインポート前に設定）
+    os.environ['ORACLE_CHECKPOINT_DB'] = os.path.join(work_dir, 'checkpoint.db')
+    os.environ['ORACLE_RESULT_STORE_DIR'] = os.path.join(work_dir, 'results')
+
+    print("Myrdal.vyをコンパイル中...")
+    success, build = compile_contract(MYRDAL_CONTRACT_PATH, os.path.join(work_dir, 'Myrdal.json'))
+    if not success:
+        sys.exit(1)
+
+    anvil = start_anvil(args.rpc_port, args.block_time)
+    stop_oracle = None
+    try:
+        rpc_url = f"http://127.0.0.1:{args.rpc_port}"
+        w3 = Web3(Web3.HTTPProvider(rpc_url))
+        owner = Account.from_key(ANVIL_OWNER_KEY)
+        oracle_account = Account.from_key(ANVIL_ORACLE_KEY)
+
+        # デプロイとオラクルアカウントの登録
+        deployer = LoadGenerator(w3, w3.eth.contract(abi=build['abi'], bytecode=build['bytecode']), owner)
+        receipt = deployer.transact(deployer.contract.constructor())
+        contract = w3.eth.contract(address=receipt.contractAddress, abi=build['abi'])
+        load = LoadGenerator(w3, contract, owner)
+        load.transact(contract.functions.add_mcp_fulfiller(oracle_account.address))
+        print(f"コントラクトをデプロイしました: {contract.address}")
+
+        task_ids = load.create_tasks((args.requests + REQUESTS_PER_TASK - 1) // REQUESTS_PER_TASK)
+
+        ready = threading.Event()
+        stop_oracle = run_oracle_in_thread(
+            args, rpc_url, f"ws://127.0.0.1:{args.rpc_port}", contract.address, ready
+        )
+        ready.wait()
+
+        observer = ChainObserver(w3, contract, owner.address, oracle_account.address)
+        print(f"{args.requests}件のリクエストを送信します...")
+        load.flood(task_ids, args.requests)
+
+        deadline = time.time() + args.timeout
+        while time.time() < deadline:
+            observer.poll()
+            if len(observer.created) >= args.requests and len(observer.fulfilled) >= args.requests:
+                break
+            time.sleep(OBSERVE_INTERVAL)
+
+        report = observer.report(args)
+        print(json.dumps(report, indent=2))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if stop_oracle:
+            stop_oracle()
+        anvil.terminate()
+
+    if report['failure_rate'] is None:
+        print("結果が1件も書き込まれませんでした", file=sys.stderr)
+        sys.exit(1)
+    if report['failure_rate'] > args.max_failure_rate:
+        print(f"失敗した結果の割合が上限（{args.max_failure_rate}）を超えました: {report['failed']}件", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
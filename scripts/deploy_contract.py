@@ -5,10 +5,14 @@ Myrdalコントラクトのデプロイスクリプト
 
 import json
 import os
+import sys
 from web3 import Web3
 from eth_account import Account
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mcp'))
+from fee_strategy import suggest_fee_params, estimate_gas_limit
+
 # .envファイルから環境変数を読み込む
 load_dotenv()
 
@@ -55,13 +59,15 @@ def deploy_contract():
     # トランザクションの作成
     nonce = w3.eth.get_transaction_count(account.address)
     
-    # コントラクトデプロイトランザクションの構築
-    transaction = MyrdalCore.constructor().build_transaction({
+    # コントラクトデプロイトランザクションの構築（ガスは見積もりに安全マージンを掛けて設定）
+    constructor = MyrdalCore.constructor()
+    tx_params = {
         'from': account.address,
         'nonce': nonce,
-        'gas': 3000000,
-        'gasPrice': w3.eth.gas_price,
-    })
+        'gas': estimate_gas_limit(constructor.estimate_gas({'from': account.address})),
+    }
+    tx_params.update(suggest_fee_params(w3))
+    transaction = constructor.build_transaction(tx_params)
     
     # トランザクションの署名
     signed_txn = w3.eth.account.sign_transaction(transaction, PRIVATE_KEY)
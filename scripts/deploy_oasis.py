@@ -1,7 +1,11 @@
 import os
+import sys
 from web3 import Web3
 from vyper import compile_code
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mcp'))
+from fee_strategy import suggest_fee_params, estimate_gas_limit
+
 # Oasis Testnet設定
 OASIS_TESTNET_RPC = "https://testnet.oasis.dev/"
 CHAIN_ID = 42261  # Oasis Testnetのchain ID
@@ -25,14 +29,16 @@ def deploy_contract(w3, abi, bytecode, deployer_address):
     """コントラクトをデプロイ"""
     contract = w3.eth.contract(abi=abi, bytecode=bytecode)
     
-    # デプロイトランザクションの作成
-    tx = contract.constructor().build_transaction({
+    # デプロイトランザクションの作成（ガスは見積もりに安全マージンを掛けて設定）
+    constructor = contract.constructor()
+    tx_params = {
         'from': deployer_address,
         'nonce': w3.eth.get_transaction_count(deployer_address),
-        'gas': 4000000,
-        'gasPrice': w3.eth.gas_price,
+        'gas': estimate_gas_limit(constructor.estimate_gas({'from': deployer_address})),
         'chainId': CHAIN_ID
-    })
+    }
+    tx_params.update(suggest_fee_params(w3))
+    tx = constructor.build_transaction(tx_params)
     
     return tx
 
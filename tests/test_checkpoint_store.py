@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from checkpoint_store import CheckpointStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = CheckpointStore(path=str(tmp_path / 'checkpoint.db'), name='0xMyrdal')
+    yield store
+    store.close()
+
+def test_cursor_persists_across_restart(store, tmp_path):
+    """カーソルが再起動後も保持されるかテスト"""
+    assert store.get_cursor() is None
+
+    store.set_cursor(100)
+    store.close()
+
+    reopened = CheckpointStore(path=str(tmp_path / 'checkpoint.db'), name='0xMyrdal')
+    assert reopened.get_cursor() == 100
+    reopened.close()
+
+def test_cursor_does_not_move_backwards(store):
+    """カーソルが巻き戻らないかテスト"""
+    store.set_cursor(200)
+    store.set_cursor(150)
+    assert store.get_cursor() == 200
+
+    store.set_cursor(201)
+    assert store.get_cursor() == 201
+
+def test_cursor_is_scoped_by_name(store, tmp_path):
+    """コントラクトごとにカーソルが分かれているかテスト"""
+    store.set_cursor(10)
+
+    other = CheckpointStore(path=str(tmp_path / 'checkpoint.db'), name='0xOther')
+    assert other.get_cursor() is None
+    other.close()
+
+def test_processed_requests(store):
+    """処理済みリクエストの記録と削除が正しく機能するかテスト"""
+    request_id = bytes.fromhex('ab' * 32)
+    assert not store.is_processed(request_id)
+
+    store.mark_processed(request_id, 50)
+    store.mark_processed(request_id, 50)
+    assert store.is_processed(request_id)
+
+    store.prune_processed(51)
+    assert not store.is_processed(request_id)
+
+def test_rewind_on_reorg(store):
+    """リオルグ時にカーソルと分岐以降の処理済み記録が取り消されるかテスト"""
+    store.set_cursor(120)
+    store.mark_processed(b'\x01' * 32, 90)
+    store.mark_processed(b'\x02' * 32, 110)
+
+    store.rewind(100)
+    assert store.get_cursor() == 99
+    assert store.is_processed(b'\x01' * 32)
+    assert not store.is_processed(b'\x02' * 32)
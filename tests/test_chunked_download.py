@@ -0,0 +1,146 @@
+import os
+import re
+import sys
+import hashlib
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from blob_cache import BlobCache
+from chunked_download import SegmentedDownloader, IntegrityError
+
+class StandInDownloadServer:
+    """Range対応のFileverseダウンロードAPIのローカル代替サーバー"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.blobs = {}
+        self.gets = Counter()
+        self.range_gets = 0
+        # 失敗させる残りのRangeリクエスト数
+        self.failures = 0
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def blob(self):
+                return server.blobs.get(self.path.rsplit('/', 1)[-1])
+
+            def do_HEAD(self):
+                blob = self.blob()
+                if blob is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    return self.end_headers()
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(blob)))
+                self.send_header('Accept-Ranges', 'bytes')
+                self.end_headers()
+
+            def do_GET(self):
+                blob = self.blob()
+                if blob is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    return self.end_headers()
+                with server.lock:
+                    server.gets[self.path] += 1
+                match = re.fullmatch(r'bytes=(\d+)-(\d+)', self.headers.get('Range', ''))
+                if match is None:
+                    self.send_response(200)
+                    self.send_header('Content-Length', str(len(blob)))
+                    self.end_headers()
+                    return self.wfile.write(blob)
+                with server.lock:
+                    server.range_gets += 1
+                    fail = server.failures > 0
+                    server.failures -= 1
+                if fail:
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    return self.end_headers()
+                start, end = int(match.group(1)), int(match.group(2))
+                self.send_response(206)
+                self.send_header('Content-Length', str(end - start + 1))
+                self.send_header('Content-Range', f"bytes {start}-{end}/{len(blob)}")
+                self.end_headers()
+                self.wfile.write(blob[start:end + 1])
+
+        return Handler
+
+@pytest.fixture
+def server():
+    api = StandInDownloadServer()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), api.handler())
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    api.url = f"http://127.0.0.1:{httpd.server_address[1]}/v1/files"
+    yield api
+    httpd.shutdown()
+
+def test_segmented_download(server, tmp_path):
+    """Range要求を並列に送ってファイルを組み立てるかテスト"""
+    content = os.urandom(10_000)
+    server.blobs['0xabc'] = content
+    server.failures = 2
+    downloader = SegmentedDownloader(server.url, 'test-key', segment_size=1024, concurrency=4)
+
+    dest = tmp_path / 'out.bin'
+    digest, verified = downloader.download('0xabc', str(dest), expected_sha256=hashlib.sha256(content).hexdigest())
+
+    assert dest.read_bytes() == content
+    assert digest == hashlib.sha256(content).hexdigest() and verified
+    assert server.range_gets == 10 + 2
+
+def test_small_file_is_streamed(server, tmp_path):
+    """セグメントより小さいファイルは1回のGETで取得するかテスト"""
+    server.blobs['0xsmall'] = b'hello'
+    downloader = SegmentedDownloader(server.url, 'test-key', segment_size=1024)
+
+    # ハッシュが分からない場合は未検証として返す
+    assert downloader.download('0xsmall', str(tmp_path / 'small.txt'), expected_size=5)[1] is False
+    assert (tmp_path / 'small.txt').read_bytes() == b'hello'
+    assert server.range_gets == 0
+
+def test_integrity_error(server, tmp_path):
+    """内容がハッシュやサイズと一致しない場合にエラーになるかテスト"""
+    server.blobs['0xabc'] = b'tampered'
+    downloader = SegmentedDownloader(server.url, 'test-key')
+
+    with pytest.raises(IntegrityError):
+        downloader.download('0xabc', str(tmp_path / 'a'), expected_sha256=hashlib.sha256(b'original').hexdigest())
+    with pytest.raises(IntegrityError):
+        downloader.download('0xabc', str(tmp_path / 'b'), expected_size=100)
+
+def test_blob_cache_evicts_least_recently_used(tmp_path):
+    """容量を超えると最も古く使われたファイルが削除され、再起動後も順序が残るかテスト"""
+    cache = BlobCache(str(tmp_path / 'blobs'), max_bytes=250)
+    for name in ('a', 'b'):
+        source = tmp_path / name
+        source.write_bytes(b'x' * 100)
+        cache.put(name, str(source))
+    assert cache.get('a')
+
+    source = tmp_path / 'c'
+    source.write_bytes(b'x' * 100)
+    cache.put('c', str(source))
+
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+    assert cache.total_bytes == 200
+
+    # 書き込み途中のファイルは再起動時に削除される
+    open(cache.partial_path(), 'wb').close()
+    reopened = BlobCache(str(tmp_path / 'blobs'), max_bytes=250)
+    assert sorted(reopened.entries) == ['a', 'c']
+    assert sorted(os.listdir(tmp_path / 'blobs')) == ['a', 'c']
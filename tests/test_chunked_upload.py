@@ -0,0 +1,171 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from chunked_upload import ChunkedUploader, UploadSessionStore, chunk_ranges
+
+class StandInChunkServer:
+    """チャンクアップロードAPIのローカル代替サーバー"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.uploads = {}
+        self.puts = Counter()
+        # チャンク番号 -> 失敗させる残り回数
+        self.failures = {}
+        self.active = 0
+        self.max_active = 0
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def read_body(self):
+                return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+            def do_POST(self):
+                body = self.read_body()
+                if self.path == '/v1/files/uploads':
+                    request = json.loads(body)
+                    with server.lock:
+                        upload_id = f"upload-{len(server.uploads) + 1}"
+                        server.uploads[upload_id] = {'chunk_count': request['chunk_count'], 'chunks': {}}
+                    return self.send_json(200, {'upload_id': upload_id})
+
+                match = re.fullmatch(r'/v1/files/uploads/([\w-]+)/complete', self.path)
+                upload = server.uploads.get(match.group(1)) if match else None
+                if upload is None:
+                    return self.send_json(404, {'error': 'not found'})
+                if len(upload['chunks']) != upload['chunk_count']:
+                    return self.send_json(409, {'error': 'missing chunks'})
+                content = b''.join(upload['chunks'][index] for index in range(upload['chunk_count']))
+                self.send_json(200, {'hash': '0x' + hashlib.sha256(content).hexdigest()})
+
+            def do_GET(self):
+                match = re.fullmatch(r'/v1/files/uploads/([\w-]+)', self.path)
+                upload = server.uploads.get(match.group(1)) if match else None
+                if upload is None:
+                    return self.send_json(404, {'error': 'not found'})
+                self.send_json(200, {'received': sorted(upload['chunks'])})
+
+            def do_PUT(self):
+                body = self.read_body()
+                match = re.fullmatch(r'/v1/files/uploads/([\w-]+)/chunks/(\d+)', self.path)
+                upload = server.uploads.get(match.group(1)) if match else None
+                if upload is None:
+                    return self.send_json(404, {'error': 'not found'})
+                index = int(match.group(2))
+                with server.lock:
+                    server.puts[index] += 1
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                    fail = server.failures.get(index, 0) > 0
+                    if fail:
+                        server.failures[index] -= 1
+                time.sleep(0.01)
+                with server.lock:
+                    server.active -= 1
+                if fail:
+                    return self.send_json(500, {'error': 'injected failure'})
+                if hashlib.sha256(body).hexdigest() != self.headers.get('X-Chunk-SHA256'):
+                    return self.send_json(422, {'error': 'checksum mismatch'})
+                upload['chunks'][index] = body
+                self.send_json(201, {})
+
+        return Handler
+
+@pytest.fixture
+def chunk_server():
+    server = StandInChunkServer()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), server.handler())
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{httpd.server_address[1]}/v1/files"
+    yield server
+    httpd.shutdown()
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / 'capture.bin'
+    path.write_bytes(os.urandom(10 * 1024 + 100))
+    return str(path)
+
+def make_uploader(chunk_server, tmp_path, **kwargs):
+    return ChunkedUploader(
+        chunk_server.url, 'test-key', chunk_size=1024,
+        session_store=UploadSessionStore(str(tmp_path / 'sessions')), **kwargs
+    )
+
+def expected_hash(path):
+    with open(path, 'rb') as f:
+        return '0x' + hashlib.sha256(f.read()).hexdigest()
+
+def test_chunk_ranges():
+    """ファイルサイズが固定長のチャンクに分割されるかテスト"""
+    assert chunk_ranges(2500, 1000) == [(0, 0, 1000), (1, 1000, 1000), (2, 2000, 500)]
+    assert chunk_ranges(0, 1000) == []
+
+def test_parallel_chunked_upload(chunk_server, artifact, tmp_path):
+    """チャンクが並列に送信され、完了後にセッションが削除されるかテスト"""
+    uploader = make_uploader(chunk_server, tmp_path, concurrency=4)
+
+    assert uploader.upload(artifact, 'capture.bin', 'application/octet-stream', {}) == expected_hash(artifact)
+    assert sum(chunk_server.puts.values()) == 11
+    assert chunk_server.max_active > 1
+    assert os.listdir(tmp_path / 'sessions') == []
+
+def test_failed_chunk_is_retried(chunk_server, artifact, tmp_path):
+    """一時的に失敗したチャンクが再送されるかテスト"""
+    chunk_server.failures[3] = 2
+    uploader = make_uploader(chunk_server, tmp_path, retries=3)
+
+    assert uploader.upload(artifact, 'capture.bin', 'application/octet-stream', {}) == expected_hash(artifact)
+    assert chunk_server.puts[3] == 3
+
+def test_interrupted_upload_resumes(chunk_server, artifact, tmp_path):
+    """中断したアップロードが送信済みのチャンクを飛ばして再開されるかテスト"""
+    chunk_server.failures[5] = 10
+    uploader = make_uploader(chunk_server, tmp_path, retries=2)
+    assert uploader.upload(artifact, 'capture.bin', 'application/octet-stream', {}) is None
+    assert len(os.listdir(tmp_path / 'sessions')) == 1
+
+    chunk_server.failures.clear()
+    uploader = make_uploader(chunk_server, tmp_path, retries=2)
+    assert uploader.upload(artifact, 'capture.bin', 'application/octet-stream', {}) == expected_hash(artifact)
+
+    assert len(chunk_server.uploads) == 1
+    assert chunk_server.puts[5] == 3
+    assert all(count == 1 for index, count in chunk_server.puts.items() if index != 5)
+
+def test_expired_session_restarts(chunk_server, artifact, tmp_path):
+    """サーバー側でセッションが失効した場合は最初からアップロードするかテスト"""
+    chunk_server.failures[0] = 10
+    uploader = make_uploader(chunk_server, tmp_path, retries=1)
+    assert uploader.upload(artifact, 'capture.bin', 'application/octet-stream', {}) is None
+
+    chunk_server.failures.clear()
+    chunk_server.uploads.clear()
+    assert uploader.upload(artifact, 'capture.bin', 'application/octet-stream', {}) == expected_hash(artifact)
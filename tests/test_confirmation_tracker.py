@@ -0,0 +1,72 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from confirmation_tracker import ConfirmationTracker
+
+class FakeEth:
+    def __init__(self):
+        self.receipts = {}
+        self.receipt_calls = 0
+
+    async def get_transaction_receipt(self, tx_hash):
+        self.receipt_calls += 1
+        if tx_hash not in self.receipts:
+            raise ValueError('not found')
+        return self.receipts[tx_hash]
+
+class FakeWeb3:
+    def __init__(self):
+        self.eth = FakeEth()
+
+def test_receipts_resolved_per_block():
+    """新しいブロックごとに監視中の受領がまとめて解決されるかテスト"""
+    web3 = FakeWeb3()
+    tracker = ConfirmationTracker(web3)
+    notified = []
+
+    async def listener(block_number):
+        notified.append(block_number)
+
+    tracker.add_block_listener(listener)
+
+    async def scenario():
+        mined = tracker.watch(b'mined')
+        pending = tracker.watch(b'pending')
+        web3.eth.receipts[b'mined'] = {'status': 1}
+
+        await tracker.on_new_block(10)
+        assert mined.result() == {'status': 1}
+        assert not pending.done()
+        assert list(tracker.watched) == [b'pending']
+
+        web3.eth.receipts[b'pending'] = {'status': 1}
+        await tracker.on_new_block(11)
+        return await tracker.wait_for_receipt(b'pending', timeout=1)
+
+    assert asyncio.run(scenario()) == {'status': 1}
+    assert notified == [10, 11]
+    assert web3.eth.receipt_calls == 3
+
+def test_receipts_wait_for_confirmation_depth():
+    """確認数に達するまで受領が解決されないかテスト"""
+    web3 = FakeWeb3()
+    tracker = ConfirmationTracker(web3, confirmations=3)
+
+    async def scenario():
+        future = tracker.watch(b'tx')
+        web3.eth.receipts[b'tx'] = {'status': 1, 'blockNumber': 10}
+        await tracker.on_new_block(10)
+        await tracker.on_new_block(11)
+        assert not future.done()
+
+        # リオルグで別のブロックに取り込み直された
+        web3.eth.receipts[b'tx'] = {'status': 1, 'blockNumber': 11}
+        await tracker.on_new_block(12)
+        assert not future.done()
+        await tracker.on_new_block(13)
+        return future.result()
+
+    assert asyncio.run(scenario()) == {'status': 1, 'blockNumber': 11}
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from content_index import ContentIndex, file_digest
+
+def test_lookup_after_add(tmp_path):
+    """登録した内容がダイジェストとサイズで見つかるかテスト"""
+    index = ContentIndex(str(tmp_path / 'index.db'))
+    index.add('ab' * 32, '0x01', 10, 'image/png')
+
+    assert index.lookup('ab' * 32, 10) == {'file_hash': '0x01', 'size': 10, 'mime_type': 'image/png'}
+    assert index.lookup('ab' * 32, 11) is None
+    assert index.lookup('cd' * 32, 10) is None
+
+def test_index_persists(tmp_path):
+    """インデックスが再起動後も残るかテスト"""
+    path = str(tmp_path / 'index.db')
+    index = ContentIndex(path)
+    index.add('ab' * 32, '0x01', 10, 'image/png')
+    index.close()
+
+    index = ContentIndex(path)
+    assert index.lookup('ab' * 32, 10)['file_hash'] == '0x01'
+    index.remove('ab' * 32)
+    assert index.lookup('ab' * 32, 10) is None
+
+def test_file_digest(tmp_path):
+    """ファイルのダイジェストが内容だけで決まるかテスト"""
+    a = tmp_path / 'a.txt'
+    b = tmp_path / 'b.txt'
+    a.write_bytes(b'same')
+    b.write_bytes(b'same')
+    assert file_digest(str(a)) == file_digest(str(b))
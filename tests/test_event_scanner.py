@@ -0,0 +1,59 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+import event_scanner
+from event_scanner import EventScanner, is_range_error
+
+class FakeContract:
+    address = '0x0000000000000000000000000000000000000001'
+    abi = []
+
+class FlakyScanner(EventScanner):
+    """指定した回数だけ失敗するeth_getLogsを持つスキャナー"""
+
+    def __init__(self, errors):
+        super().__init__(None, FakeContract(), [], initial_block_range=100)
+        self.errors = list(errors)
+        self.calls = []
+
+    async def get_logs(self, from_block, to_block):
+        self.calls.append((from_block, to_block))
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+        return []
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(event_scanner, 'GET_LOGS_RETRY_DELAY', 0)
+
+def test_range_errors():
+    """プロバイダーの範囲・件数上限のエラーだけを範囲のエラーと判定するかテスト"""
+    assert is_range_error(ValueError({'code': -32005, 'message': 'query returned more than 10000 results'}))
+    assert is_range_error(ValueError('Log response size exceeded.'))
+    assert is_range_error(ValueError('block range is too wide'))
+    assert not is_range_error(ValueError({'code': -32005, 'message': 'daily request count exceeded, request rate limited'}))
+    assert not is_range_error(ConnectionError('Connection reset by peer'))
+
+def test_parallel_scan_splits_only_on_range_errors():
+    """範囲の上限に当たったチャンクだけを二分割するかテスト"""
+    scanner = FlakyScanner([ValueError('query returned more than 10000 results')])
+    assert asyncio.run(scanner.scan_range_parallel(0, 99)) == []
+    assert scanner.calls == [(0, 99), (0, 49), (50, 99)]
+
+def test_parallel_scan_retries_other_errors():
+    """範囲の上限以外のエラーは同じチャンクを再試行し、上限回数を超えたら送出するかテスト"""
+    scanner = FlakyScanner([ConnectionError('Connection reset by peer')])
+    assert asyncio.run(scanner.scan_range_parallel(0, 99)) == []
+    assert scanner.calls == [(0, 99), (0, 99)]
+
+    scanner = FlakyScanner([ConnectionError('Connection reset by peer')] * (event_scanner.GET_LOGS_RETRIES + 1))
+    with pytest.raises(ConnectionError):
+        asyncio.run(scanner.scan_range_parallel(0, 99))
+    assert scanner.calls == [(0, 99)] * (event_scanner.GET_LOGS_RETRIES + 1)
@@ -0,0 +1,76 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from fee_strategy import FeeStrategy, fees_from_history, bump_fee_params
+
+class FakeFunction:
+    def __init__(self, gas):
+        self.gas = gas
+        self.calls = 0
+
+    async def estimate_gas(self, tx_params):
+        self.calls += 1
+        return self.gas
+
+class FakeEth:
+    def __init__(self, base_fee=None):
+        self.base_fee = base_fee
+        self.fee_history_calls = 0
+
+    async def get_block(self, block_identifier):
+        return {'baseFeePerGas': self.base_fee}
+
+    async def fee_history(self, block_count, newest_block, percentiles):
+        self.fee_history_calls += 1
+        return {'baseFeePerGas': [90, 100], 'reward': [[1], [3], [2]]}
+
+    @property
+    async def gas_price(self):
+        return 7
+
+class FakeWeb3:
+    def __init__(self, eth):
+        self.eth = eth
+
+def test_fees_from_history():
+    """eth_feeHistoryからEIP-1559の手数料が計算されるかテスト"""
+    fees = fees_from_history({'baseFeePerGas': [90, 100], 'reward': [[1], [3], [2]]})
+    assert fees == {'maxPriorityFeePerGas': 2, 'maxFeePerGas': 202}
+
+def test_bump_fee_params_exceeds_replacement_minimum():
+    """置き換え用の手数料が10%以上引き上げられるかテスト"""
+    bumped = bump_fee_params({'maxFeePerGas': 1000, 'maxPriorityFeePerGas': 10})
+    assert bumped['maxFeePerGas'] >= 1100
+    assert bumped['maxPriorityFeePerGas'] >= 11
+
+def test_gas_limit_cached_per_key():
+    """ガス見積もりがキーごとに1回だけ行われるかテスト"""
+    strategy = FeeStrategy(FakeWeb3(FakeEth()))
+    function = FakeFunction(100000)
+
+    async def scenario():
+        first = await strategy.gas_limit(('complete_mcp_request', 1, 0), function, {})
+        second = await strategy.gas_limit(('complete_mcp_request', 1, 0), function, {})
+        return first, second
+
+    assert asyncio.run(scenario()) == (120000, 120000)
+    assert function.calls == 1
+
+def test_fee_params_eip1559_and_legacy():
+    """EIP-1559対応の有無で手数料パラメータが切り替わるかテスト"""
+    eth = FakeEth(base_fee=100)
+    strategy = FeeStrategy(FakeWeb3(eth))
+
+    async def fetch_twice():
+        return await strategy.fee_params(), await strategy.fee_params()
+
+    first, second = asyncio.run(fetch_twice())
+    assert first == second == {'maxPriorityFeePerGas': 2, 'maxFeePerGas': 202}
+    assert eth.fee_history_calls == 1
+
+    legacy = FeeStrategy(FakeWeb3(FakeEth()))
+    assert asyncio.run(legacy.fee_params()) == {'gasPrice': 7}
+    assert asyncio.run(legacy.replacement_fee_params({'gasPrice': 100})) == {'gasPrice': 113}
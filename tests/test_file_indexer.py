@@ -0,0 +1,92 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from file_indexer import FileIndex, FileIndexer, parse_metadata
+
+UPLOADER = '0x' + 'aa' * 20
+USER = '0x' + 'bb' * 20
+TASK_A = b'\x0a' * 32
+TASK_B = b'\x0b' * 32
+
+def uploaded(block_number, log_index, file_hash, task_id, metadata):
+    return {
+        'event': 'FileUploaded', 'file_hash': file_hash, 'task_id': task_id, 'metadata': metadata,
+        'uploader': UPLOADER, 'block_number': block_number, 'log_index': log_index,
+        'transaction_hash': bytes([block_number]) * 32
+    }
+
+def granted(block_number, log_index, file_hash, user):
+    return {
+        'event': 'FileAccessGranted', 'file_hash': file_hash, 'user': user, 'grantor': UPLOADER,
+        'block_number': block_number, 'log_index': log_index, 'transaction_hash': bytes([block_number]) * 32
+    }
+
+def populated_index(tmp_path):
+    index = FileIndex(str(tmp_path / 'files.db'))
+    index.add_event(uploaded(1, 0, b'\x01' * 32, TASK_A, 'shot.png (image/png, 100 bytes)'), timestamp=1000)
+    index.add_event(uploaded(2, 0, b'\x02' * 32, TASK_A, 'report (final).pdf (application/pdf, 2048 bytes)'), timestamp=2000)
+    index.add_event(uploaded(3, 0, b'\x03' * 32, TASK_B, 'photo.jpg (image/jpeg, 300 bytes)'), timestamp=3000)
+    index.add_event(granted(3, 1, b'\x03' * 32, USER))
+    return index
+
+def test_parse_metadata():
+    """FileUploadedのmetadata文字列を分解できるかテスト"""
+    assert parse_metadata('report (final).pdf (application/pdf, 2048 bytes)') == ('report (final).pdf', 'application/pdf', 2048)
+    assert parse_metadata('unexpected') == ('unexpected', None, None)
+
+def test_query_filters(tmp_path):
+    """タスク・MIMEタイプ・期間・アクセス権での検索をテスト"""
+    index = populated_index(tmp_path)
+
+    assert [f['name'] for f in index.query(task_id=TASK_A)] == ['shot.png', 'report (final).pdf']
+    assert [f['size'] for f in index.query(mime_type='image/*')] == [100, 300]
+    assert [f['mime_type'] for f in index.query(since=1500, until=3000)] == ['application/pdf']
+    assert [f['task_id'] for f in index.query(grantee=USER)] == ['0x' + '0b' * 32]
+    assert len(index.query(grantee=UPLOADER)) == 3
+    assert len(index.query(uploader=UPLOADER, limit=2, offset=2)) == 1
+
+def test_events_are_idempotent_and_rewound(tmp_path):
+    """同じログの再取り込みで重複せず、リオルグで取り消されるかテスト"""
+    index = populated_index(tmp_path)
+    index.add_event(uploaded(3, 0, b'\x03' * 32, TASK_B, 'photo.jpg (image/jpeg, 300 bytes)'), timestamp=3000)
+    index.set_cursor(3)
+    assert len(index.query()) == 3
+
+    index.rewind(3)
+    assert len(index.query()) == 2
+    assert index.query(grantee=USER) == []
+    assert index.get_cursor() == 2
+
+def test_indexer_adds_scanned_events(tmp_path):
+    """スキャンしたイベントがタイムスタンプ付きでインデックスに入るかテスト"""
+    index = FileIndex(str(tmp_path / 'files.db'))
+    blocks = []
+
+    async def get_block(block_number):
+        blocks.append(block_number)
+        return {'timestamp': 1000 + block_number}
+
+    web3 = SimpleNamespace(eth=SimpleNamespace(get_block=get_block))
+    contract = SimpleNamespace(abi=[], address='0x' + '00' * 20)
+    indexer = FileIndexer(web3, contract, index, start_block=1)
+
+    async def events():
+        yield uploaded(5, 0, b'\x01' * 32, TASK_A, 'a.png (image/png, 1 bytes)')
+        yield uploaded(5, 1, b'\x02' * 32, TASK_A, 'b.png (image/png, 2 bytes)')
+        yield granted(5, 2, b'\x02' * 32, USER)
+        indexer.scanner.next_block = 6
+
+    async def idle():
+        await asyncio.sleep(3600)
+
+    indexer.scanner.events = events
+    indexer.block_tracker.run = idle
+    asyncio.run(indexer.run())
+
+    assert [f['timestamp'] for f in index.query()] == [1005, 1005]
+    assert blocks == [5]
+    assert index.get_cursor() == 5
@@ -1,5 +1,5 @@
 import pytest
-from brownie import accounts, FileverseIntegration, MyrdalCore, UserAuth
+from brownie import accounts, FileverseIntegration, Myrdal
 from brownie.exceptions import VirtualMachineError
 
 @pytest.fixture
@@ -120,6 +120,156 @@ def test_record_file_upload(setup):
             {'from': accounts[5]}
         )
 
+def test_record_file_uploads(setup):
+    """複数ファイルのアップロードを1トランザクションで記録できるかテスト"""
+    fileverse_integration = setup['fileverse_integration']
+    owner = setup['owner']
+    
+    task_id = "0x1234567890abcdef1234567890abcdef1234567890abcdef1234567890abcdef"
+    file_hashes = ["0x" + f"{i + 1:064x}" for i in range(3)]
+    
+    tx = fileverse_integration.record_file_uploads(
+        [task_id] * 3,
+        file_hashes,
+        [f"file_{i}.png" for i in range(3)],
+        [""] * 3,
+        ["image/png"] * 3,
+        [100, 200, 300],
+        {'from': owner}
+    )
+    
+    assert tx.status == 1
+    assert tx.return_value == 3
+    assert len(tx.events['FileUploaded']) == 3
+    assert fileverse_integration.get_task_files(task_id) == file_hashes
+    
+    # 配列の長さが揃っていない場合はリバート
+    with pytest.raises(VirtualMachineError):
+        fileverse_integration.record_file_uploads(
+            [task_id], file_hashes[:2], ["a", "b"], ["", ""], ["image/png"] * 2, [1, 2], {'from': owner}
+        )
+    
+    # 非オペレーターが記録しようとするとリバート
+    with pytest.raises(VirtualMachineError):
+        fileverse_integration.record_file_uploads(
+            [task_id], file_hashes[:1], ["a"], [""], ["image/png"], [1], {'from': accounts[5]}
+        )
+
+def test_duplicate_record_links_without_overwriting(setup):
+    """記録済みのファイルはメタデータを上書きせず、タスクへの関連付けだけを行うかテスト"""
+    fileverse_integration = setup['fileverse_integration']
+    owner = setup['owner']
+    operator = accounts[3]
+    fileverse_integration.add_fileverse_operator(operator, {'from': owner})
+    
+    first_task = "0x" + "11" * 32
+    second_task = "0x" + "22" * 32
+    file_hash = "0x" + "ab" * 32
+    fileverse_integration.record_file_upload(
+        first_task, file_hash, "report.pdf", "first", "application/pdf", 1024, {'from': owner}
+    )
+    
+    # 同じハッシュを別のタスク・オペレーターで記録し直しても最初のメタデータのまま
+    tx = fileverse_integration.record_file_upload(
+        second_task, file_hash, "copy.pdf", "second", "application/pdf", 1024, {'from': operator}
+    )
+    assert tx.events['FileUploaded']['task_id'] == second_task
+    assert tx.events['FileUploaded']['uploader'] == owner
+    metadata = fileverse_integration.get_file_metadata(file_hash, {'from': owner})
+    assert metadata[0] == "report.pdf" and metadata[1] == "first"
+    assert metadata[5] == owner and metadata[6] == first_task
+    assert fileverse_integration.has_file_access(file_hash, operator)
+    assert fileverse_integration.get_user_files(operator, {'from': operator}) == []
+    
+    # 関連付け済みのタスクには重複して追加しない
+    tx = fileverse_integration.link_file_to_task(second_task, file_hash, {'from': operator})
+    assert 'FileUploaded' not in tx.events
+    assert fileverse_integration.get_task_files(first_task) == [file_hash]
+    assert fileverse_integration.get_task_files(second_task) == [file_hash]
+    
+    # 記録されていないファイルは関連付けられない
+    with pytest.raises(VirtualMachineError):
+        fileverse_integration.link_file_to_task(second_task, "0x" + "cd" * 32, {'from': operator})
+    # 非オペレーターは関連付けられない
+    with pytest.raises(VirtualMachineError):
+        fileverse_integration.link_file_to_task(second_task, file_hash, {'from': accounts[5]})
+
+def test_record_with_myrdal_core_unknown_task(setup):
+    """MyrdalCoreにないタスクのファイルも記録でき、一括記録全体がリバートしないかテスト"""
+    owner = setup['owner']
+    creator = accounts[4]
+    myrdal = Myrdal.deploy({'from': owner})
+    task_id = myrdal.create_task("task", {'from': creator}).return_value
+    fileverse_integration = FileverseIntegration.deploy(myrdal, setup['mock_user_auth'], {'from': owner})
+    
+    unknown_task = "0x" + "99" * 32
+    file_hashes = ["0x" + f"{i + 1:064x}" for i in range(3)]
+    
+    # 存在しないタスクは作成者へのアクセス権の付与を省略する
+    tx = fileverse_integration.record_file_upload(
+        unknown_task, file_hashes[0], "a.png", "", "image/png", 1, {'from': owner}
+    )
+    assert 'FileAccessGranted' not in tx.events
+    assert fileverse_integration.get_task_files(unknown_task) == [file_hashes[0]]
+    
+    # 存在するタスクと存在しないタスクが混ざった一括記録
+    tx = fileverse_integration.record_file_uploads(
+        [task_id, unknown_task, task_id],
+        file_hashes,
+        ["a.png", "b.png", "c.png"],
+        [""] * 3,
+        ["image/png"] * 3,
+        [1, 2, 3],
+        {'from': owner}
+    )
+    assert tx.return_value == 3
+    assert len(tx.events['FileUploaded']) == 3
+    assert fileverse_integration.has_file_access(file_hashes[0], creator)
+    assert not fileverse_integration.has_file_access(file_hashes[1], creator)
+    assert fileverse_integration.has_file_access(file_hashes[2], creator)
+    assert fileverse_integration.get_task_files(task_id) == [file_hashes[0], file_hashes[2]]
+
+def test_file_lists_beyond_100(setup):
+    """100件を超えるファイルを記録でき、ページごとに取得できるかテスト"""
+    fileverse_integration = setup['fileverse_integration']
+    owner = setup['owner']
+    
+    task_id = "0x" + "11" * 32
+    file_hashes = ["0x" + f"{i + 1:064x}" for i in range(120)]
+    for start in range(0, len(file_hashes), 50):
+        batch = file_hashes[start:start + 50]
+        fileverse_integration.record_file_uploads(
+            [task_id] * len(batch), batch, ["a.png"] * len(batch), [""] * len(batch),
+            ["image/png"] * len(batch), [1] * len(batch), {'from': owner}
+        )
+    
+    assert fileverse_integration.task_file_count(task_id) == 120
+    assert fileverse_integration.user_file_count(owner) == 120
+    assert list(fileverse_integration.get_task_files(task_id)) == file_hashes[:100]
+    assert list(fileverse_integration.get_task_files(task_id, 100, 100)) == file_hashes[100:]
+    assert list(fileverse_integration.get_task_files(task_id, 3, 2)) == file_hashes[3:5]
+    assert list(fileverse_integration.get_user_files(owner, 110, 100, {'from': owner})) == file_hashes[110:]
+    assert list(fileverse_integration.get_task_files(task_id, 200, 10)) == []
+
+def test_get_files_metadata(setup):
+    """複数ファイルのメタデータを一度に取得できるかテスト"""
+    fileverse_integration = setup['fileverse_integration']
+    owner = setup['owner']
+    
+    task_id = "0x1234567890abcdef1234567890abcdef1234567890abcdef1234567890abcdef"
+    file_hashes = ["0x" + f"{i + 1:064x}" for i in range(2)]
+    fileverse_integration.record_file_uploads(
+        [task_id] * 2, file_hashes, ["a.png", "b.png"], ["", ""], ["image/png"] * 2, [100, 200], {'from': owner}
+    )
+    
+    unknown = "0x" + "ff" * 32
+    metadata = fileverse_integration.get_files_metadata(file_hashes + [unknown], {'from': owner})
+    
+    assert [entry['name'] for entry in metadata[:2]] == ["a.png", "b.png"]
+    assert metadata[1]['size'] == 200
+    # 存在しないファイルは空のメタデータ
+    assert metadata[2]['file_hash'] == "0x" + "00" * 32
+
 def test_grant_file_access(setup):
     """ファイルアクセス権の付与が正しく機能するかテスト"""
     # このテストは実際のUserAuthコントラクトとの統合が必要
@@ -0,0 +1,393 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import asyncio
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+import fileverse_manager
+import upload_pipeline
+from fileverse_manager import FileverseManager
+from content_index import file_digest
+
+class StandInFileverse:
+    """FileverseアップロードAPIのローカル代替サーバー"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.uploads = 0
+        self.active = 0
+        self.max_active = 0
+        # ダウンロード用のファイル（ハッシュ -> 内容）
+        self.blobs = {}
+        # HEADでX-Content-SHA256を返すか
+        self.send_digests = True
+        self.downloads = 0
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.headers.get('Authorization') != 'Bearer test-key':
+                    return self.send_json(401, {'error': 'unauthorized'})
+                with server.lock:
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                    server.uploads += 1
+                    upload_number = server.uploads
+                time.sleep(server.delay)
+                with server.lock:
+                    server.active -= 1
+                self.send_json(200, {'hash': f"0x{upload_number:064x}"})
+
+            def do_HEAD(self):
+                blob = server.blobs.get(self.path.rsplit('/', 1)[-1])
+                self.send_response(200 if blob is not None else 404)
+                self.send_header('Content-Length', str(len(blob or b'')))
+                if blob is not None and server.send_digests:
+                    self.send_header('X-Content-SHA256', hashlib.sha256(blob).hexdigest())
+                self.end_headers()
+
+            def do_GET(self):
+                blob = server.blobs.get(self.path.rsplit('/', 1)[-1])
+                if blob is None:
+                    return self.send_json(404, {'error': 'not found'})
+                with server.lock:
+                    server.downloads += 1
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(blob)))
+                self.end_headers()
+                self.wfile.write(blob)
+
+        return Handler
+
+@pytest.fixture
+def fileverse_api():
+    api = StandInFileverse()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), api.handler())
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    api.url = f"http://127.0.0.1:{httpd.server_address[1]}/v1/files"
+    yield api
+    httpd.shutdown()
+
+@pytest.fixture
+def manager(fileverse_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('FILEVERSE_API_KEY', 'test-key')
+    monkeypatch.delenv('FILEVERSE_INTEGRATION_ADDRESS', raising=False)
+    os.makedirs('abis')
+    with open('abis/FileverseIntegration.json', 'w') as f:
+        json.dump([], f)
+    monkeypatch.setattr(fileverse_manager, 'FILEVERSE_API_URL', fileverse_api.url)
+    manager = FileverseManager()
+    yield manager
+    manager.close()
+
+def make_files(tmp_path, count):
+    files = []
+    for i in range(count):
+        path = tmp_path / f"artifact-{i}.txt"
+        path.write_text(f"artifact {i}")
+        files.append({'file_path': str(path), 'task_id': '0x' + '11' * 32})
+    return files
+
+def test_local_stores_created_on_first_use(fileverse_api, tmp_path, monkeypatch):
+    """ローカルのストアが初めて使うときに指定した場所に作られるかテスト"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('abis')
+    with open('abis/FileverseIntegration.json', 'w') as f:
+        json.dump([], f)
+    data_dir = tmp_path / 'data'
+    manager = FileverseManager(
+        content_index_path=str(data_dir / 'content.db'),
+        file_index_path=str(data_dir / 'files.db'),
+        blob_cache_dir=str(data_dir / 'blobs'),
+        upload_session_dir=str(data_dir / 'uploads')
+    )
+    assert sorted(os.listdir(tmp_path)) == ['abis']
+
+    data_dir.mkdir()
+    assert manager.content_index is manager.content_index
+    assert manager.blob_cache.directory == str(data_dir / 'blobs')
+    created = set(os.listdir(data_dir))
+    assert {'blobs', 'content.db'} <= created
+    assert not {'files.db', 'uploads'} & created
+
+def test_close_releases_pipeline(fileverse_api, tmp_path, monkeypatch):
+    """パイプラインが初めて使うときに作られ、closeでワーカーと作業ディレクトリが片付けられるかテスト"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('FILEVERSE_API_KEY', 'test-key')
+    monkeypatch.setattr(fileverse_manager, 'FILEVERSE_API_URL', fileverse_api.url)
+    temp_dir = tmp_path / 'tmp'
+    temp_dir.mkdir()
+    monkeypatch.setattr(upload_pipeline.tempfile, 'tempdir', str(temp_dir))
+    os.makedirs('abis')
+    with open('abis/FileverseIntegration.json', 'w') as f:
+        json.dump([], f)
+
+    with FileverseManager() as manager:
+        assert os.listdir(temp_dir) == []
+        assert all(asyncio.run(manager.upload_many(make_files(tmp_path, 2))))
+        pipeline = manager.pipeline
+        assert pipeline.executor is not None
+        assert os.listdir(temp_dir) == [os.path.basename(pipeline.work_dir)]
+    assert pipeline.executor is None
+    assert os.listdir(temp_dir) == []
+
+def test_upload_file(manager, fileverse_api, tmp_path):
+    """同期アップロードが1件成功するかテスト"""
+    spec = make_files(tmp_path, 1)[0]
+    assert manager.upload_file(spec['file_path'], spec['task_id']) == f"0x{1:064x}"
+
+def test_upload_many_bounded_concurrency(manager, fileverse_api, tmp_path):
+    """upload_manyが同時実行数の上限まで並列にアップロードするかテスト"""
+    files = make_files(tmp_path, 8)
+    results = asyncio.run(manager.upload_many(files, concurrency=3))
+
+    assert all(results)
+    assert len(set(results)) == 8
+    assert 1 < fileverse_api.max_active <= 3
+
+def test_upload_many_reports_failures(manager, fileverse_api, tmp_path):
+    """失敗したファイルが他のアップロードを止めないかテスト"""
+    files = make_files(tmp_path, 2)
+    files.insert(1, {'file_path': str(tmp_path / 'missing.txt'), 'task_id': '0x' + '11' * 32})
+    results = asyncio.run(manager.upload_many(files))
+
+    assert results[0] and results[2]
+    assert results[1] is None
+
+def test_upload_file_skips_duplicate_content(manager, fileverse_api, tmp_path):
+    """同じ内容のファイルは再アップロードせず既存のハッシュを使うかテスト"""
+    first = tmp_path / 'screenshot.png'
+    second = tmp_path / 'screenshot-copy.png'
+    first.write_bytes(b'\x89PNG same pixels')
+    second.write_bytes(b'\x89PNG same pixels')
+
+    file_hash = manager.upload_file(str(first), '0x' + '11' * 32)
+    assert manager.upload_file(str(second), '0x' + '22' * 32) == file_hash
+    assert fileverse_api.uploads == 1
+
+def test_upload_many_uploads_identical_files_once(manager, fileverse_api, tmp_path):
+    """同じバッチ内の同一内容のファイルが1回だけアップロードされるかテスト"""
+    files = make_files(tmp_path, 2)
+    duplicate = tmp_path / 'artifact-0-copy.txt'
+    duplicate.write_text('artifact 0')
+    files.append({'file_path': str(duplicate), 'task_id': '0x' + '22' * 32})
+
+    results = asyncio.run(manager.upload_many(files))
+    assert results[2] == results[0]
+    assert fileverse_api.uploads == 2
+
+    # 2回目は既知の内容なのでアップロードしない
+    assert asyncio.run(manager.upload_many(files)) == results
+    assert fileverse_api.uploads == 2
+
+class RecordingContract:
+    """record_file_uploadsの呼び出しを記録する代替コントラクト"""
+
+    def __init__(self, manager):
+        self.batches = []
+        manager.fileverse_integration = self
+        manager._send_record_batch_transaction = self.send
+        manager.web3 = SimpleNamespace(eth=SimpleNamespace(wait_for_transaction_receipt=self.receipt))
+
+    def send(self, records):
+        self.batches.append(list(records))
+        return len(self.batches)
+
+    def receipt(self, tx):
+        return SimpleNamespace(transactionHash=bytes([tx]))
+
+def test_upload_many_records_in_batches(manager, fileverse_api, tmp_path):
+    """アップロードしたファイルがまとめて1トランザクションで記録されるかテスト"""
+    contract = RecordingContract(manager)
+    manager.record_batch_size = 4
+    results = asyncio.run(manager.upload_many(make_files(tmp_path, 10)))
+
+    assert all(results)
+    assert sum(len(batch) for batch in contract.batches) == 10
+    assert max(len(batch) for batch in contract.batches) == 4
+    assert len(contract.batches) == 3
+
+def test_queue_record_flushes_by_count_and_deadline(manager, fileverse_api, tmp_path):
+    """キューに溜めた記録が件数または待ち時間で送信されるかテスト"""
+    contract = RecordingContract(manager)
+    manager.record_batch_size = 3
+    manager.record_batch_latency = 0.5
+    fileverse_api.delay = 0
+
+    for spec in make_files(tmp_path, 4):
+        assert manager.upload_file(spec['file_path'], spec['task_id'], batch_record=True)
+    assert [len(batch) for batch in contract.batches] == [3]
+
+    time.sleep(0.8)
+    assert [len(batch) for batch in contract.batches] == [3, 1]
+    assert manager.flush_records() == 0
+
+def test_duplicate_content_is_linked_not_recorded(manager, fileverse_api, tmp_path):
+    """同じ内容のファイルはメタデータを記録し直さず、タスクへの関連付けだけを送るかテスト"""
+    sent = []
+    manager.fileverse_integration = object()
+    manager._send_record_transaction = lambda *args: sent.append(('record',) + args) or 1
+    manager._send_link_transaction = lambda *args: sent.append(('link',) + args) or 2
+    manager.web3 = SimpleNamespace(eth=SimpleNamespace(
+        wait_for_transaction_receipt=lambda tx: SimpleNamespace(transactionHash=bytes([tx]))
+    ))
+    first = tmp_path / 'report.txt'
+    second = tmp_path / 'report-copy.txt'
+    first.write_text('same report')
+    second.write_text('same report')
+
+    file_hash = manager.upload_file(str(first), '0x' + '11' * 32, description='first')
+    assert manager.upload_file(str(second), '0x' + '22' * 32, description='second') == file_hash
+    assert [call[0] for call in sent] == ['record', 'link']
+    assert sent[1][1:] == ('0x' + '22' * 32, file_hash)
+
+class MetadataContract:
+    """get_files_metadataの呼び出し回数を数える代替コントラクト"""
+
+    def __init__(self, files):
+        self.files = files
+        self.calls = 0
+        self.functions = self
+
+    def get_files_metadata(self, file_hashes):
+        def call():
+            self.calls += 1
+            return [
+                self.files.get(file_hash, (b'\x00' * 32, '0x' + '00' * 20, '', '', '', 0, 0, b'\x00' * 32))
+                for file_hash in file_hashes
+            ]
+        return SimpleNamespace(call=call)
+
+def test_get_files_metadata_bulk_and_cached(manager):
+    """メタデータが1回の呼び出しでまとめて読まれ、2回目はキャッシュから返るかテスト"""
+    file_hashes = [bytes([i + 1]) * 32 for i in range(3)]
+    task_id = b'\x11' * 32
+    manager.fileverse_integration = MetadataContract({
+        file_hash: (file_hash, '0x' + 'aa' * 20, f"file-{i}.png", '', 'image/png', 100 + i, 1700000000, task_id)
+        for i, file_hash in enumerate(file_hashes)
+    })
+    unknown = '0x' + 'ff' * 32
+
+    metadata = manager.get_files_metadata(['0x' + h.hex() for h in file_hashes] + [unknown])
+    assert [m['name'] for m in metadata[:3]] == ['file-0.png', 'file-1.png', 'file-2.png']
+    assert metadata[0]['task_id'] == '0x' + '11' * 32
+    assert metadata[3] is None
+    assert manager.fileverse_integration.calls == 1
+
+    assert manager.get_files_metadata(['0x' + h.hex() for h in file_hashes])[2]['size'] == 102
+    assert manager.get_file_metadata('0x' + file_hashes[1].hex())['name'] == 'file-1.png'
+    assert manager.fileverse_integration.calls == 1
+
+def test_get_task_files_reads_every_page(manager):
+    """100件を超えるタスクのファイル一覧を全ページ読み出すかテスト"""
+    file_hashes = [bytes([1]) * 30 + i.to_bytes(2, 'big') for i in range(230)]
+    calls = []
+
+    def get_task_files(task_id, offset, limit):
+        calls.append((offset, limit))
+        return SimpleNamespace(call=lambda: file_hashes[offset:offset + limit])
+
+    manager.fileverse_integration = SimpleNamespace(functions=SimpleNamespace(
+        task_file_count=lambda task_id: SimpleNamespace(call=lambda: len(file_hashes)),
+        get_task_files=get_task_files
+    ))
+    assert manager.get_task_files('0x' + '11' * 32) == file_hashes
+    assert calls == [(0, 100), (100, 100), (200, 100)]
+
+def test_find_files_uses_local_index(manager):
+    """find_filesがチェーンに問い合わせずにローカルインデックスから検索するかテスト"""
+    task_id = '0x' + '11' * 32
+    for i in range(120):
+        manager.file_index.add_event({
+            'event': 'FileUploaded', 'file_hash': bytes([1]) * 31 + bytes([i]), 'task_id': bytes.fromhex(task_id[2:]),
+            'metadata': f"file-{i}.txt (text/plain, {i} bytes)", 'uploader': '0x' + 'aa' * 20,
+            'block_number': i, 'log_index': 0, 'transaction_hash': bytes([i]) * 32
+        }, timestamp=i)
+
+    files = manager.find_files(task_id=task_id)
+    assert len(files) == 120
+    assert files[-1]['name'] == 'file-119.txt'
+    assert len(manager.find_files(task_id=task_id, since=100)) == 20
+
+def test_download_many_uses_blob_cache(manager, fileverse_api, tmp_path):
+    """ダウンロードしたファイルが2回目以降はローカルのキャッシュから返るかテスト"""
+    hashes = ['0x' + f"{i:064x}" for i in (1, 2)]
+    fileverse_api.blobs = {hashes[0]: b'first artifact', hashes[1]: b'second artifact'}
+
+    paths = asyncio.run(manager.download_many(hashes + [hashes[0], '0x' + 'ff' * 32], dest_dir=str(tmp_path / 'out')))
+    assert open(paths[0], 'rb').read() == b'first artifact'
+    assert open(paths[1], 'rb').read() == b'second artifact'
+    assert paths[2] == paths[0]
+    assert paths[3] is None
+    assert fileverse_api.downloads == 2
+
+    assert open(manager.download_file(hashes[1]), 'rb').read() == b'second artifact'
+    assert fileverse_api.downloads == 2
+
+def test_download_verifies_uploaded_content(manager, fileverse_api, tmp_path):
+    """アップロード時に記録したハッシュと一致しない内容を拒否するかテスト"""
+    source = tmp_path / 'report.txt'
+    source.write_text('original report')
+    file_hash = manager.upload_file(str(source), '0x' + '11' * 32)
+
+    fileverse_api.blobs[file_hash] = b'tampered report'
+    assert manager.download_file(file_hash) is None
+    assert os.listdir(manager.blob_cache.directory) == []
+
+    fileverse_api.blobs[file_hash] = b'original report'
+    assert open(manager.download_file(file_hash), 'rb').read() == b'original report'
+
+def test_download_without_digest_is_not_cached(manager, fileverse_api, tmp_path):
+    """ハッシュが分からない内容はキャッシュにもインデックスにも入れないかテスト"""
+    file_hash = '0x' + f"{3:064x}"
+    fileverse_api.blobs[file_hash] = b'unverified artifact'
+    fileverse_api.send_digests = False
+
+    dest = tmp_path / 'out' / 'artifact.txt'
+    assert manager.download_file(file_hash, str(dest)) == str(dest)
+    assert dest.read_bytes() == b'unverified artifact'
+    assert open(manager.download_file(file_hash), 'rb').read() == b'unverified artifact'
+    assert fileverse_api.downloads == 2
+    assert os.listdir(manager.blob_cache.directory) == []
+    assert manager.content_index.digest_for(file_hash) is None
+
+def test_upload_file_runs_pipeline(manager, fileverse_api, tmp_path):
+    """アップロード前にパイプラインで圧縮され、一時ファイルが片付けられるかテスト"""
+    work_dir = tmp_path / 'pipeline'
+    manager.pipeline = fileverse_manager.UploadPipeline(
+        stages=upload_pipeline.default_stages(compress_text=True), work_dir=str(work_dir)
+    )
+    page = tmp_path / 'page.html'
+    page.write_text('<html>' + '<p>row</p>' * 1000 + '</html>')
+
+    file_hash = manager.upload_file(str(page), '0x' + '11' * 32)
+    assert file_hash == f"0x{1:064x}"
+    assert manager.content_index.lookup(file_digest(str(page)), page.stat().st_size) is None
+    assert os.listdir(work_dir) == []
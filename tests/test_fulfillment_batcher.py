@@ -0,0 +1,61 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from fulfillment_batcher import FulfillmentBatcher
+
+def test_flush_on_size():
+    """件数が上限に達したらすぐに送信されるかテスト"""
+    batches = []
+
+    async def flush(items):
+        batches.append(items)
+
+    async def scenario():
+        batcher = FulfillmentBatcher(flush, max_batch_size=3, max_latency=60)
+        for i in range(7):
+            await batcher.add(i)
+        assert batches == [[0, 1, 2], [3, 4, 5]]
+        await batcher.close()
+
+    asyncio.run(scenario())
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+def test_flush_on_deadline():
+    """待ち時間の上限で送信されるかテスト"""
+    batches = []
+
+    async def flush(items):
+        batches.append(items)
+
+    async def scenario():
+        batcher = FulfillmentBatcher(flush, max_batch_size=10, max_latency=0.01)
+        await batcher.add('a')
+        await batcher.add('b')
+        assert batches == []
+        await asyncio.sleep(0.05)
+        assert batches == [['a', 'b']]
+        await batcher.close()
+
+    asyncio.run(scenario())
+    assert batches == [['a', 'b']]
+
+def test_flush_error_does_not_stop_batcher():
+    """送信エラーの後も次のバッチが送信されるかテスト"""
+    batches = []
+
+    async def flush(items):
+        batches.append(items)
+        if len(batches) == 1:
+            raise RuntimeError('send failed')
+
+    async def scenario():
+        batcher = FulfillmentBatcher(flush, max_batch_size=1, max_latency=60)
+        await batcher.add(1)
+        await batcher.add(2)
+        await batcher.close()
+
+    asyncio.run(scenario())
+    assert batches == [[1], [2]]
@@ -0,0 +1,76 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from header_tracker import HeaderTracker
+
+class FakeEth:
+    def __init__(self):
+        self.chain = {}
+
+    def build(self, start, end, fork='a'):
+        """startからendまでのブロックを作成（forkで別チェーンのハッシュにする）"""
+        for number in range(start, end + 1):
+            parent = self.chain[number - 1]['hash'] if number - 1 in self.chain else b'genesis'
+            self.chain[number] = {'hash': f"{fork}{number}".encode(), 'parentHash': parent}
+
+    async def get_block(self, block_number):
+        return self.chain[block_number]
+
+class FakeWeb3:
+    def __init__(self):
+        self.eth = FakeEth()
+
+def test_no_reorg_on_linear_chain():
+    """チェーンが伸びるだけの場合はリオルグを検出しないかテスト"""
+    web3 = FakeWeb3()
+    tracker = HeaderTracker(web3, window=16)
+    web3.eth.build(1, 10)
+
+    async def scenario():
+        assert await tracker.update(10) is None
+        web3.eth.build(11, 13)
+        assert await tracker.update(13) is None
+
+    asyncio.run(scenario())
+    assert tracker.hashes[13] == b'a13'
+
+def test_reorg_detected_by_parent_hash():
+    """ブロックが置き換えられた場合に分岐ブロックが通知されるかテスト"""
+    web3 = FakeWeb3()
+    tracker = HeaderTracker(web3, window=16)
+    forks = []
+
+    async def listener(fork_block):
+        forks.append(fork_block)
+
+    tracker.add_reorg_listener(listener)
+    web3.eth.build(1, 10)
+
+    async def scenario():
+        for head in range(1, 11):
+            await tracker.on_new_block(head)
+        # ブロック8以降が別チェーンに置き換えられる
+        web3.eth.build(8, 11, fork='b')
+        await tracker.on_new_block(11)
+
+    asyncio.run(scenario())
+    assert forks == [8]
+    assert tracker.hashes[8] == b'b8'
+    assert tracker.hashes[11] == b'b11'
+    assert tracker.hashes[7] == b'a7'
+
+def test_old_headers_pruned():
+    """保持範囲より古いヘッダーが削除されるかテスト"""
+    web3 = FakeWeb3()
+    tracker = HeaderTracker(web3, window=4)
+    web3.eth.build(1, 20)
+
+    async def scenario():
+        for head in range(1, 21):
+            await tracker.update(head)
+
+    asyncio.run(scenario())
+    assert sorted(tracker.hashes) == [17, 18, 19, 20]
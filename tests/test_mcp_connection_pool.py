@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import asyncio
+
+import websockets
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from mcp_connection_pool import MCPConnectionPool
+
+async def echo_server(delay=0):
+    """受け取ったリクエストのidを返すローカルのWebSocketサーバー（delayは'slow'のリクエストの応答までの秒数）"""
+    connections = []
+
+    async def handler(ws):
+        connections.append(ws)
+        async for message in ws:
+            request = json.loads(message)
+            if request.get('slow'):
+                await asyncio.sleep(delay)
+            await ws.send(json.dumps({'id': request['id'], 'status': 'success'}))
+
+    server = await websockets.serve(handler, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"ws://127.0.0.1:{port}", connections
+
+def test_pool_requests_against_real_server():
+    """実際のWebSocketサーバーに対してプール経由のリクエストが成功するかテスト"""
+    async def run():
+        server, url, connections = await echo_server()
+        pool = MCPConnectionPool('test', url, size=2)
+        try:
+            await pool.connect()
+            responses = await asyncio.gather(*(pool.request({'id': i}) for i in range(6)))
+            return responses, len(connections)
+        finally:
+            await pool.close()
+            server.close()
+            await server.wait_closed()
+
+    responses, connection_count = asyncio.run(run())
+    assert [response['id'] for response in responses] == list(range(6))
+    assert all(response['status'] == 'success' for response in responses)
+    assert connection_count == 2
+
+def test_pool_reconnects_after_server_closes_connection():
+    """サーバー側で切断された接続を再接続して使うかテスト"""
+    async def run():
+        server, url, connections = await echo_server()
+        pool = MCPConnectionPool('test', url, size=1)
+        try:
+            assert (await pool.request({'id': 1}))['status'] == 'success'
+            await connections[0].close()
+            await asyncio.sleep(0.1)
+            response = await pool.request({'id': 2})
+            return response, len(connections)
+        finally:
+            await pool.close()
+            server.close()
+            await server.wait_closed()
+
+    response, connection_count = asyncio.run(run())
+    assert response == {'id': 2, 'status': 'success'}
+    assert connection_count == 2
+
+def test_cancelled_request_does_not_leak_reply():
+    """応答待ちでキャンセルされた接続の応答を次のリクエストが受け取らないかテスト"""
+    async def run():
+        server, url, connections = await echo_server(delay=0.3)
+        pool = MCPConnectionPool('test', url, size=1)
+        try:
+            try:
+                await asyncio.wait_for(pool.request({'id': 1, 'slow': True}), 0.1)
+            except asyncio.TimeoutError:
+                pass
+            response = await pool.request({'id': 2})
+            # キャンセルされたリクエストの応答が届いた後も混ざらない
+            await asyncio.sleep(0.4)
+            return response, await pool.request({'id': 3}), len(connections)
+        finally:
+            await pool.close()
+            server.close()
+            await server.wait_closed()
+
+    response, next_response, connection_count = asyncio.run(run())
+    assert response == {'id': 2, 'status': 'success'}
+    assert next_response == {'id': 3, 'status': 'success'}
+    assert connection_count == 2
+
+def test_response_timeout_discards_connection():
+    """応答が時間内に届かない場合はエラーにし、その接続を再利用しないかテスト"""
+    async def run():
+        server, url, connections = await echo_server(delay=0.3)
+        pool = MCPConnectionPool('test', url, size=1, timeout=0.1)
+        try:
+            try:
+                await pool.request({'id': 1, 'slow': True})
+                timed_out = False
+            except asyncio.TimeoutError:
+                timed_out = True
+            return timed_out, await pool.request({'id': 2}), len(connections)
+        finally:
+            await pool.close()
+            server.close()
+            await server.wait_closed()
+
+    timed_out, response, connection_count = asyncio.run(run())
+    assert timed_out
+    assert response == {'id': 2, 'status': 'success'}
+    assert connection_count == 2
@@ -0,0 +1,108 @@
+import os
+import sys
+import asyncio
+from collections import deque
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from checkpoint_store import CheckpointStore
+from request_dedup import RequestDeduplicator, STATE_SUBMITTED, STATE_CONFIRMED, STATE_FAILED
+from mcp_oracle import MCPOracle
+
+class FakeCall:
+    def __init__(self, value):
+        self.value = value
+
+    async def call(self, *args):
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+class FakeFunctions:
+    """get_mcp_requestの完了フラグだけを返すコントラクト関数"""
+    def __init__(self, fulfilled):
+        self.fulfilled = fulfilled
+
+    def get_mcp_request(self, request_id):
+        if request_id not in self.fulfilled:
+            return FakeCall(Exception("Request not found"))
+        return FakeCall([request_id, b'', 1, '', b'', 0, self.fulfilled[request_id], ''])
+
+def make_oracle(tmp_path, fulfilled, mined, send_ok=True):
+    """reconcile_transactionsに必要な部分だけを持つオラクル"""
+    oracle = MCPOracle.__new__(MCPOracle)
+    oracle.checkpoint_store = CheckpointStore(path=str(tmp_path / 'checkpoint.db'))
+    oracle.deduplicator = RequestDeduplicator(oracle.checkpoint_store)
+    oracle.recent_fulfillments = deque()
+    oracle.account = SimpleNamespace(address='0x' + '11' * 20)
+    oracle.contract = SimpleNamespace(functions=FakeFunctions(fulfilled))
+    oracle.fee_strategy = SimpleNamespace(gas_limits={})
+
+    async def reconcile():
+        return mined, []
+    oracle.signer_pool = SimpleNamespace(reconcile=reconcile)
+
+    oracle.sent = []
+    async def send_results_to_contract(results):
+        oracle.sent.append(results)
+        return send_ok
+    oracle.send_results_to_contract = send_results_to_contract
+    return oracle
+
+def reverted(meta):
+    return SimpleNamespace(
+        receipt=SimpleNamespace(status=0, gasUsed=50000, blockNumber=10),
+        tx={'gas': 300000},
+        tx_hash=b'\xaa' * 32,
+        meta=meta
+    )
+
+def test_reverted_batch_is_resent_individually(tmp_path):
+    """リバートしたバッチの結果を1件ずつ送り直すかテスト"""
+    ids = [bytes([i]) * 32 for i in range(1, 4)]
+    meta = [(request_id, {'status': 'success'}) for request_id in ids]
+    oracle = make_oracle(tmp_path, {}, [reverted(meta)])
+    for request_id in ids:
+        oracle.deduplicator.set_state(request_id, STATE_SUBMITTED, 5)
+
+    asyncio.run(oracle.reconcile_transactions(11))
+
+    assert oracle.sent == [[item] for item in meta]
+    assert all(oracle.deduplicator.state(request_id) == STATE_SUBMITTED for request_id in ids)
+    oracle.checkpoint_store.close()
+
+def test_reverted_single_result_is_recorded(tmp_path):
+    """1件でリバートした結果は完了済みなら確定、それ以外は失敗として記録するかテスト"""
+    done, bad, missing = b'\x01' * 32, b'\x02' * 32, b'\x03' * 32
+    mined = [
+        reverted([(done, {'status': 'success'})]),
+        reverted([(bad, {'status': 'success'})]),
+        reverted([(missing, {'status': 'success'})])
+    ]
+    oracle = make_oracle(tmp_path, {done: True, bad: False}, mined)
+    for request_id in (done, bad, missing):
+        oracle.deduplicator.set_state(request_id, STATE_SUBMITTED, 5)
+
+    asyncio.run(oracle.reconcile_transactions(11))
+
+    assert oracle.sent == []
+    assert oracle.deduplicator.state(done) == STATE_CONFIRMED
+    assert oracle.deduplicator.state(bad) == STATE_FAILED
+    assert oracle.deduplicator.state(missing) == STATE_FAILED
+    # 再起動後も送信済みのまま残らない
+    assert oracle.checkpoint_store.get_state(bad) == STATE_FAILED
+    oracle.checkpoint_store.close()
+
+def test_unsendable_retry_is_recorded_failed(tmp_path):
+    """1件ずつの再送自体ができなかった結果は失敗として記録するかテスト"""
+    ids = [b'\x01' * 32, b'\x02' * 32]
+    oracle = make_oracle(tmp_path, {}, [reverted([(request_id, {}) for request_id in ids])], send_ok=False)
+    for request_id in ids:
+        oracle.deduplicator.set_state(request_id, STATE_SUBMITTED, 5)
+
+    asyncio.run(oracle.reconcile_transactions(11))
+
+    assert len(oracle.sent) == 2
+    assert all(oracle.deduplicator.state(request_id) == STATE_FAILED for request_id in ids)
+    oracle.checkpoint_store.close()
@@ -0,0 +1,107 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from web3.exceptions import ContractLogicError
+
+from event_indexer import EventIndex
+from memory_indexer import MemoryIndex, MemoryIndexer
+
+OWNER = '0x' + 'aa' * 20
+OTHER = '0x' + 'bb' * 20
+TASK = b'\x0a' * 32
+
+def stored(block_number, log_index, memory_id, task_id=b'\x00' * 32):
+    return {
+        'event': 'MemoryStored', 'memory_id': memory_id, 'task_id': task_id, 'timestamp': 1000 + block_number,
+        'block_number': block_number, 'log_index': log_index, 'transaction_hash': bytes([block_number]) * 32
+    }
+
+def deleted(block_number, log_index, memory_id):
+    return {
+        'event': 'MemoryDeleted', 'memory_id': memory_id, 'timestamp': 1000 + block_number,
+        'block_number': block_number, 'log_index': log_index, 'transaction_hash': bytes([block_number]) * 32
+    }
+
+def memory(tags, owner=OWNER):
+    return {'owner': owner, 'priority': 1, 'tags': tags}
+
+def populated_index(tmp_path):
+    index = MemoryIndex(str(tmp_path / 'memories.db'))
+    index.add_memory(stored(1, 0, b'\x01' * 32, TASK), memory(['research', 'web']))
+    index.add_memory(stored(2, 0, b'\x02' * 32), memory(['research']))
+    index.add_memory(stored(3, 0, b'\x03' * 32), memory(['web', 'news'], owner=OTHER))
+    index.add_memory(stored(4, 0, b'\x04' * 32), memory(['research', 'web', 'news']))
+    return index
+
+def ids(results):
+    return [result['memory_id'][2:4] for result in results]
+
+def test_and_or_search(tmp_path):
+    """AND検索・重複のないOR検索・所有者での絞り込みをテスト"""
+    index = populated_index(tmp_path)
+
+    assert ids(index.search(['research', 'web'])) == ['01', '04']
+    assert ids(index.search(['web', 'research', 'web'])) == ['01', '04']
+    assert ids(index.search(['research', 'news'], require_all=False)) == ['01', '02', '03', '04']
+    assert ids(index.search(['web'], owner=OWNER)) == ['01', '04']
+    assert ids(index.search(['research', 'web', 'news'], require_all=False, limit=2, offset=1)) == ['02', '03']
+    assert index.search(['research'])[0]['task_id'] == '0x' + '0a' * 32
+
+def test_delete_and_rewind(tmp_path):
+    """削除の取り込みと、リオルグでの保存・削除の取り消しをテスト"""
+    index = populated_index(tmp_path)
+    index.delete_memory(deleted(5, 0, b'\x01' * 32))
+    index.set_cursor(5)
+    assert ids(index.search(['research'])) == ['02', '04']
+
+    index.rewind(4)
+    assert ids(index.search(['research'])) == ['01', '02']
+    assert index.get_cursor() == 3
+
+def test_indexer_reads_tags(tmp_path):
+    """スキャンしたイベントのタグをコントラクトから読み込むかテスト"""
+    index = MemoryIndex(str(tmp_path / 'memories.db'))
+    tags = {b'\x01' * 32: ['research'], b'\x02' * 32: None}
+
+    def get_memory(memory_id):
+        async def call():
+            if tags[memory_id] is None:
+                raise ContractLogicError("Memory not found")
+            return (memory_id, OWNER, 'content', 1000, 1, tags[memory_id], False)
+        return SimpleNamespace(call=call)
+
+    contract = SimpleNamespace(abi=[], address='0x' + '00' * 20, functions=SimpleNamespace(get_memory=get_memory))
+    indexer = MemoryIndexer(SimpleNamespace(eth=None), contract, index, start_block=1)
+
+    async def events():
+        yield stored(5, 0, b'\x01' * 32)
+        # 取り込む前に削除されたメモリ
+        yield stored(5, 1, b'\x02' * 32)
+        yield deleted(6, 0, b'\x02' * 32)
+        indexer.scanner.next_block = 7
+
+    async def idle():
+        await asyncio.sleep(3600)
+
+    indexer.scanner.events = events
+    indexer.block_tracker.run = idle
+    asyncio.run(indexer.run())
+
+    assert ids(index.search(['research'])) == ['01']
+    assert index.conn.execute('SELECT deleted_block FROM memories WHERE memory_id = ?', ('0x' + '02' * 32,)).fetchone() == (6,)
+    assert index.get_cursor() == 6
+
+def test_index_requires_hooks(tmp_path):
+    """取り消し処理を実装していないインデックスは作成できないかテスト"""
+    class IncompleteIndex(EventIndex):
+        def create_tables(self):
+            pass
+
+    with pytest.raises(TypeError):
+        IncompleteIndex(str(tmp_path / 'incomplete.db'))
@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from metadata_cache import MetadataCache
+
+def test_lru_eviction():
+    """上限を超えると最も古く使われたエントリが削除されるかテスト"""
+    cache = MetadataCache(max_size=2)
+    cache.put('0x01', {'name': 'a'})
+    cache.put('0x02', {'name': 'b'})
+    assert cache.get('0x01') == {'name': 'a'}
+    cache.put('0x03', {'name': 'c'})
+
+    assert cache.get('0x02') is None
+    assert cache.get('0x01') == {'name': 'a'}
+    assert cache.get('0x03') == {'name': 'c'}
+
+def test_persistence(tmp_path):
+    """ディスクに保存したエントリが再起動後も読めるかテスト"""
+    path = str(tmp_path / 'metadata.db')
+    MetadataCache(path=path).put('0x01', {'name': 'a', 'size': 10})
+
+    cache = MetadataCache(path=path)
+    assert cache.get('0x01') == {'name': 'a', 'size': 10}
+    cache.discard('0x01')
+    assert MetadataCache(path=path).get('0x01') is None
@@ -0,0 +1,159 @@
+import pytest
+from brownie import accounts, Myrdal
+from brownie.exceptions import VirtualMachineError
+
+# 1回の検索で走査する一覧の件数の上限（contracts/Myrdal.vyのMAX_LIST_SCAN）
+MAX_LIST_SCAN = 10000
+# テストで設定する走査件数（上限を超える件数のメモリを少ないトランザクションで用意する）
+TEST_SCAN_LIMIT = 150
+
+@pytest.fixture
+def setup():
+    # デプロイアカウント
+    owner = accounts[0]
+    myrdal = Myrdal.deploy({'from': owner})
+    return {'owner': owner, 'myrdal': myrdal}
+
+def test_user_tasks_beyond_100(setup):
+    """100件を超えるタスクを記録し、ページごとに取得できるかテスト"""
+    myrdal = setup['myrdal']
+    owner = setup['owner']
+
+    task_ids = [myrdal.create_task(f"task {i}", {'from': owner}).return_value for i in range(105)]
+
+    assert myrdal.user_task_count(owner) == 105
+    assert list(myrdal.get_user_tasks(owner)) == task_ids[:100]
+    assert list(myrdal.get_user_tasks(owner, 100, 100)) == task_ids[100:]
+    assert list(myrdal.get_user_tasks(owner, 3, 2)) == task_ids[3:5]
+    assert list(myrdal.get_user_tasks(owner, 200, 10)) == []
+
+def test_append_cost_does_not_grow(setup):
+    """一覧への追加のガスが件数に比例して増えないかテスト"""
+    myrdal = setup['myrdal']
+    owner = setup['owner']
+
+    gas = [
+        myrdal.store_memory(f"memory {i:02d}", ["research"], 1, False, {'from': owner}).gas_used
+        for i in range(30)
+    ]
+    # 2件目以降は件数のスロットが0でないため同じガスになる
+    assert len(set(gas[1:])) == 1
+
+def test_memory_pagination_and_delete(setup):
+    """タグ・ユーザーのメモリ一覧のページ取得と削除をテスト"""
+    myrdal = setup['myrdal']
+    owner = setup['owner']
+
+    memory_ids = [
+        myrdal.store_memory(f"memory {i}", ["research"], 1, False, {'from': owner}).return_value
+        for i in range(5)
+    ]
+    assert myrdal.memory_tag_count("research") == 5
+    assert list(myrdal.search_memories_by_tag("research", 1, 2)) == memory_ids[1:3]
+
+    # 削除すると末尾の要素が削除位置に移る
+    myrdal.delete_memory(memory_ids[1], {'from': owner})
+    expected = [memory_ids[0], memory_ids[4], memory_ids[2], memory_ids[3]]
+    assert myrdal.user_memory_count(owner) == 4
+    assert list(myrdal.get_user_memories(owner)) == expected
+    assert list(myrdal.search_memories_by_tag("research")) == expected
+
+def test_delete_task_memory(setup):
+    """タスクに関連付けたメモリを削除するとタスクのメモリリストからも消えるかテスト"""
+    myrdal = setup['myrdal']
+    owner = setup['owner']
+
+    task_id = myrdal.create_task("task", {'from': owner}).return_value
+    memory_ids = [
+        myrdal.store_task_memory(task_id, f"memory {i}", ["research", "web"], 1, False, {'from': owner}).return_value
+        for i in range(3)
+    ]
+    assert myrdal.memory_task(memory_ids[0]) == task_id
+
+    myrdal.delete_memory(memory_ids[0], {'from': owner})
+    assert list(myrdal.get_task(task_id)[8]) == [memory_ids[2], memory_ids[1]]
+    assert list(myrdal.search_memories_by_tag("web")) == [memory_ids[2], memory_ids[1]]
+    assert myrdal.memory_task(memory_ids[0]) == "0x" + "00" * 32
+
+def test_delete_cost_does_not_depend_on_task_count(setup):
+    """削除のガスが所有者のタスク数に関係しないかテスト"""
+    myrdal = setup['myrdal']
+
+    def delete_gas(user, task_count):
+        for i in range(task_count):
+            myrdal.create_task(f"task {i}", {'from': user})
+        task_id = myrdal.create_task("task", {'from': user}).return_value
+        memory_id = myrdal.store_task_memory(task_id, "memory", ["research"], 1, False, {'from': user}).return_value
+        myrdal.store_task_memory(task_id, "memory", ["research"], 1, False, {'from': user})
+        return myrdal.delete_memory(memory_id, {'from': user}).gas_used
+
+    # メモリIDのゼロバイト数によるcalldataの差だけを許容する
+    assert abs(delete_gas(accounts[1], 0) - delete_gas(accounts[2], 40)) < 500
+
+def test_search_memories_by_tags(setup):
+    """AND検索・重複のないOR検索・ページ取得をテスト"""
+    myrdal = setup['myrdal']
+    owner = setup['owner']
+
+    tag_sets = [["research", "web"], ["research"], ["web", "news"], ["research", "web", "news"]]
+    memory_ids = [
+        myrdal.store_memory(f"memory {i}", tags, 1, False, {'from': owner}).return_value
+        for i, tags in enumerate(tag_sets)
+    ]
+
+    def search(*args):
+        found, next_cursor = myrdal.search_memories_by_tags(*args)
+        return list(found), next_cursor
+
+    assert search(["research", "web"], True) == ([memory_ids[0], memory_ids[3]], 0)
+    assert search(["news", "research"], True) == ([memory_ids[3]], 0)
+    # OR検索はタグの順に一覧を連結し、前のタグで返したメモリを除く
+    assert search(["research", "news"], False) == (
+        [memory_ids[0], memory_ids[1], memory_ids[3], memory_ids[2]], 0
+    )
+    assert search(["web", "web"], False) == ([memory_ids[0], memory_ids[2], memory_ids[3]], 0)
+    # カーソルは連結した一覧での位置（research: 0〜2、news: 3〜4）
+    assert search(["research", "news"], False, 0, 2) == ([memory_ids[0], memory_ids[1]], 2)
+    # ページが埋まった時点の位置を返すため、残りが重複だけでも続きのカーソルを返す
+    assert search(["research", "news"], False, 2, 2) == ([memory_ids[3], memory_ids[2]], 4)
+    assert search(["research", "news"], False, 4, 2) == ([], 0)
+    assert search(["research", "missing"], True) == ([], 0)
+
+def test_search_memories_beyond_scan_limit(setup):
+    """走査の上限を超える件数のタグでも検索でき、カーソルで続きを取得できるかテスト"""
+    myrdal = setup['myrdal']
+    owner = setup['owner']
+
+    assert myrdal.list_scan_limit() == MAX_LIST_SCAN
+    myrdal.set_list_scan_limit(TEST_SCAN_LIMIT, {'from': owner})
+
+    memory_ids = [
+        myrdal.store_memory(f"memory {i}", ["bulk"], 1, False, {'from': owner}).return_value
+        for i in range(TEST_SCAN_LIMIT + 5)
+    ]
+    assert myrdal.memory_tag_count("bulk") == TEST_SCAN_LIMIT + 5
+
+    memory_ids_page, next_cursor = myrdal.search_memories_by_tags(["bulk"], False)
+    assert list(memory_ids_page) == memory_ids[:100] and next_cursor == 100
+    memory_ids_page, next_cursor = myrdal.search_memories_by_tags(["bulk"], True, TEST_SCAN_LIMIT - 10)
+    assert list(memory_ids_page) == memory_ids[TEST_SCAN_LIMIT - 10:] and next_cursor == 0
+
+    # 2つ目の一覧は全て重複のため、走査の上限で止まってカーソルを返す
+    start = TEST_SCAN_LIMIT - 10
+    memory_ids_page, next_cursor = myrdal.search_memories_by_tags(["bulk", "bulk"], False, start)
+    assert list(memory_ids_page) == memory_ids[start:] and next_cursor == start + TEST_SCAN_LIMIT
+    memory_ids_page, next_cursor = myrdal.search_memories_by_tags(["bulk", "bulk"], False, next_cursor)
+    assert list(memory_ids_page) == [] and next_cursor == 0
+
+def test_set_list_scan_limit(setup):
+    """走査件数はオーナーだけが1〜MAX_LIST_SCANの範囲で設定できるかテスト"""
+    myrdal = setup['myrdal']
+    owner = setup['owner']
+
+    with pytest.raises(VirtualMachineError):
+        myrdal.set_list_scan_limit(TEST_SCAN_LIMIT, {'from': accounts[1]})
+    with pytest.raises(VirtualMachineError):
+        myrdal.set_list_scan_limit(0, {'from': owner})
+    with pytest.raises(VirtualMachineError):
+        myrdal.set_list_scan_limit(MAX_LIST_SCAN + 1, {'from': owner})
+    assert myrdal.list_scan_limit() == MAX_LIST_SCAN
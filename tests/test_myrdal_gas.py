@@ -0,0 +1,50 @@
+from brownie import accounts, Myrdal
+
+# 関数ごとのガス使用量の上限（長さ1024のプロンプトのタスクに対する値）
+# TaskInfo全体をメモリにコピーして書き戻すと、プロンプトの読み込みだけで約1万ガス増えて上限を超える
+GAS_BUDGETS = {
+    'process_task': 45000,
+    'request_firefox_action': 275000,
+    'request_pyppeteer_action': 233000,
+    'request_llm_completion': 252000,
+    # 新しいスロットへの書き込み19回（22,100 × 19 = 419,900）と基本ガス21,000が大半を占める
+    # 内訳: メモリ本体9、ユーザーの一覧3（要素・件数・位置）、タスクのメモリリスト2、関連タスク1、
+    # タグの一覧3（要素・件数・位置）、memory_count 1。余裕は1スロット分未満で、書き込みが増えると超える
+    'store_task_memory': 455000,
+    'complete_task': 95000,
+}
+
+def run_task_lifecycle(prompt):
+    """新しいコントラクトでタスクを一通り処理し、関数ごとのガス使用量を返す"""
+    owner = accounts[0]
+    myrdal = Myrdal.deploy({'from': owner})
+
+    task_id = myrdal.create_task(prompt, {'from': owner}).return_value
+    gas = {}
+    gas['process_task'] = myrdal.process_task(task_id, {'from': owner}).gas_used
+    gas['request_firefox_action'] = myrdal.request_firefox_action(
+        task_id, '{"action": "navigate"}', {'from': owner}
+    ).gas_used
+    gas['request_pyppeteer_action'] = myrdal.request_pyppeteer_action(
+        task_id, '{"action": "screenshot"}', {'from': owner}
+    ).gas_used
+    gas['request_llm_completion'] = myrdal.request_llm_completion(task_id, "summarize", {'from': owner}).gas_used
+    gas['store_task_memory'] = myrdal.store_task_memory(
+        task_id, "memory", ["research"], 1, False, {'from': owner}
+    ).gas_used
+    gas['complete_task'] = myrdal.complete_task(task_id, "done", {'from': owner}).gas_used
+
+    task = myrdal.get_task(task_id)
+    assert task[2] == prompt
+    assert len(task[7]) == 2 and len(task[8]) == 1 and len(task[9]) == 1
+    return gas
+
+def test_task_updates_do_not_depend_on_prompt_size():
+    """タスクの更新がプロンプトの長さに関係なく同じガスで済むかテスト"""
+    assert run_task_lifecycle("a") == run_task_lifecycle("a" * 1024)
+
+def test_task_update_gas_budgets():
+    """タスクを更新する関数のガス使用量が上限以内かテスト"""
+    gas = run_task_lifecycle("a" * 1024)
+    over_budget = {name: gas[name] for name, budget in GAS_BUDGETS.items() if gas[name] > budget}
+    assert over_budget == {}
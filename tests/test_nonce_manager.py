@@ -0,0 +1,119 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from nonce_manager import NonceManager
+
+class FakeSignedTransaction:
+    def __init__(self, tx):
+        self.rawTransaction = f"raw-{tx['nonce']}".encode()
+
+class FakeAccount:
+    address = '0x00000000000000000000000000000000000000aa'
+
+    def sign_transaction(self, tx):
+        return FakeSignedTransaction(tx)
+
+class FakeTxHash(bytes):
+    def hex(self):
+        return '0x' + bytes.hex(self)
+
+class FakeEth:
+    def __init__(self, pending_count=5):
+        self.pending_count = pending_count
+        self.latest_count = pending_count
+        self.receipts = {}
+        self.known = set()
+        self.sent = []
+
+    @property
+    async def gas_price(self):
+        return 1
+
+    @property
+    async def chain_id(self):
+        return 1
+
+    async def get_transaction_count(self, address, block_identifier):
+        return self.pending_count if block_identifier == 'pending' else self.latest_count
+
+    async def get_transaction_receipt(self, tx_hash):
+        if tx_hash not in self.receipts:
+            raise ValueError('not found')
+        return self.receipts[tx_hash]
+
+    async def get_transaction(self, tx_hash):
+        if tx_hash not in self.known:
+            raise ValueError('not found')
+        return {}
+
+    async def send_raw_transaction(self, raw_transaction):
+        self.sent.append(raw_transaction)
+        tx_hash = FakeTxHash(raw_transaction)
+        self.known.add(tx_hash)
+        return tx_hash
+
+class FakeWeb3:
+    def __init__(self, eth):
+        self.eth = eth
+
+@pytest.fixture
+def eth():
+    return FakeEth()
+
+@pytest.fixture
+def manager(eth):
+    return NonceManager(FakeWeb3(eth), FakeAccount(), drop_timeout=0)
+
+def test_allocate_sequential(manager):
+    """ノンスが連番で払い出されるかテスト"""
+    async def allocate_many():
+        return await asyncio.gather(*(manager.allocate() for _ in range(4)))
+
+    assert sorted(asyncio.run(allocate_many())) == [5, 6, 7, 8]
+
+def test_released_nonce_is_reused(manager):
+    """送信失敗で返却されたノンスが再利用されるかテスト"""
+    async def scenario():
+        first = await manager.allocate()
+        second = await manager.allocate()
+        manager.release(first)
+        return first, second, await manager.allocate(), await manager.allocate()
+
+    first, second, reused, following = asyncio.run(scenario())
+    assert reused == first
+    assert following == second + 1
+
+def test_reconcile_mined_and_replaced(manager, eth):
+    """採掘済みと置き換え済みのトランザクションが判別されるかテスト"""
+    async def scenario():
+        for _ in range(2):
+            nonce = await manager.allocate()
+            manager.track(nonce, FakeTxHash(f"tx-{nonce}".encode()), b'raw', meta=nonce)
+        eth.receipts[FakeTxHash(b'tx-5')] = {'status': 1}
+        eth.latest_count = 7
+        return await manager.reconcile()
+
+    mined, replaced = asyncio.run(scenario())
+    assert [entry.nonce for entry in mined] == [5]
+    assert [entry.meta for entry in replaced] == [6]
+    assert manager.pending == {}
+
+def test_reconcile_fills_gap_and_rebroadcasts(manager, eth):
+    """欠番の補填と消失トランザクションの再送が行われるかテスト"""
+    async def scenario():
+        gap = await manager.allocate()
+        nonce = await manager.allocate()
+        manager.release(gap)
+        manager.track(nonce, FakeTxHash(b'dropped'), b'raw-dropped')
+        await manager.reconcile()
+        return gap
+
+    gap = asyncio.run(scenario())
+    assert f"raw-{gap}".encode() in eth.sent
+    assert b'raw-dropped' in eth.sent
+    assert gap in manager.pending
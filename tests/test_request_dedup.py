@@ -0,0 +1,113 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from checkpoint_store import CheckpointStore
+from request_dedup import (
+    RequestDeduplicator, ActionResultCache,
+    STATE_SEEN, STATE_EXECUTING, STATE_SUBMITTED, STATE_CONFIRMED
+)
+
+def test_request_is_claimed_once(tmp_path):
+    """同じrequest_idは1回だけ処理対象になるかテスト"""
+    store = CheckpointStore(path=str(tmp_path / 'checkpoint.db'))
+    dedup = RequestDeduplicator(store)
+    request_id = b'\x01' * 32
+
+    assert dedup.claim(request_id)
+    assert not dedup.claim(request_id)
+    assert dedup.state(request_id) == STATE_SEEN
+
+    dedup.set_state(request_id, STATE_EXECUTING)
+    assert dedup.state(request_id) == STATE_EXECUTING
+
+    # 失敗した場合は再処理できる
+    dedup.release(request_id)
+    assert dedup.claim(request_id)
+    store.close()
+
+def test_submitted_state_survives_restart(tmp_path):
+    """送信済み・確定済みの状態が再起動後も保持されるかテスト"""
+    path = str(tmp_path / 'checkpoint.db')
+    store = CheckpointStore(path=path)
+    dedup = RequestDeduplicator(store)
+    request_id = b'\x02' * 32
+
+    dedup.claim(request_id)
+    dedup.set_state(request_id, STATE_SUBMITTED, 10)
+    dedup.set_state(request_id, STATE_CONFIRMED)
+    store.close()
+
+    reopened = CheckpointStore(path=path)
+    dedup = RequestDeduplicator(reopened)
+    assert dedup.state(request_id) == STATE_CONFIRMED
+    assert not dedup.claim(request_id)
+    assert reopened.is_processed(request_id)
+    reopened.close()
+
+def test_action_cache_shares_execution():
+    """同一の(action, params)が1回の実行を共有するかテスト"""
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'status': 'success', 'title': 'Example'}
+
+    async def scenario():
+        cache = ActionResultCache(ttl=60)
+        results = await asyncio.gather(
+            cache.run('navigate', {'url': 'https://example.com'}, execute),
+            cache.run('navigate', {'url': 'https://example.com'}, execute)
+        )
+        results.append(await cache.run('navigate', {'url': 'https://example.com'}, execute))
+        await cache.run('navigate', {'url': 'https://example.org'}, execute)
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert all(result['title'] == 'Example' for result in results)
+
+def test_action_cache_disabled_and_errors_not_cached():
+    """TTLが0の場合とエラー結果はキャッシュされないかテスト"""
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        return {'status': 'error', 'message': 'timeout'}
+
+    async def scenario():
+        await ActionResultCache(ttl=0).run('click', {}, execute)
+        cache = ActionResultCache(ttl=60)
+        await cache.run('click', {}, execute)
+        await cache.run('click', {}, execute)
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+
+def test_action_cache_leader_cancelled():
+    """実行中のタスクがキャンセルされても待機していたタスクが自分で実行して結果を得るかテスト"""
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'status': 'success', 'title': 'Example'}
+
+    async def scenario():
+        cache = ActionResultCache(ttl=60)
+        leader = asyncio.create_task(cache.run('navigate', {'url': 'https://example.com'}, execute))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.run('navigate', {'url': 'https://example.com'}, execute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await asyncio.wait_for(waiter, 1)
+        assert leader.cancelled()
+        assert not cache.inflight
+        return result
+
+    result = asyncio.run(scenario())
+    assert result['title'] == 'Example'
+    assert len(calls) == 2
@@ -0,0 +1,45 @@
+import os
+import sys
+import asyncio
+import hashlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from result_store import ResultStore, encode_result, ONCHAIN_RESULT_LIMIT
+
+
+def test_small_result_is_inlined(tmp_path):
+    store = ResultStore(root=str(tmp_path), inline_limit=512)
+    result = {'status': 'success', 'title': 'Example'}
+    assert asyncio.run(store.prepare(result)) == result
+
+
+def test_large_result_is_stored_offchain(tmp_path):
+    store = ResultStore(root=str(tmp_path), inline_limit=512)
+    result = {'status': 'success', 'title': 'Example', 'html': '<p>' * 5000}
+
+    pointer = asyncio.run(store.prepare(result))
+    data = encode_result(result).encode()
+
+    assert pointer['offchain'] is True
+    assert pointer['sha256'] == hashlib.sha256(data).hexdigest()
+    assert pointer['size'] == len(data)
+    assert pointer['summary'] == {'status': 'success', 'title': 'Example'}
+    assert store.get(pointer['sha256']) == data
+    assert len(encode_result(pointer).encode()) <= ONCHAIN_RESULT_LIMIT
+
+
+def test_put_is_content_addressed(tmp_path):
+    store = ResultStore(root=str(tmp_path))
+    first = store.put(b'payload')
+    second = store.put(b'payload')
+    assert first == second
+    assert store.get('0' * 64) is None
+
+
+def test_corrupted_blob_is_rejected(tmp_path):
+    store = ResultStore(root=str(tmp_path))
+    digest = store.put(b'payload')
+    with open(store.path_for(digest), 'wb') as f:
+        f.write(b'tampered')
+    assert store.get(digest) is None
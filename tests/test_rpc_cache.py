@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from rpc_cache import RPCCache, POLICY_IMMUTABLE, POLICY_HEAD
+from header_tracker import HeaderTracker
+
+def test_cache_policies():
+    """メソッドとブロック指定からキャッシュの種類が決まるかテスト"""
+    cache = RPCCache(finality_depth=10)
+    cache.put('eth_blockNumber', [], '0x64')
+
+    assert cache.policy('eth_chainId', []) == POLICY_IMMUTABLE
+    assert cache.policy('eth_gasPrice', []) == POLICY_HEAD
+    assert cache.policy('eth_call', [{'to': '0x1'}, 'latest']) == POLICY_HEAD
+    assert cache.policy('eth_call', [{'to': '0x1'}, hex(80)]) == POLICY_IMMUTABLE
+    assert cache.policy('eth_call', [{'to': '0x1'}, hex(95)]) == POLICY_HEAD
+    assert cache.policy('eth_call', [{'to': '0x1'}, {'blockHash': '0xabc'}]) == POLICY_IMMUTABLE
+    assert cache.policy('eth_getTransactionCount', ['0x1', 'pending']) is None
+    assert cache.policy('eth_getBalance', ['0x1', 'pending']) is None
+    assert cache.policy('eth_sendRawTransaction', ['0x00']) is None
+
+def test_head_reads_expire():
+    """最新ブロックに依存する読み出しがTTLで失効するかテスト"""
+    cache = RPCCache(head_ttl=0.01)
+    cache.put('eth_chainId', [], '0x5afe')
+    cache.put('eth_gasPrice', [], '0x1')
+
+    assert cache.get('eth_gasPrice', []) == (True, '0x1')
+    time.sleep(0.02)
+    assert cache.get('eth_gasPrice', []) == (False, None)
+    assert cache.get('eth_chainId', []) == (True, '0x5afe')
+
+def test_null_and_uncacheable_results_not_stored():
+    """Noneの結果やキャッシュ対象外のメソッドが保存されないかテスト"""
+    cache = RPCCache()
+    cache.put('eth_getBlockByHash', ['0xabc', False], None)
+    cache.put('eth_getTransactionReceipt', ['0xabc'], {'status': '0x1'})
+
+    assert cache.get('eth_getBlockByHash', ['0xabc', False]) == (False, None)
+    assert cache.get('eth_getTransactionReceipt', ['0xabc']) == (False, None)
+    assert not cache.entries
+
+def test_cache_is_bounded():
+    """保持数の上限を超えると古いものから削除されるかテスト"""
+    cache = RPCCache(max_size=2)
+    for i in range(3):
+        cache.put('eth_getBlockByHash', [hex(i), False], {'number': hex(i)})
+
+    assert len(cache.entries) == 2
+    assert cache.get('eth_getBlockByHash', ['0x0', False]) == (False, None)
+    assert cache.get('eth_getBlockByHash', ['0x2', False])[0]
+
+def test_header_tracker_detects_reorg_through_cache():
+    """キャッシュを通してブロックを取得してもリオルグ検出範囲の深いリオルグを検出できるかテスト"""
+    cache = RPCCache(head_ttl=0)
+    chain = {}
+
+    def build(start, end, fork):
+        for number in range(start, end + 1):
+            parent = chain[number - 1]['hash'] if number - 1 in chain else b'genesis'
+            chain[number] = {'hash': f"{fork}{number}".encode(), 'parentHash': parent}
+
+    class CachedEth:
+        async def get_block(self, block_number):
+            params = [hex(block_number), False]
+            hit, block = cache.get('eth_getBlockByNumber', params)
+            if not hit:
+                block = chain[block_number]
+                cache.put('eth_getBlockByNumber', params, block)
+            return block
+
+    class CachedWeb3:
+        eth = CachedEth()
+
+    tracker = HeaderTracker(CachedWeb3())
+    build(1, 200, 'a')
+
+    async def scenario():
+        for head in range(1, 201):
+            cache.put('eth_blockNumber', [], hex(head))
+            assert await tracker.update(head) is None
+        # 同じプロバイダーを使う他の処理が直近のブロックを読み出す
+        for number in range(170, 201):
+            await CachedWeb3.eth.get_block(number)
+        # 最新ブロックから20ブロック遡ったブロック以降が置き換えられる
+        build(180, 201, 'b')
+        cache.put('eth_blockNumber', [], hex(201))
+        return await tracker.update(201)
+
+    assert asyncio.run(scenario()) == 180
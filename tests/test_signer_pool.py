@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from signer_pool import SignerPool, SELECTION_ROUND_ROBIN, SELECTION_LEAST_PENDING
+
+class FakeAccount:
+    def __init__(self, address):
+        self.address = address
+
+def make_pool(selection):
+    accounts = [FakeAccount(f"0x{i:040x}") for i in range(3)]
+    return SignerPool(object(), accounts, selection=selection)
+
+def test_round_robin_selection():
+    """ラウンドロビンで順にアカウントが選ばれるかテスト"""
+    pool = make_pool(SELECTION_ROUND_ROBIN)
+    addresses = [pool.select().address for _ in range(6)]
+    assert addresses == [signer.address for signer in pool.signers] * 2
+
+def test_least_pending_selection():
+    """保留中が最も少ないアカウントが選ばれるかテスト"""
+    pool = make_pool(SELECTION_LEAST_PENDING)
+    pool.signers[0].nonce_manager.pending = {0: object(), 1: object()}
+    pool.signers[1].nonce_manager.pending = {0: object()}
+
+    assert pool.select() is pool.signers[2]
+    pool.signers[2].nonce_manager.pending = {0: object(), 1: object()}
+    assert pool.select() is pool.signers[1]
+
+def test_least_pending_rotates_on_tie():
+    """保留中が同数の場合は順番に選ばれるかテスト"""
+    pool = make_pool(SELECTION_LEAST_PENDING)
+    assert [pool.select() for _ in range(3)] == pool.signers
+
+def test_empty_pool_rejected():
+    """アカウントがない場合はエラーになるかテスト"""
+    with pytest.raises(ValueError):
+        SignerPool(object(), [])
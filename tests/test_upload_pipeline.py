@@ -0,0 +1,90 @@
+import os
+import sys
+import gzip
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mcp'))
+
+from PIL import Image
+
+from upload_pipeline import (
+    UploadPipeline, sniff_mime, detect_mime_stage, compress_text_stage, recompress_image_stage, default_stages
+)
+
+def test_sniff_mime_ignores_extension(tmp_path):
+    """拡張子ではなく先頭のバイト列でMIMEタイプを判定するかテスト"""
+    png = tmp_path / 'screenshot.bin'
+    Image.new('RGB', (4, 4)).save(png, 'PNG')
+    html = tmp_path / 'page.txt'
+    html.write_text('  <!DOCTYPE html><html><body>hi</body></html>')
+    data = tmp_path / 'result'
+    data.write_text('{"answer": 42}')
+
+    assert sniff_mime(str(png)) == 'image/png'
+    assert sniff_mime(str(html)) == 'text/html'
+    assert sniff_mime(str(data)) == 'application/json'
+
+def test_compress_text_keeps_smaller_result(tmp_path):
+    """テキストは圧縮して小さくなった場合だけgzipに置き換わるかテスト"""
+    page = tmp_path / 'page.html'
+    page.write_text('<html>' + '<p>row</p>' * 1000 + '</html>')
+    pipeline = UploadPipeline(stages=[detect_mime_stage, compress_text_stage], work_dir=str(tmp_path / 'work'))
+
+    artifact = pipeline.run(str(page))
+    assert artifact['name'] == 'page.html.gz'
+    assert artifact['mime_type'] == 'application/gzip'
+    assert artifact['original_mime_type'] == 'text/html'
+    assert artifact['size'] < page.stat().st_size
+    with gzip.open(artifact['path'], 'rb') as f:
+        assert f.read() == page.read_bytes()
+
+    # 同じ内容からは同じバイト列が作られる（重複排除が効く）
+    again = pipeline.run(str(page))
+    assert open(again['path'], 'rb').read() == open(artifact['path'], 'rb').read()
+
+    pipeline.cleanup(artifact)
+    assert not os.path.exists(artifact['path'])
+    assert page.exists()
+
+    small = tmp_path / 'small.json'
+    small.write_text('{"a": 1}')
+    artifact = compress_text_stage(pipeline.run(str(small)), min_size=0)
+    assert artifact['path'] == str(small)
+    assert artifact['mime_type'] == 'application/json'
+
+def test_recompress_image_downscales(tmp_path):
+    """大きな画像が指定した長辺まで縮小されるかテスト"""
+    image = tmp_path / 'shot.png'
+    Image.new('RGB', (800, 400), 'white').save(image, 'PNG')
+    pipeline = UploadPipeline(stages=default_stages(image_max_dimension=200), work_dir=str(tmp_path / 'work'))
+
+    artifact = pipeline.run(str(image))
+    assert artifact['mime_type'] == 'image/png'
+    assert artifact['temporary']
+    with Image.open(artifact['path']) as resized:
+        assert resized.size == (200, 100)
+
+    # 縮小不要で再エンコードしても小さくならない場合は元のファイルを使う
+    small = tmp_path / 'small.png'
+    Image.new('RGB', (10, 10)).save(small, 'PNG', optimize=True)
+    artifact = recompress_image_stage(pipeline.run(str(small)), max_dimension=200, image_format='png')
+    assert artifact['path'] == str(small)
+
+def test_run_async_in_process_pool(tmp_path):
+    """プロセスプールで複数ファイルを並列に処理できるかテスト"""
+    paths = []
+    for i in range(4):
+        path = tmp_path / f'log{i}'
+        path.write_text('line\n' * 2000)
+        paths.append(str(path))
+    pipeline = UploadPipeline(stages=default_stages(compress_text=True), work_dir=str(tmp_path / 'work'), workers=2)
+
+    async def run():
+        return await asyncio.gather(*(pipeline.run_async(path) for path in paths))
+
+    try:
+        artifacts = asyncio.run(run())
+    finally:
+        pipeline.close()
+    assert [artifact['original_mime_type'] for artifact in artifacts] == ['text/plain'] * 4
+    assert all(artifact['mime_type'] == 'application/gzip' for artifact in artifacts)